@@ -1,8 +1,12 @@
 import os
 from flask import Flask
+from sqlalchemy.pool import QueuePool
 import logging
 from config import config
-from .extensions import db, migrate, cache, cors, apifairy, ma
+from .core.parser import load_fold_table
+from .core.pool_metrics import timed_pool
+from .extensions import db, migrate, cache, cors, apifairy, ma, result_cache
+from .extensions import pool_metrics, replicas, write_behind
 
 
 def create_app(config_name: str | None = None):
@@ -32,6 +36,16 @@ def create_app(config_name: str | None = None):
 
     logging.getLogger(__name__).info(f"Flask app created with config: {config_name}")
 
+    # Record the checkouts of the database connection pool (Flask-SQLAlchemy
+    # still uses a static pool for in-memory SQLite)
+    engine_options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options,
+        "poolclass": timed_pool(
+            engine_options.get("poolclass", QueuePool), pool_metrics
+        ),
+    }
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -39,9 +53,26 @@ def create_app(config_name: str | None = None):
     cors.init_app(app)
     ma.init_app(app)  # Marshmallow before apifairy
     apifairy.init_app(app)
+    with app.app_context():
+        # The cachelib backend, which can `inc` the counters of all workers
+        result_cache.init_app(app, shared=cache.cache)
+        replicas.init_app(
+            app,
+            [db.engines[key] for key in app.config["REPLICA_BINDS"]],
+            shared=cache,
+        )
+
+    # Load the parser's Unicode folding table once per worker
+    if app.config.get("FOLD_TABLE_CACHE_DIR"):
+        load_fold_table(app.config["FOLD_TABLE_CACHE_DIR"])
 
     # Register blueprints
     from .api import health_bp, palindromes_bp
+    from .services import palindrome_service
+
+    # Store the detections queued in write-behind mode in the background
+    if app.config["WRITE_BEHIND"]:
+        write_behind.init_app(app, palindrome_service.store_pending)
 
     app.register_blueprint(health_bp, url_prefix="/v1/health")
     app.register_blueprint(palindromes_bp, url_prefix="/v1/palindromes")
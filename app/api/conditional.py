@@ -0,0 +1,49 @@
+"""
+Conditional GETs of the read endpoints.
+
+Clients that poll send back the entity tag of their copy in `If-None-Match`
+and get an empty 304 while it is still current. The tag is computed before
+the view runs, from its arguments and at most a cache read, so this answer
+is given without querying the database or serializing anything.
+"""
+
+from functools import wraps
+
+from flask import Response, request
+
+# Detections only change by being deleted: copies must be revalidated too
+PRIVATE_REVALIDATE = "private, no-cache"
+# Lists change with every write: cached copies must be revalidated
+REVALIDATE = "no-cache"
+
+
+def conditional(etag, weak=False, cache_control=None):
+    """
+    Answers `If-None-Match` with 304 before running the view, when it can.
+
+    `etag` is called with the arguments of the view, and returns the tag of
+    its response, or None if it cannot tell it (the view then always runs,
+    and its response has no tag). Tags are compared weakly, as RFC 9110
+    requires for `If-None-Match`. Other preconditions, like
+    `If-Modified-Since`, are checked against the response of the view.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def _conditional(*args, **kwargs):
+            tag = etag(*args, **kwargs)
+            if tag is not None and request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+            else:
+                response = f(*args, **kwargs)
+            if tag is not None:
+                response.set_etag(tag, weak=weak)
+            if cache_control is not None:
+                response.headers["Cache-Control"] = cache_control
+            if response.status_code == 304:
+                return response
+            return response.make_conditional(request)
+
+        return _conditional
+
+    return decorator
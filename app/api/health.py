@@ -1,5 +1,8 @@
+from flask import current_app
+
 from . import health_bp as api
-from app.api.schemas import HealthSchema
+from app.api.schemas import HealthSchema, PoolsStatsSchema, ResultCacheStatsSchema
+from app.extensions import db, pool_metrics, result_cache
 from apifairy import response
 
 
@@ -7,3 +10,23 @@ from apifairy import response
 @response(HealthSchema, 200)
 def health():
     return {"status": "ok"}
+
+
+@api.route("/cache", methods=["GET"])
+@response(ResultCacheStatsSchema, 200)
+def cache_stats():
+    """Counters of the detection result cache of the worker serving the request"""
+    return result_cache.stats()
+
+
+@api.route("/pool", methods=["GET"])
+@response(PoolsStatsSchema, 200)
+def pool_stats():
+    """Metrics of the database connection pools of the worker serving the request"""
+    return {
+        **pool_metrics.stats(db.engine.pool),
+        "replicas": {
+            key: pool_metrics.stats(db.engines[key].pool)
+            for key in current_app.config["REPLICA_BINDS"]
+        },
+    }
@@ -1,18 +1,45 @@
+import csv
+import io
 import uuid
-from flask import url_for
-from apifairy import arguments, body, response
+from operator import attrgetter
+from flask import Response, request, stream_with_context, url_for
+from apifairy import arguments, body, other_responses, response
+from apifairy.exceptions import ValidationError
 from app.api import palindromes_bp as api
+from app.api.conditional import PRIVATE_REVALIDATE, REVALIDATE, conditional
+from app.api.serializers import (
+    PALINDROME_FIELDS,
+    dumps,
+    fast_response,
+    palindrome,
+    palindrome_list,
+    palindrome_values,
+)
 from app.api.schemas import (
     EmptySchema,
+    PalindromeExportQuerySchema,
+    PalindromeBatchCreateSchema,
+    PalindromeBatchSchema,
     PalindromeCreateSchema,
+    PalindromeDeleteQuerySchema,
+    PalindromeDeletedSchema,
     PalindromeListSchema,
     PalindromeQuerySchema,
     PalindromeSchema,
+    PalindromeStatsQuerySchema,
+    PalindromeStatsSchema,
+    PalindromeSubstringSchema,
+    PalindromeTextSchema,
+    PalindromeUploadSchema,
 )
 from app.services import palindrome_service
 from app.services.palindrome.palindrome_dtos import (
+    PalindromeBatchDTO,
     PalindromeCreateDTO,
     PalindromeQueryDTO,
+    PalindromeStatsQueryDTO,
+    PalindromeTextDTO,
+    PalindromeUploadDTO,
 )
 
 
@@ -26,31 +53,107 @@ def create(data):
     return palindrome
 
 
+@api.route("/batch", methods=["POST"])
+@body(PalindromeBatchCreateSchema)
+@response(PalindromeBatchSchema, 201)
+def create_batch(data):
+    """Check and store many texts at once"""
+    batch_dto = PalindromeBatchDTO(**data)
+    return {"items": palindrome_service.create_batch(batch_dto)}
+
+
+@api.route("/upload", methods=["POST"])
+@body(PalindromeUploadSchema, location="form", media_type="multipart/form-data")
+@response(PalindromeSchema, 201)
+def upload(data):
+    """Check an uploaded text file, storing only its hash"""
+    upload_dto = PalindromeUploadDTO(language=data["language"])
+    try:
+        return palindrome_service.create_from_upload(upload_dto, data["file"].stream)
+    except UnicodeDecodeError:
+        raise ValidationError(400, {"file": ["The file is not valid UTF-8 text."]})
+
+
+@api.route("/longest", methods=["POST"])
+@body(PalindromeTextSchema)
+@response(PalindromeSubstringSchema)
+def find_longest(data):
+    """Find the longest palindromic part of a text"""
+    text_dto = PalindromeTextDTO(**data)
+    return palindrome_service.find_longest(text_dto)
+
+
+@api.route("/stats", methods=["GET"])
+@arguments(PalindromeStatsQuerySchema)
+@response(PalindromeStatsSchema)
+def get_stats(args):
+    """Count the detections, overall, by language and by day"""
+    return palindrome_service.get_stats(PalindromeStatsQueryDTO(**args))
+
+
+NOT_MODIFIED = {304: "The copy of the client, named in If-None-Match, is current."}
+
+
+def _detail(palindrome_id: uuid.UUID):
+    # Read once per request: by the entity tag, then by the view
+    key = "palindrome_detector.detail"
+    if key not in request.environ:
+        request.environ[key] = palindrome_service.get_by_id(palindrome_id)
+    return request.environ[key]
+
+
+def _detail_etag(palindrome_id: uuid.UUID) -> str:
+    # Strong: the representation of a detection never changes. It is read
+    # first, so that a deleted detection gets a 404 instead of a 304.
+    _detail(palindrome_id)
+    return str(palindrome_id)
+
+
 @api.route("/<uuid:palindrome_id>", methods=["GET"])
-@response(PalindromeSchema)
+@conditional(_detail_etag, cache_control=PRIVATE_REVALIDATE)
+@other_responses(NOT_MODIFIED)
+@fast_response(PalindromeSchema, palindrome, last_modified=attrgetter("created_at"))
 def get_by_id(palindrome_id: uuid.UUID):
     """Retrieve a palindrome by id"""
-    return palindrome_service.get_by_id(palindrome_id)
+    return _detail(palindrome_id)
+
+
+def _page_etag(args: dict) -> str | None:
+    return palindrome_service.page_etag(PalindromeQueryDTO(**args))
 
 
 @api.route("", methods=["GET"])
 @arguments(PalindromeQuerySchema)
-@response(PalindromeListSchema)
+@conditional(_page_etag, weak=True, cache_control=REVALIDATE)
+@other_responses(NOT_MODIFIED)
+@fast_response(PalindromeListSchema, palindrome_list)
 def get_palindromes(args):
     """Retrieve a list of palindromes"""
     query_dto = PalindromeQueryDTO(**args)
-    pagination = palindrome_service.get_all(query_dto)
+    try:
+        pagination = palindrome_service.get_all(query_dto)
+    except ValueError as error:
+        raise ValidationError(400, {"cursor": [str(error)]})
 
-    url_args = args.copy()
+    # The query, as the client sent it (e.g. `per_page`, not `page_size`)
+    url_args = PalindromeQuerySchema().dump(args)
     url_args.pop("page", None)
+    url_args.pop("cursor", None)
+
+    if query_dto.pagination == "keyset":
+        prev_args = {"cursor": pagination.prev_cursor}
+        next_args = {"cursor": pagination.next_cursor}
+    else:
+        prev_args = {"page": pagination.prev_num}
+        next_args = {"page": pagination.next_num}
 
     prev_url = (
-        url_for("Palindromes.get_palindromes", page=pagination.prev_num, **url_args)
+        url_for("Palindromes.get_palindromes", **prev_args, **url_args)
         if pagination.has_prev
         else None
     )
     next_url = (
-        url_for("Palindromes.get_palindromes", page=pagination.next_num, **url_args)
+        url_for("Palindromes.get_palindromes", **next_args, **url_args)
         if pagination.has_next
         else None
     )
@@ -66,9 +169,61 @@ def get_palindromes(args):
     }
 
 
+def _ndjson(chunks):
+    # One line per row, straight from its columns: no schema dump per chunk
+    for rows in chunks:
+        yield b"".join(dumps(palindrome(row)) for row in rows)
+
+
+def _csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PALINDROME_FIELDS)
+    for rows in chunks:
+        # created_at comes last, in ISO format as the schema dumps it
+        writer.writerows(
+            (*values[:-1], values[-1].isoformat())
+            for values in map(palindrome_values, rows)
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, if nothing matched
+    yield buffer.getvalue()
+
+
+@api.route("/export", methods=["GET"])
+@arguments(PalindromeExportQuerySchema)
+@other_responses({200: "Every matching detection, as NDJSON or CSV."})
+def export(args):
+    """Download every detection matching the filters, in one streamed response"""
+    export_format = args.pop("format")
+    chunks = palindrome_service.export(PalindromeQueryDTO(**args))
+    if export_format == "csv":
+        body, mimetype = _csv(chunks), "text/csv"
+    else:
+        body, mimetype = _ndjson(chunks), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=palindromes.{export_format}"
+        },
+    )
+
+
 @api.route("/<uuid:palindrome_id>", methods=["DELETE"])
 @response(EmptySchema, 204)
+@other_responses({409: "The detection is being stored in write-behind mode."})
 def delete(palindrome_id: uuid.UUID):
     """Delete a palindrome"""
     palindrome_service.delete_by_id(palindrome_id)
     return {}
+
+
+@api.route("", methods=["DELETE"])
+@arguments(PalindromeDeleteQuerySchema)
+@response(PalindromeDeletedSchema)
+def delete_all(args):
+    """Delete every detection matching the filters"""
+    return {"deleted": palindrome_service.delete_all(PalindromeQueryDTO(**args))}
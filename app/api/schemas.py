@@ -1,4 +1,5 @@
-from marshmallow import fields, validate
+from apifairy.fields import FileField
+from marshmallow import ValidationError, fields, validate, validates_schema
 from app.extensions import ma
 
 
@@ -12,17 +13,117 @@ class HealthSchema(ma.Schema):
     )
 
 
+class ResultCacheStatsSchema(ma.Schema):
+    hits = fields.Int(metadata={"description": "Verdicts found in either tier."})
+    misses = fields.Int(metadata={"description": "Verdicts found in neither tier."})
+    evictions = fields.Int(
+        metadata={"description": "Verdicts dropped from the local LRU to make room."}
+    )
+    local_hits = fields.Int(metadata={"description": "Hits in the local LRU."})
+    shared_hits = fields.Int(
+        metadata={"description": "Hits in the shared (Redis) tier."}
+    )
+    size = fields.Int(
+        metadata={"description": "Verdicts in the local LRU of this worker."}
+    )
+    maxsize = fields.Int(metadata={"description": "Capacity of the local LRU."})
+
+
+class PoolStatsSchema(ma.Schema):
+    size = fields.Int(
+        allow_none=True,
+        metadata={"description": "Connections kept open (null without a pool)."},
+    )
+    in_use = fields.Int(
+        allow_none=True, metadata={"description": "Connections checked out."}
+    )
+    idle = fields.Int(
+        allow_none=True, metadata={"description": "Connections open in the pool."}
+    )
+    overflow = fields.Int(
+        allow_none=True,
+        metadata={"description": "Connections open on top of the pool size."},
+    )
+    checkouts = fields.Int(metadata={"description": "Connections handed over."})
+    timeouts = fields.Int(
+        metadata={"description": "Checkouts that gave up waiting for a connection."}
+    )
+    wait_seconds = fields.Float(
+        metadata={"description": "Time spent getting connections, in total."}
+    )
+    max_wait_seconds = fields.Float(
+        metadata={"description": "Longest time spent getting a connection."}
+    )
+
+
+class PoolsStatsSchema(PoolStatsSchema):
+    replicas = fields.Dict(
+        keys=fields.Str(),
+        values=fields.Nested(PoolStatsSchema),
+        metadata={
+            "description": "Metrics of the pool of each read replica, by bind name "
+            "(the ones above are those of the primary)."
+        },
+    )
+
+
+class PalindromeCountSchema(ma.Schema):
+    text = fields.Str(metadata={"description": "A palindromic substring."})
+    count = fields.Int(metadata={"description": "How many times it occurs."})
+
+
+class PalindromeAnalysisSchema(ma.Schema):
+    distinct_count = fields.Int(
+        metadata={"description": "Number of distinct palindromic substrings."}
+    )
+    most_common = fields.List(
+        fields.Nested(PalindromeCountSchema),
+        metadata={"description": "The palindromic substrings that occur most often."},
+    )
+    length_histogram = fields.Dict(
+        keys=fields.Int(),
+        values=fields.Int(),
+        metadata={"description": "Number of distinct palindromes of each length."},
+    )
+
+
+class NearPalindromeSchema(ma.Schema):
+    edits = fields.Int(
+        metadata={"description": "Fewest edits that make the text a palindrome."}
+    )
+    positions = fields.List(
+        fields.Int(),
+        metadata={
+            "description": "Offsets in the text of the characters to replace by "
+            "their mirror (substitutions) or to delete (indels)."
+        },
+    )
+
+
 class PalindromeSchema(ma.Schema):
     id = fields.UUID(
         dump_only=True,
         metadata={"description": "The unique identifier of a palindrome detection."},
     )
     text = fields.Str(
-        required=True, metadata={"description": "The text that was checked."}
+        required=True,
+        metadata={
+            "description": "The text that was checked (null for uploaded files)."
+        },
+    )
+    content_hash = fields.Str(
+        dump_only=True,
+        metadata={
+            "description": "SHA-256 of the uploaded file (null for plain texts)."
+        },
     )
     language = fields.Str(
         required=True, metadata={"description": "The language of the text."}
     )
+    mode = fields.Str(
+        dump_only=True,
+        metadata={"description": "Whether characters, words or lines were compared."},
+    )
     is_palindrome = fields.Bool(
         dump_only=True, metadata={"description": "Whether the text is a palindrome."}
     )
@@ -30,13 +131,152 @@ class PalindromeSchema(ma.Schema):
         dump_only=True,
         metadata={"description": "The date and time when the detection was created."},
     )
+    analysis = fields.Nested(
+        PalindromeAnalysisSchema,
+        dump_only=True,
+        metadata={"description": "Palindromic substrings, when requested."},
+    )
+    near_palindrome = fields.Nested(
+        NearPalindromeSchema,
+        dump_only=True,
+        allow_none=True,
+        metadata={
+            "description": "Edits needed to get a palindrome, when `max_edits` is "
+            "given. Null if more than `max_edits` are needed."
+        },
+    )
+
+
+# Texts posted as JSON, each one held in memory whole; bigger ones are uploaded
+MAX_TEXT_LENGTH = 1 << 24
+
+# Bounds of the near-palindrome check, which runs in O(text length x edits)
+MAX_EDITS = 100
+MAX_INDEL_LENGTH = 10_000
 
 
 class PalindromeCreateSchema(ma.Schema):
     text = fields.Str(
         required=True,
-        validate=validate.Length(min=1),
-        metadata={"description": "The text to check for palindrome property."},
+        validate=validate.Length(min=1, max=MAX_TEXT_LENGTH),
+        metadata={
+            "description": "The text to check for palindrome property, up to "
+            f"{MAX_TEXT_LENGTH} characters."
+        },
+    )
+    language = fields.Str(
+        required=True,
+        validate=validate.Length(equal=2),
+        metadata={
+            "description": "The language of the text (ISO 639-1 code, e.g., 'en', 'es')."
+        },
+    )
+    mode = fields.Str(
+        required=False,
+        validate=validate.OneOf(["char", "word", "line"]),
+        metadata={
+            "description": "Compare characters (default), whole words or whole lines."
+        },
+    )
+    analysis = fields.Bool(
+        required=False,
+        metadata={
+            "description": "Also count the distinct palindromic substrings of the text."
+        },
+    )
+    max_edits = fields.Int(
+        required=False,
+        validate=validate.Range(min=0, max=MAX_EDITS),
+        metadata={
+            "description": "Also check if the text is a palindrome up to this many "
+            "character edits (e.g. OCR typos)."
+        },
+    )
+    edit = fields.Str(
+        required=False,
+        validate=validate.OneOf(["substitution", "indel"]),
+        metadata={
+            "description": "Edits allowed by `max_edits`: character substitutions "
+            "(default) or insertions/deletions. Insertions/deletions are only "
+            f"checked in texts of up to {MAX_INDEL_LENGTH} characters."
+        },
+    )
+
+    @validates_schema
+    def validate_indel_length(self, data, **kwargs):
+        # The indel check keeps a (text length x edits) matrix in memory
+        if (
+            data.get("max_edits") is not None
+            and data.get("edit") == "indel"
+            and len(data.get("text", "")) > MAX_INDEL_LENGTH
+        ):
+            raise ValidationError(
+                f"Insertions/deletions are only checked in texts of up to "
+                f"{MAX_INDEL_LENGTH} characters.",
+                "edit",
+            )
+
+
+class PalindromeBatchCreateSchema(ma.Schema):
+    items = fields.List(
+        fields.Nested(PalindromeCreateSchema(only=("text", "language"))),
+        required=True,
+        validate=validate.Length(min=1, max=5000),
+        data_key="palindromes",
+        metadata={"description": "The texts to check, up to 5000."},
+    )
+
+
+class PalindromeBatchSchema(ma.Schema):
+    items = fields.List(fields.Nested(PalindromeSchema), data_key="palindromes")
+
+
+class PalindromeStatsQuerySchema(ma.Schema):
+    date_from = fields.Date(
+        required=False, metadata={"description": "Count from this day on."}
+    )
+    date_to = fields.Date(
+        required=False, metadata={"description": "Count up to this day."}
+    )
+
+
+class PalindromeCountsSchema(ma.Schema):
+    total = fields.Int(metadata={"description": "Number of detections."})
+    palindromes = fields.Int(
+        metadata={"description": "Number of detections that are palindromes."}
+    )
+    palindrome_rate = fields.Float(
+        metadata={"description": "Share of detections that are palindromes."}
+    )
+
+
+class PalindromeLanguageCountsSchema(PalindromeCountsSchema):
+    language = fields.Str(metadata={"description": "The language (ISO 639-1 code)."})
+
+
+class PalindromeDayCountsSchema(PalindromeCountsSchema):
+    day = fields.Date(metadata={"description": "The day the detections were made."})
+
+
+class PalindromeStatsSchema(PalindromeCountsSchema):
+    languages = fields.List(
+        fields.Nested(PalindromeLanguageCountsSchema),
+        metadata={"description": "Counts by language."},
+    )
+    days = fields.List(
+        fields.Nested(PalindromeDayCountsSchema),
+        metadata={"description": "Counts by day, oldest first."},
+    )
+
+
+class PalindromeUploadSchema(ma.Schema):
+    file = FileField(
+        required=True,
+        metadata={
+            "type": "string",
+            "format": "binary",
+            "description": "UTF-8 text file to check, of any size.",
+        },
     )
     language = fields.Str(
         required=True,
@@ -47,6 +287,40 @@ class PalindromeCreateSchema(ma.Schema):
     )
 
 
+class PalindromeTextSchema(ma.Schema):
+    text = fields.Str(
+        required=True,
+        validate=validate.Length(min=1),
+        metadata={"description": "The text to analyse."},
+    )
+    language = fields.Str(
+        required=False,
+        validate=validate.Length(equal=2),
+        metadata={
+            "description": "The language of the text (ISO 639-1 code, e.g., 'en', 'es')."
+        },
+    )
+
+
+class PalindromeSubstringSchema(ma.Schema):
+    text = fields.Str(
+        metadata={"description": "The longest palindromic part of the text."}
+    )
+    start = fields.Int(
+        metadata={"description": "Offset of the first character in the original text."}
+    )
+    end = fields.Int(
+        metadata={
+            "description": "Offset after the last character in the original text."
+        }
+    )
+    length = fields.Int(
+        metadata={
+            "description": "Number of letters and digits in the palindromic part."
+        }
+    )
+
+
 class EmptySchema(ma.Schema):
     pass
 
@@ -55,9 +329,12 @@ class PalindromeListSchema(ma.Schema):
     items = fields.List(fields.Nested(PalindromeSchema), data_key="palindromes")
     prev_url = fields.Str(dump_default=None)
     next_url = fields.Str(dump_default=None)
-    total = fields.Int()
-    pages = fields.Int()
-    page = fields.Int()
+    total = fields.Int(
+        allow_none=True,
+        metadata={"description": "Null in `keyset` pagination unless `with_total`."},
+    )
+    pages = fields.Int(allow_none=True)
+    page = fields.Int(allow_none=True)
     per_page = fields.Int()
 
 
@@ -67,12 +344,25 @@ class PalindromeQuerySchema(ma.Schema):
         validate=validate.Length(equal=2),
         metadata={"description": "Filter by language (ISO 639-1 code)."},
     )
+    mode = fields.Str(
+        required=False,
+        validate=validate.OneOf(["char", "word", "line"]),
+        metadata={"description": "Filter by detection mode."},
+    )
     date_from = fields.Date(
         required=False, metadata={"description": "Filter by creation date (from)."}
     )
     date_to = fields.Date(
         required=False, metadata={"description": "Filter by creation date (to)."}
     )
+    q = fields.Str(
+        required=False,
+        validate=validate.Length(min=1, max=255),
+        metadata={
+            "description": "Search the texts containing this one, ignoring case, "
+            "or (in Postgres) similar to it."
+        },
+    )
     page = fields.Int(load_default=1, validate=validate.Range(min=1))
     page_size = fields.Int(
         load_default=50, data_key="per_page", validate=validate.Range(min=1)
@@ -82,3 +372,56 @@ class PalindromeQuerySchema(ma.Schema):
         validate=validate.OneOf(["text", "language", "is_palindrome", "created_at"]),
     )
     order = fields.Str(load_default="desc", validate=validate.OneOf(["asc", "desc"]))
+    pagination = fields.Str(
+        required=False,
+        validate=validate.OneOf(["offset", "keyset"]),
+        metadata={
+            "description": "Page by number (`offset`, default) or by cursor "
+            "(`keyset`), which stays fast on deep pages."
+        },
+    )
+    cursor = fields.Str(
+        required=False,
+        metadata={
+            "description": "Opaque cursor of a `keyset` page, taken from "
+            "`next_url`/`prev_url`."
+        },
+    )
+    with_total = fields.Bool(
+        required=False,
+        metadata={"description": "Also count the entries in `keyset` pagination."},
+    )
+
+
+class PalindromeExportQuerySchema(PalindromeQuerySchema):
+    class Meta:
+        exclude = ("page", "page_size", "pagination", "cursor", "with_total")
+
+    format = fields.Str(
+        load_default="ndjson",
+        validate=validate.OneOf(["ndjson", "csv"]),
+        metadata={"description": "One JSON object per line (default), or CSV."},
+    )
+
+
+class PalindromeDeleteQuerySchema(PalindromeQuerySchema):
+    class Meta:
+        exclude = (
+            "page",
+            "page_size",
+            "sort",
+            "order",
+            "pagination",
+            "cursor",
+            "with_total",
+        )
+
+    @validates_schema
+    def validate_filters(self, data, **kwargs):
+        # Deleting every detection takes an explicit filter
+        if not data:
+            raise ValidationError("At least one filter is required.")
+
+
+class PalindromeDeletedSchema(ma.Schema):
+    deleted = fields.Int(metadata={"description": "Detections deleted."})
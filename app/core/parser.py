@@ -1,33 +1,1152 @@
+import heapq
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
 import unicodedata
+from array import array
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, NamedTuple, Sequence
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only missing from bare installs
+    np = None
 
-def is_palindrome(text: str) -> bool:
+logger = logging.getLogger(__name__)
+
+# Bump whenever the folding rules change so stale on-disk tables are ignored.
+FOLD_TABLE_FORMAT = 1
+# Identifies the output of `sanitize`, e.g. to key cached results by.
+NORMALIZATION_VERSION = f"{FOLD_TABLE_FORMAT}-{unicodedata.unidata_version}"
+
+# Python lowercases a capital sigma to its final form ('ς') or its medial form
+# ('σ') depending on the surrounding letters, so it cannot be folded one
+# character at a time.
+_CAPITAL_SIGMA = "Σ"
+
+
+def _fold_char(char: str) -> str:
+    """
+    Returns the sanitized form of a single character.
+
+    The result is what `char` contributes to the lowercased, NFD-normalized
+    string once combining marks (category 'Mn') and non-alphanumeric characters
+    are removed. It may be empty (punctuation, whitespace, marks) or longer than
+    one character (e.g. Hangul syllables decompose into several jamo).
+    """
+    if char < "\x80":
+        return char.lower() if char.isalnum() else ""
+
+    return "".join(
+        c
+        for c in unicodedata.normalize("NFD", char.lower())
+        if unicodedata.category(c) != "Mn" and c.isalnum()
+    )
+
+
+class FoldTable(dict):
+    """
+    Maps code points to their sanitized output, as `_fold_char` would.
+
+    Usable directly with `str.translate`. Code points that are not in the
+    table yet are folded on first use and memoized, so a partially built (or
+    empty) table is always correct, only slower.
+    """
+
+    # Dense NumPy mirror of the table, built by `is_palindrome_batch`
+    code_point_folds = None
+
+    def __missing__(self, code_point: int) -> str:
+        folded = _fold_char(chr(code_point))
+        self[code_point] = folded
+        return folded
+
+
+# The table used by the parser. It starts empty and fills itself on demand
+# until `load_fold_table` swaps in a precomputed one.
+_fold_table = FoldTable()
+
+
+def build_fold_table() -> FoldTable:
+    """
+    Precomputes the folding of every assigned code point.
+
+    Only entries that differ from the identity are stored. Unassigned,
+    private-use and surrogate code points are left to `FoldTable.__missing__`.
+    """
+    table = FoldTable()
+    for code_point in range(0x110000):
+        char = chr(code_point)
+        if unicodedata.category(char) in ("Cn", "Co", "Cs"):
+            continue
+        folded = _fold_char(char)
+        if folded != char:
+            table[code_point] = folded
+    return table
+
+
+def _fold_table_path(cache_dir: str) -> str:
+    return os.path.join(
+        cache_dir,
+        f"fold_table-v{FOLD_TABLE_FORMAT}-unicode{unicodedata.unidata_version}.json",
+    )
+
+
+def load_fold_table(cache_dir: str) -> FoldTable:
+    """
+    Loads the folding table from `cache_dir`, building and saving it if needed.
+
+    The file name is keyed by the Unicode database version, so upgrading Python
+    never reuses a stale table. The table becomes the one used by the parser.
+    """
+    global _fold_table
+
+    path = _fold_table_path(cache_dir)
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = FoldTable((int(k), v) for k, v in json.load(f).items())
+    except (OSError, ValueError):
+        table = build_fold_table()
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file first: several workers may race here.
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(table, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save fold table to '{path}': {e}")
+
+    _fold_table = table
+    _profiles.clear()
+    _token_tables.clear()
+    return table
+
+
+class FoldingProfile(NamedTuple):
+    """Language-specific folding rules, compiled on top of the generic table."""
+
+    table: FoldTable
+    # Substitutions applied to the raw text before folding, for rules that
+    # span several characters or must run before lowercasing.
+    replacements: tuple[tuple[str, str], ...] = ()
+    # Whether a capital sigma is lowercased in context before folding, which
+    # takes a pass over the whole text. Not if the table folds every sigma
+    # to the same letter anyway.
+    sigma_context: bool = True
+
+
+# Per-language exceptions to the generic folding: characters that are folded
+# differently, and substitutions applied beforehand.
+_PROFILE_RULES: dict[str, tuple[dict[str, str], tuple[tuple[str, str], ...]]] = {
+    # 'ñ' is a letter of its own, not an 'n' with a diacritic
+    "es": ({"ñ": "ñ", "Ñ": "ñ"}, (("n\u0303", "ñ"), ("N\u0303", "ñ"))),
+    "de": ({"ß": "ss", "ẞ": "ss"}, ()),
+    # Dotted and dotless i are different letters: 'I' is the capital of 'ı'
+    "tr": ({}, (("I", "ı"), ("İ", "i"))),
+    # 'ij' is a single letter, whether written as a ligature or not
+    "nl": (
+        {"ĳ": "ĳ", "Ĳ": "ĳ"},
+        (("ij", "ĳ"), ("IJ", "ĳ"), ("Ij", "ĳ"), ("iJ", "ĳ")),
+    ),
+    # Final sigma is the same letter as sigma
+    "el": ({"ς": "σ", "Σ": "σ"}, ()),
+}
+
+# Compiled profiles by language code; None holds the generic profile.
+_profiles: dict[str | None, FoldingProfile] = {}
+
+
+def get_profile(language: str | None) -> FoldingProfile:
+    """
+    Returns the folding profile for a language (ISO 639-1 code).
+
+    Languages without specific rules, or None, get the generic profile.
+    Profiles are compiled once and then looked up in constant time.
+    """
+    if language not in _PROFILE_RULES:
+        language = None
+
+    profile = _profiles.get(language)
+    if profile is None:
+        if language is None:
+            profile = FoldingProfile(_fold_table)
+        else:
+            overrides, replacements = _PROFILE_RULES[language]
+            table = FoldTable(_fold_table)
+            table.update((ord(c), folded) for c, folded in overrides.items())
+            profile = FoldingProfile(
+                table, replacements, sigma_context=_CAPITAL_SIGMA not in overrides
+            )
+        _profiles[language] = profile
+    return profile
+
+
+def _replace(text: str, profile: FoldingProfile) -> str:
+    """Applies the profile substitutions."""
+    for old, new in profile.replacements:
+        text = text.replace(old, new)
+    return text
+
+
+def _needs_lowering(text: str, profile: FoldingProfile) -> bool:
+    """Whether the text must be lowercased in context before folding."""
+    return profile.sigma_context and _CAPITAL_SIGMA in text
+
+
+def _prepare(text: str, profile: FoldingProfile) -> str:
+    """Applies the profile substitutions, then any context-dependent lowercasing."""
+    text = _replace(text, profile)
+    if _needs_lowering(text, profile):
+        text = text.lower()
+    return text
+
+
+def sanitize(text: str, language: str | None = None, mode: str = "char") -> str:
+    """
+    Returns the lowercased text without diacritics, punctuation or whitespace.
+
+    This is the string `is_palindrome` compares, built in a single
+    `str.translate` pass over the folding table of the language. In "word"
+    and "line" mode, token separators are kept (as a single space or line
+    feed) and `is_sanitized_palindrome` gives the verdict of the text.
+    """
+    profile = get_profile(language)
+    table = profile.table if mode == "char" else _token_table(language, mode)
+    return _prepare(text, profile).translate(table)
+
+
+# Detection modes: compare characters, whole words or whole lines.
+MODES = ("char", "word", "line")
+
+# Token separators of each mode, as folded by the mode's table. Line breaks
+# are the ones recognised by `str.splitlines`.
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+_SEPARATORS = {
+    "word": (" ", [chr(c) for c in range(0x3001) if chr(c).isspace()]),
+    "line": ("\n", list(_LINE_BREAKS)),
+}
+
+# Folding tables that keep token separators, by language key and mode.
+_token_tables: dict[tuple[str | None, str], FoldTable] = {}
+
+
+def _token_table(language: str | None, mode: str) -> FoldTable:
+    """Returns the folding table of the language, keeping the mode separators."""
+    key = (language if language in _PROFILE_RULES else None, mode)
+    table = _token_tables.get(key)
+    if table is None:
+        separator, chars = _SEPARATORS[mode]
+        table = FoldTable(get_profile(language).table)
+        table.update((ord(c), separator) for c in chars)
+        _token_tables[key] = table
+    return table
+
+
+def _is_token_palindrome(text: str, separator: str) -> bool:
+    """
+    Two-pointer check over the tokens of a sanitized text.
+
+    Token boundaries are found with `str.find`/`str.rfind` and tokens are
+    compared as views over a single UTF-32 copy of the text, so no string is
+    created per token.
+    """
+    data = memoryview(text.encode("utf-32-le"))
+    left, right = 0, len(text)
+    seen = False
+
+    while True:
+        while left < right and text[left] == separator:
+            left += 1
+        while right > left and text[right - 1] == separator:
+            right -= 1
+        if left == right:
+            return seen
+
+        left_end = text.find(separator, left, right)
+        if left_end == -1:
+            # A single token is left in the middle.
+            return True
+        right_start = text.rfind(separator, left, right) + 1
+
+        if left_end - left != right - right_start or (
+            data[4 * left : 4 * left_end] != data[4 * right_start : 4 * right]
+        ):
+            return False
+        seen = True
+        left, right = left_end, right_start
+
+
+def _is_ascii_palindrome(text: str) -> bool:
+    """Two-pointer check for pure-ASCII text, without touching `unicodedata`."""
+    left, right = 0, len(text) - 1
+    seen = False
+
+    while True:
+        while left <= right and not text[left].isalnum():
+            left += 1
+        while left <= right and not text[right].isalnum():
+            right -= 1
+        if left > right:
+            return seen
+        if text[left].lower() != text[right].lower():
+            return False
+        seen = True
+        left += 1
+        right -= 1
+
+
+def _is_unicode_palindrome(text: str, fold: FoldTable) -> bool:
+    """
+    Two-pointer check for arbitrary text, folding characters lazily.
+
+    Each side keeps a small buffer with the sanitized output of the last
+    character it consumed, because a single character may fold to zero or
+    several characters.
+    """
+    left, right = 0, len(text) - 1
+    left_buf, right_buf = "", ""
+    li = ri = 0
+    seen = False
+
+    while True:
+        if li == len(left_buf):
+            if left > right:
+                break
+            left_buf, li = fold[ord(text[left])], 0
+            left += 1
+            continue
+
+        if ri == len(right_buf):
+            if left > right:
+                break
+            right_buf = fold[ord(text[right])]
+            ri = 0
+            right -= 1
+            continue
+
+        if left_buf[li] != right_buf[len(right_buf) - 1 - ri]:
+            return False
+        seen = True
+        li += 1
+        ri += 1
+
+    # Every character has been consumed; what is left pending in the buffers
+    # is the middle of the sanitized text.
+    middle = left_buf[li:] + right_buf[: len(right_buf) - ri]
+    if middle:
+        return middle == middle[::-1]
+    return seen
+
+
+def is_palindrome(text: str, language: str | None = None, mode: str = "char") -> bool:
     """
     Detects if a string is a palindrome, ignoring case, punctuation, and whitespace.
 
     This implementation is designed to be language-agnostic by normalizing
     Unicode characters to handle accents and diacritics from various languages.
-    For example, 'é' is treated the same as 'e'.
+    For example, 'é' is treated the same as 'e'. Some languages have their own
+    rules (see `get_profile`): in Spanish, 'ñ' is not the same as 'n'.
+
+    The text is walked from both ends at once and the comparison stops at the
+    first mismatch, so the sanitized string is never built in full.
+
+    In "word" mode the text must read the same word by word ("fall leaves
+    after leaves fall"), and in "line" mode line by line. Words are separated
+    by whitespace; punctuation is ignored as in "char" mode.
 
     Args:
         text: The string to check.
+        language: The ISO 639-1 code of the language of the text, if known.
+        mode: What to compare: "char", "word" or "line".
 
     Returns:
         True if the text is a palindrome, False otherwise.
     """
-    # NFD (Normalization Form D) decomposes combined characters (e.g., 'é')
-    # into a base character ('e') and a combining mark (the accent).
-    # We then filter out these combining marks (category 'Mn') and any character
-    # that is not alphanumeric to create a sanitized string.
-    normalized_chars = [
-        c
-        for c in unicodedata.normalize("NFD", text.lower())
-        if unicodedata.category(c) != "Mn" and c.isalnum()
-    ]
-    sanitized_text = "".join(normalized_chars)
+    profile = get_profile(language)
+    if mode != "char":
+        sanitized = _prepare(text, profile).translate(_token_table(language, mode))
+        return _is_token_palindrome(sanitized, _SEPARATORS[mode][0])
+
+    for old, new in profile.replacements:
+        text = text.replace(old, new)
+
+    # Profiles only override non-ASCII characters.
+    if text.isascii():
+        return _is_ascii_palindrome(text)
+
+    if _needs_lowering(text, profile):
+        text = text.lower()
 
     # An empty or whitespace-only string is not considered a palindrome.
-    if not sanitized_text:
+    return _is_unicode_palindrome(text, profile.table)
+
+
+def is_sanitized_palindrome(sanitized: str, mode: str = "char") -> bool:
+    """Detects if the output of `sanitize` in the given mode is a palindrome."""
+    if mode != "char":
+        return _is_token_palindrome(sanitized, _SEPARATORS[mode][0])
+    return bool(sanitized) and sanitized == sanitized[::-1]
+
+
+# Markers used in the NumPy folding arrays, next to plain code points.
+_UNKNOWN, _DELETED, _EXPANDED = -1, -2, -3
+
+
+def _fold_code_points(code_points, table: FoldTable):
+    """
+    Folds an array of code points through a dense NumPy mirror of `table`.
+
+    Each code point maps to the code point it folds to, or to `_DELETED` or
+    `_EXPANDED` (folds to several characters). The mirror is kept on the
+    table and filled lazily with the code points seen so far.
+    """
+    if table.code_point_folds is None:
+        table.code_point_folds = np.full(0x110000, _UNKNOWN, dtype=np.int32)
+    dense = table.code_point_folds
+
+    folded = dense[code_points]
+    unknown = folded == _UNKNOWN
+    if unknown.any():
+        for code_point in np.unique(code_points[unknown]).tolist():
+            folded_char = table[code_point]
+            if len(folded_char) == 1:
+                dense[code_point] = ord(folded_char)
+            else:
+                dense[code_point] = _EXPANDED if folded_char else _DELETED
+        folded = dense[code_points]
+    return folded
+
+
+def _expand(folded, owner, code_points, positions, table: FoldTable):
+    """
+    Replaces the `_EXPANDED` markers at `positions` by all the code points
+    their characters (`code_points`) fold to, e.g. 'ß' -> 's', 's' in German.
+    """
+    unique, inverse = np.unique(code_points, return_inverse=True)
+    expansions = [table[code_point] for code_point in unique.tolist()]
+    flat = np.frombuffer("".join(expansions).encode("utf-32-le"), dtype=np.uint32)
+    sizes = np.fromiter(map(len, expansions), dtype=np.int64, count=len(expansions))
+    offsets = np.cumsum(sizes) - sizes
+
+    counts = np.ones(len(folded), dtype=np.int64)
+    counts[positions] = sizes[inverse]
+    out = np.repeat(folded, counts)
+
+    # Where each expansion starts in `out`, and each of its characters in `flat`
+    targets = (np.cumsum(counts) - counts)[positions]
+    repeats = sizes[inverse]
+    within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    out[np.repeat(targets, repeats) + within] = flat[
+        np.repeat(offsets[inverse], repeats) + within
+    ]
+    return out, np.repeat(owner, counts)
+
+
+def is_palindrome_batch(
+    texts: Sequence[str], language: str | None = None
+) -> list[bool]:
+    """
+    Detects palindromes in many strings at once.
+
+    Gives exactly the same results as calling `is_palindrome` on each text.
+    All texts are joined into a single NumPy array of code points, which is
+    folded, filtered and compared against its mirrored indices in a handful
+    of vectorized operations, so the per-string Python overhead is paid once
+    per batch. Without NumPy installed every text goes through `is_palindrome`.
+
+    Args:
+        texts: The strings to check.
+        language: The ISO 639-1 code of the language of the texts, if known.
+
+    Returns:
+        A list with the verdict for each text, in the same order.
+    """
+    if np is None or not texts:
+        return [is_palindrome(text, language) for text in texts]
+
+    profile = get_profile(language)
+    if profile.replacements:
+        texts = [_prepare(text, profile) for text in texts]
+
+    joined = "".join(texts)
+    if _needs_lowering(joined, profile):
+        texts = [text.lower() if _CAPITAL_SIGMA in text else text for text in texts]
+        joined = "".join(texts)
+
+    code_points = np.frombuffer(
+        joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+    )
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    owner = np.repeat(np.arange(len(texts)), lengths)
+
+    folded = _fold_code_points(code_points, profile.table)
+    expanded = np.flatnonzero(folded == _EXPANDED)
+    if len(expanded):
+        folded, owner = _expand(
+            folded, owner, code_points[expanded], expanded, profile.table
+        )
+    kept = folded >= 0
+    folded, owner = folded[kept], owner[kept]
+
+    # Compare every sanitized character with its mirror within the same text.
+    lengths = np.bincount(owner, minlength=len(texts))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    mirror = starts[owner] + ends[owner] - 1 - np.arange(len(folded))
+    mismatches = np.bincount(
+        owner, weights=folded != folded[mirror], minlength=len(texts)
+    )
+
+    # An empty sanitized text is not considered a palindrome.
+    return ((mismatches == 0) & (lengths > 0)).tolist()
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+# Bytes around a chunk used to lowercase a capital sigma in context
+_SIGMA_CONTEXT = 64
+
+
+def _is_continuation_byte(byte: int) -> bool:
+    return byte & 0xC0 == 0x80
+
+
+def _code_point_boundary(buffer, position: int, step: int, front: int, back: int):
+    """
+    Moves a chunk cut by `step` (1 or -1) until it falls between code points.
+
+    The cut stays within `[front, back]`. A code point has at most three
+    continuation bytes, so finding a fourth one in a row means the buffer
+    is not UTF-8: it is rejected rather than read without end.
+    """
+    moves = 0
+    while front < position < back and _is_continuation_byte(buffer[position]):
+        if moves == 3:
+            raise UnicodeDecodeError(
+                "utf-8",
+                bytes(buffer[position : position + 1]),
+                0,
+                1,
+                "too many continuation bytes",
+            )
+        position += step
+        moves += 1
+    return position
+
+
+def _splits_replacement(
+    buffer, position: int, front: int, back: int, sources: tuple[str, ...]
+) -> bool:
+    """Whether a chunk cut falls inside one of the multi-character `sources`."""
+    if not sources or position in (front, back):
         return False
+    width = 4 * max(map(len, sources))  # Bytes around the cut
+    start = _code_point_boundary(buffer, max(position - width, front), 1, front, back)
+    end = _code_point_boundary(buffer, min(position + width, back), -1, front, back)
+    before = str(buffer[start:position], "utf-8")
+    window = before + str(buffer[position:end], "utf-8")
+    cut = len(before)
+    for source in sources:
+        found = window.find(source, max(cut - len(source) + 1, 0))
+        if found != -1 and found < cut:
+            return True
+    return False
+
+
+def _chunk_cut(
+    buffer, position: int, step: int, front: int, back: int, sources: tuple[str, ...]
+) -> int:
+    """
+    Moves a chunk cut by `step` (1 or -1) to a place where it can be folded.
+
+    The cut falls between code points (see `_code_point_boundary`), and not
+    inside a sequence the folding profile replaces, e.g. an 'n' and its
+    combining tilde in Spanish: it is moved by one code point. No sequence
+    ends with a character another one starts with, so one is enough. It is
+    moved the other way if it would leave the chunk empty.
+    """
+    position = _code_point_boundary(buffer, position, step, front, back)
+    if not _splits_replacement(buffer, position, front, back, sources):
+        return position
+    moved = _code_point_boundary(buffer, position + step, step, front, back)
+    if moved == (front if step < 0 else back):
+        moved = _code_point_boundary(buffer, position - step, -step, front, back)
+    return moved
+
+
+def _fold_chunk(buffer, start: int, end: int, profile: FoldingProfile) -> str:
+    """Decodes and sanitizes `buffer[start:end]`, which must be valid UTF-8."""
+    text = _replace(str(buffer[start:end], "utf-8"), profile)
+
+    if _needs_lowering(text, profile):
+        # Lowercase the chunk along with some surrounding bytes, so a capital
+        # sigma next to a chunk boundary still gets its proper form.
+        before = max(start - _SIGMA_CONTEXT, 0)
+        while before > 0 and _is_continuation_byte(buffer[before]):
+            before -= 1
+        after = min(end + _SIGMA_CONTEXT, len(buffer))
+        while after < len(buffer) and _is_continuation_byte(buffer[after]):
+            after += 1
+        prefix = _replace(str(buffer[before:start], "utf-8"), profile)
+        suffix = _replace(str(buffer[end:after], "utf-8"), profile)
+        lowered = (prefix + text + suffix).lower()
+        # Lowercasing never changes length depending on context.
+        offset = len(prefix.lower())
+        text = lowered[offset : offset + len(text.lower())]
+
+    return text.translate(profile.table)
+
+
+def is_palindrome_stream(
+    buffer, chunk_size: int = DEFAULT_CHUNK_SIZE, language: str | None = None
+) -> bool:
+    """
+    Detects if UTF-8 encoded bytes are a palindrome, reading them by chunks.
+
+    Same rules as `is_palindrome`, but the buffer (e.g. a memory-mapped file)
+    is read in chunks from both ends at once, so memory use is bounded by
+    `chunk_size` whatever the size of the input. Chunks are cut on code point
+    boundaries and every code point is folded on its own, so a combining mark
+    separated from its base character by a chunk boundary is still dropped.
+    Chunks are never cut inside a sequence replaced by the language profile.
+
+    Args:
+        buffer: The UTF-8 bytes to check (bytes, memoryview, mmap...).
+        chunk_size: How many bytes to read at a time from each end.
+        language: The ISO 639-1 code of the language of the text, if known.
+
+    Returns:
+        True if the text is a palindrome, False otherwise.
+
+    Raises:
+        UnicodeDecodeError: If the buffer is not valid UTF-8.
+    """
+    profile = get_profile(language)
+    sources = tuple(old for old, _ in profile.replacements if len(old) > 1)
+    # A chunk must be able to hold any UTF-8 encoded code point.
+    chunk_size = max(chunk_size, 4)
+    front, back = 0, len(buffer)  # Bytes in [front, back) are not read yet
+    left_buf = right_buf = ""
+    li = ri = 0
+    seen = False
+
+    while True:
+        if li == len(left_buf):
+            if front == back:
+                break
+            end = _chunk_cut(
+                buffer, min(front + chunk_size, back), -1, front, back, sources
+            )
+            left_buf, li = _fold_chunk(buffer, front, end, profile), 0
+            front = end
+            continue
+
+        if ri == len(right_buf):
+            if front == back:
+                break
+            start = _chunk_cut(
+                buffer, max(back - chunk_size, front), 1, front, back, sources
+            )
+            right_buf, ri = _fold_chunk(buffer, start, back, profile), 0
+            back = start
+            continue
+
+        # Compare as much as both buffers hold in one go.
+        n = min(len(left_buf) - li, len(right_buf) - ri)
+        right_end = len(right_buf) - ri
+        if left_buf[li : li + n] != right_buf[right_end - n : right_end][::-1]:
+            return False
+        seen = True
+        li += n
+        ri += n
+
+    middle = left_buf[li:] + right_buf[: len(right_buf) - ri]
+    if middle:
+        return middle == middle[::-1]
+    return seen
+
+
+def is_palindrome_file(
+    file: str | os.PathLike | BinaryIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    language: str | None = None,
+) -> bool:
+    """
+    Detects if a UTF-8 encoded file is a palindrome, in constant memory.
+
+    The file is memory-mapped and read with `is_palindrome_stream`.
+
+    Args:
+        file: A path, or a binary file object backed by a real file.
+        chunk_size: How many bytes to read at a time from each end.
+        language: The ISO 639-1 code of the language of the text, if known.
+
+    Returns:
+        True if the file contents are a palindrome, False otherwise.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return is_palindrome_file(f, chunk_size, language)
+
+    if os.fstat(file.fileno()).st_size == 0:
+        return False
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return is_palindrome_stream(buffer, chunk_size, language)
+
+
+# Process pool used by `is_palindrome_parallel`, one per (forked) process.
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _forget_executor():
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+# A forked child cannot use the pool (or a held lock) of its parent.
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+def get_executor(
+    max_workers: int, fold_table_dir: str | None = None
+) -> ProcessPoolExecutor:
+    """
+    Returns the process pool of the current process, starting it on first use.
+
+    The pool lives as long as the process, so its workers are only started
+    once, even by concurrent requests. They are started by a fork server:
+    forking the (multithreaded) app worker itself could deadlock them on a
+    lock held by another thread. Workers therefore do not inherit the folding
+    table, and load it from `fold_table_dir` if given (see `load_fold_table`).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=load_fold_table if fold_table_dir else None,
+                initargs=(fold_table_dir,) if fold_table_dir else (),
+            )
+        return _executor
+
+
+def _fold_pair(left: str, right: str, language: str | None) -> tuple[str, str]:
+    """Folds a segment from the start of a text and its mirror from the end."""
+    table = get_profile(language).table
+    return left.translate(table), right.translate(table)
+
+
+def is_palindrome_parallel(
+    text: str,
+    executor: Executor,
+    language: str | None = None,
+    segments: int = 16,
+    window: int = 4,
+) -> bool:
+    """
+    Detects if a large string is a palindrome, splitting the work over a pool.
+
+    Same rules as `is_palindrome` in "char" mode. Each half of the text is
+    cut in `segments` pieces (every character folds on its own, so it can be
+    cut anywhere), and each task folds a piece of the first half along with
+    its mirror in the second one. Pairs are compared from the outside in as
+    they are folded, like the chunks of `is_palindrome_stream`, with at most
+    `window` pairs in flight: at the first mismatch, the folds not started
+    yet are cancelled, and only the pieces of the pairs sent are copied to
+    the pool.
+
+    Args:
+        text: The string to check.
+        executor: The pool to run on, e.g. `get_executor(...)`.
+        language: The ISO 639-1 code of the language of the text, if known.
+        segments: In how many pieces each half of the text is cut.
+        window: How many pairs of pieces are folded at once.
+
+    Returns:
+        True if the text is a palindrome, False otherwise.
+    """
+    text = _prepare(text, get_profile(language))
+    n = len(text)
+    middle = n // 2
+    # The second half holds the middle character of an odd-length text
+    size = max(-(-(n - middle) // segments), 1)
+    pairs = (
+        (
+            text[min(start, middle) : min(start + size, middle)],
+            text[max(n - start - size, middle) : n - start],
+        )
+        for start in range(0, n - middle, size)
+    )
+
+    futures = deque(
+        executor.submit(_fold_pair, left, right, language)
+        for left, right in islice(pairs, max(window, 1))
+    )
+    left_buf = right_buf = ""
+    seen = False
+    try:
+        while futures:
+            left, right = futures.popleft().result()
+            for left_piece, right_piece in islice(pairs, 1):
+                futures.append(
+                    executor.submit(_fold_pair, left_piece, right_piece, language)
+                )
+            left_buf += left
+            right_buf = right + right_buf
+
+            # Compare as much as both sides hold in one go.
+            k = min(len(left_buf), len(right_buf))
+            if left_buf[:k] != right_buf[len(right_buf) - k :][::-1]:
+                return False
+            seen = seen or k > 0
+            left_buf, right_buf = left_buf[k:], right_buf[: len(right_buf) - k]
+    finally:
+        for future in futures:
+            future.cancel()
+
+    rest = left_buf + right_buf
+    if rest:
+        return rest == rest[::-1]
+    # An empty sanitized string is not considered a palindrome.
+    return seen
+
+
+class PalindromeSpan(NamedTuple):
+    """A palindromic part of a text, located in the original (unsanitized) text."""
+
+    start: int
+    end: int
+    length: int  # Number of sanitized characters in the span
+
+
+def _sanitize_with_offsets(
+    text: str, language: str | None = None
+) -> tuple[str, list[int]]:
+    """
+    Sanitizes `text` like `sanitize`, also returning where each character came from.
+
+    Returns:
+        The sanitized text and, for each of its characters, the index of the
+        character of `text` it was folded from.
+    """
+    profile = get_profile(language)
+    fold = profile.table
+    lowered = text.lower() if _needs_lowering(text, profile) else None
+    offset = 0
+    chars: list[str] = []
+    sources: list[int] = []
+
+    i = 0
+    while i < len(text):
+        for old, new in profile.replacements:
+            if text.startswith(old, i):
+                folded, width = "".join(fold[ord(c)] for c in new), len(old)
+                break
+        else:
+            folded, width = None, 1
+
+        if lowered is not None:
+            # Lowercasing a single character gives the same length as it does
+            # in context, so `offset` tracks `text[i]` inside `lowered`.
+            lower_width = sum(len(c.lower()) for c in text[i : i + width])
+            if folded is None:
+                folded = "".join(
+                    fold[ord(c)] for c in lowered[offset : offset + lower_width]
+                )
+            offset += lower_width
+        elif folded is None:
+            folded = fold[ord(text[i])]
+
+        for c in folded:
+            chars.append(c)
+            sources.append(i)
+        i += width
+
+    return "".join(chars), sources
+
+
+def _manacher(text: str) -> tuple[int, int]:
+    """
+    Finds the longest palindromic substring of `text` in linear time.
+
+    Returns:
+        The start and end (exclusive) of the leftmost longest palindrome.
+    """
+    # Interleave separators so that even and odd palindromes are both centred
+    # on a character: "abba" becomes "^#a#b#b#a#$".
+    padded = "^#" + "#".join(text) + "#$"
+    radius = [0] * len(padded)
+    center = right = 0
+
+    for i in range(1, len(padded) - 1):
+        if i < right:
+            radius[i] = min(right - i, radius[2 * center - i])
+        while padded[i + radius[i] + 1] == padded[i - radius[i] - 1]:
+            radius[i] += 1
+        if i + radius[i] > right:
+            center, right = i, i + radius[i]
+
+    best = max(range(len(padded)), key=radius.__getitem__)
+    start = (best - radius[best]) // 2
+    return start, start + radius[best]
+
+
+def longest_palindrome(text: str, language: str | None = None) -> PalindromeSpan | None:
+    """
+    Finds the longest palindromic part of a text, in linear time.
+
+    Uses the same rules as `is_palindrome`: case, punctuation, whitespace and
+    diacritics are ignored, and the profile of the language applies. The span
+    is mapped back to the original text, and includes any combining marks
+    attached to its last character.
+
+    Args:
+        text: The string to analyse.
+        language: The ISO 639-1 code of the language of the text, if known.
+
+    Returns:
+        The leftmost longest palindromic span, or None if the text has no
+        letters or digits.
+    """
+    sanitized, sources = _sanitize_with_offsets(text, language)
+    if not sanitized:
+        return None
+
+    start, end = _manacher(sanitized)
+    # The last character may come from a sequence the profile replaces
+    last = sources[end - 1]
+    width = next(
+        (
+            len(old)
+            for old, _ in get_profile(language).replacements
+            if text.startswith(old, last)
+        ),
+        1,
+    )
+    original_start, original_end = sources[start], last + width
+    while original_end < len(text) and unicodedata.category(text[original_end]) == "Mn":
+        original_end += 1
+
+    return PalindromeSpan(original_start, original_end, end - start)
+
+
+class PalindromeStats(NamedTuple):
+    """Statistics about the palindromic substrings of a sanitized text."""
+
+    distinct_count: int
+    most_common: list[tuple[str, int]]  # (palindrome, occurrences), most first
+    length_histogram: dict[int, int]  # length -> number of distinct palindromes
+
+
+def palindrome_stats(
+    text: str, top: int = 10, language: str | None = None
+) -> PalindromeStats:
+    """
+    Analyses all the palindromic substrings of a text in a single linear pass.
+
+    The text is sanitized with the same rules as `is_palindrome`, then fed to
+    a palindromic tree (eertree). Each node of the tree is a distinct
+    palindrome; nodes live in flat arrays and their edges in one dictionary
+    keyed by node and character, so no per-node objects are created.
+
+    Args:
+        text: The string to analyse.
+        top: How many of the most frequent palindromes to return.
+        language: The ISO 639-1 code of the language of the text, if known.
+
+    Returns:
+        The number of distinct palindromic substrings, the `top` ones that
+        occur most often (longest first on ties) and how many distinct
+        palindromes there are of each length.
+    """
+    sanitized = sanitize(text, language)
+
+    # Node 0 is the imaginary root of length -1, node 1 the empty palindrome.
+    length = array("l", [-1, 0])
+    suffix_link = array("l", [0, 0])
+    end = array("l", [0, 0])  # Where the first occurrence of each node ends
+    occurrences = array("l", [0, 0])
+    edges: dict[int, int] = {}
+    last = 1
+
+    for i, char in enumerate(sanitized):
+        code_point = ord(char)
+
+        node = last
+        while i - length[node] - 1 < 0 or sanitized[i - length[node] - 1] != char:
+            node = suffix_link[node]
+
+        edge = node * 0x110000 + code_point
+        if edge in edges:
+            last = edges[edge]
+            occurrences[last] += 1
+            continue
+
+        if length[node] == -1:
+            link = 1
+        else:
+            link = suffix_link[node]
+            while i - length[link] - 1 < 0 or sanitized[i - length[link] - 1] != char:
+                link = suffix_link[link]
+            link = edges[link * 0x110000 + code_point]
+
+        last = len(length)
+        edges[edge] = last
+        length.append(length[node] + 2)
+        suffix_link.append(link)
+        end.append(i)
+        occurrences.append(1)
+
+    # Every occurrence of a palindrome is also an occurrence of its suffix
+    # palindromes; children are always created after their suffix links.
+    for node in range(len(length) - 1, 1, -1):
+        occurrences[suffix_link[node]] += occurrences[node]
+
+    nodes = range(2, len(length))
+    most_common = [
+        (sanitized[end[node] - length[node] + 1 : end[node] + 1], occurrences[node])
+        for node in heapq.nlargest(
+            top, nodes, key=lambda node: (occurrences[node], length[node])
+        )
+    ]
+    length_histogram: dict[int, int] = {}
+    for node in nodes:
+        length_histogram[length[node]] = length_histogram.get(length[node], 0) + 1
+
+    return PalindromeStats(
+        len(nodes), most_common, dict(sorted(length_histogram.items()))
+    )
+
+
+class NearPalindrome(NamedTuple):
+    """How far a text is from being a palindrome."""
+
+    edits: int
+    positions: list[int]  # Offsets in the original text of the edited characters
+
+
+def _substitutions(text: str, max_edits: int) -> list[int] | None:
+    """Indices of the left character of each mismatched pair, or None if too many."""
+    positions = []
+    for i in range(len(text) // 2):
+        if text[i] != text[-1 - i]:
+            if len(positions) == max_edits:
+                return None
+            positions.append(i)
+    return positions
+
+
+def _deletions(text: str, max_edits: int) -> list[int] | None:
+    """
+    Indices of the fewest characters to delete to get a palindrome, or None if
+    more than `max_edits` are needed.
+
+    Deleting k characters leaves a palindrome exactly when the insert/delete
+    edit distance between the text and its reverse is 2k, so only the
+    diagonal band of width 2 * `max_edits` of that distance matrix is needed:
+    O(n * k) time and memory. Deleting every character but one always leaves
+    a palindrome, so the band never needs to be wider than the text.
+    """
+    n, reverse = len(text), text[::-1]
+    band = 2 * min(max_edits, n)
+    width = 2 * band + 1
+    unreachable = band + 1
+    # rows[i][j - i + band] is the distance between text[:i] and reverse[:j].
+    rows = [[unreachable] * width for _ in range(n + 1)]
+    for j in range(min(n, band) + 1):
+        rows[0][j + band] = j
+
+    for i in range(1, n + 1):
+        row, previous = rows[i], rows[i - 1]
+        for j in range(max(0, i - band), min(n, i + band) + 1):
+            k = j - i + band
+            if j == 0:
+                row[k] = i
+                continue
+            best = unreachable
+            if text[i - 1] == reverse[j - 1]:
+                best = previous[k]
+            if k + 1 < width:
+                best = min(best, previous[k + 1] + 1)
+            if k > 0:
+                best = min(best, row[k - 1] + 1)
+            row[k] = min(best, unreachable)
+        if min(row) > band:
+            return None
+
+    if rows[n][band] > band:
+        return None
+
+    # Trace back one longest common subsequence of the text and its reverse.
+    pairs = []
+    i = j = n
+    while i > 0 or j > 0:
+        k = j - i + band
+        if (
+            i > 0
+            and j > 0
+            and text[i - 1] == reverse[j - 1]
+            and rows[i][k] == rows[i - 1][k]
+        ):
+            pairs.append((i - 1, n - j))
+            i, j = i - 1, j - 1
+        elif i > 0 and k + 1 < width and rows[i][k] == rows[i - 1][k + 1] + 1:
+            i -= 1
+        else:
+            j -= 1
+    pairs.reverse()
+
+    # Its first half, mirrored, is a longest palindromic subsequence.
+    kept = {left for left, _ in pairs[: (len(pairs) + 1) // 2]}
+    kept.update(right for _, right in pairs[: len(pairs) // 2])
+    return [i for i in range(n) if i not in kept]
+
+
+def near_palindrome(
+    text: str,
+    max_edits: int,
+    edit: str = "substitution",
+    language: str | None = None,
+) -> NearPalindrome | None:
+    """
+    Detects if a text is a palindrome up to a few edits, e.g. OCR typos.
+
+    Edits are counted on the sanitized text, with the same rules as
+    `is_palindrome`. With "substitution" edits each mismatched pair of
+    characters costs one edit; with "indel" edits characters may be deleted
+    (or, equivalently, inserted). Both run in O(n * max_edits) and give up as
+    soon as the budget is exceeded.
+
+    Args:
+        text: The string to check.
+        max_edits: The largest number of edits allowed.
+        edit: The kind of edits allowed: "substitution" or "indel".
+        language: The ISO 639-1 code of the language of the text, if known.
+
+    Returns:
+        The minimal number of edits and the offsets in `text` of the characters
+        to replace (by their mirror) or delete, or None if the text has no
+        letters or digits or needs more than `max_edits` edits.
+    """
+    sanitized, sources = _sanitize_with_offsets(text, language)
+    if not sanitized:
+        return None
+
+    if edit == "indel":
+        positions = _deletions(sanitized, max_edits)
+    else:
+        positions = _substitutions(sanitized, max_edits)
+    if positions is None:
+        return None
 
-    return sanitized_text == sanitized_text[::-1]
+    return NearPalindrome(len(positions), [sources[i] for i in positions])
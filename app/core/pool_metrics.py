@@ -0,0 +1,79 @@
+import functools
+import threading
+import time
+import weakref
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Metrics of the database connection pools of a worker process.
+
+    Checkouts are timed by the pools made by `timed_pool`, from the request
+    of a connection until it is handed over: waiting for one to be checked
+    in, or opening a new one. They are counted by pool, so the primary and
+    each read replica get their own. The gauges are read from the pool itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # Counters by pool, dropped along with disposed pools
+            self._counters: weakref.WeakKeyDictionary[Pool, dict] = (
+                weakref.WeakKeyDictionary()
+            )
+
+    def _new_counters(self) -> dict:
+        return {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def record(self, pool: Pool, seconds: float, timed_out: bool = False):
+        with self._lock:
+            counters = self._counters.get(pool)
+            if counters is None:
+                counters = self._counters[pool] = self._new_counters()
+            counters["timeouts" if timed_out else "checkouts"] += 1
+            counters["wait_seconds"] += seconds
+            counters["max_wait_seconds"] = max(counters["max_wait_seconds"], seconds)
+
+    def stats(self, pool: Pool) -> dict:
+        """Counters of a pool of this worker process, and its gauges if it has any."""
+        gauges = {"size": None, "in_use": None, "idle": None, "overflow": None}
+        if isinstance(pool, QueuePool):
+            gauges = {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # Negative while the pool itself is not full
+                "overflow": max(pool.overflow(), 0),
+            }
+        with self._lock:
+            return {**gauges, **self._counters.get(pool, self._new_counters())}
+
+
+@functools.cache
+def timed_pool(pool_class: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Returns a subclass of a pool class that records its checkouts."""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except TimeoutError:
+                metrics.record(self, time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record(self, time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
@@ -0,0 +1,159 @@
+import itertools
+import logging
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import after_this_request, has_request_context, request
+from flask_sqlalchemy.session import Session
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+# Engine the reads of the current context go to, set by `reading()`
+_read_engine: ContextVar[Engine | None] = ContextVar("read_engine", default=None)
+
+# Cookie naming the pin of a client, set by the responses to its writes
+PIN_COOKIE = "primary_pin"
+# Where the pin of the current request is kept, once it has one
+_PIN_ENVIRON = "palindrome_detector.primary_pin"
+
+
+class RoutingSession(Session):
+    """Session sending the statements of `ReplicaRouter.reading()` to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = _read_engine.get()
+        if bind is None and engine is not None and not self._flushing:
+            return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Round-robin choice among the healthy read replicas of the database.
+
+    Each worker checks a replica with a `SELECT 1` at most every
+    `REPLICA_CHECK_INTERVAL` seconds, and marks it down as soon as it loses
+    a connection to it, until the next check. Reads go to the primary when
+    no replica is healthy, and for `REPLICA_PIN_SECONDS` after the client
+    wrote something, so it reads its own writes despite the replication
+    lag. Pins are kept in the shared cache, so they hold across workers,
+    under a random id handed to the client in a cookie: clients that do not
+    send cookies back are not pinned.
+    """
+
+    def __init__(self):
+        self.engines: list[Engine] = []
+        self.shared = None
+        self.check_interval = 5.0
+        self.pin_seconds = 10
+        self._checked: dict[Engine, tuple[float, bool]] = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engines: list[Engine], shared=None):
+        self.engines = engines
+        self.shared = shared
+        self.check_interval = app.config["REPLICA_CHECK_INTERVAL"]
+        self.pin_seconds = app.config["REPLICA_PIN_SECONDS"]
+        self._checked.clear()
+        for engine in engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            logger.warning(f"Lost the connection to the replica {context.engine.url}")
+            self._set_healthy(context.engine, False)
+
+    def _set_healthy(self, engine: Engine, healthy: bool):
+        with self._lock:
+            self._checked[engine] = (time.monotonic(), healthy)
+
+    def is_healthy(self, engine: Engine) -> bool:
+        with self._lock:
+            checked_at, healthy = self._checked.get(engine, (None, False))
+        if (
+            checked_at is not None
+            and time.monotonic() - checked_at < self.check_interval
+        ):
+            return healthy
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy = True
+        except SQLAlchemyError:
+            logger.warning(f"The replica {engine.url} is down", exc_info=True)
+            healthy = False
+        self._set_healthy(engine, healthy)
+        return healthy
+
+    def choose(self) -> Engine | None:
+        """Returns the next healthy replica, or None to read from the primary."""
+        if not self.engines or self.pinned():
+            return None
+        start = next(self._turn)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    @contextmanager
+    def reading(self):
+        """Runs the statements of the block on a replica, if one can serve them."""
+        token = _read_engine.set(self.choose())
+        try:
+            yield
+        finally:
+            _read_engine.reset(token)
+
+    def _pin_id(self) -> str | None:
+        return request.environ.get(_PIN_ENVIRON) or request.cookies.get(PIN_COOKIE)
+
+    def _pin_key(self, pin_id: str) -> str:
+        return f"palindrome:primary-pin:{pin_id}"
+
+    def pin(self):
+        """Sends the reads of the current client to the primary for a while."""
+        if not self.engines or self.shared is None or not has_request_context():
+            return
+        if _PIN_ENVIRON not in request.environ:
+            pin_id = request.cookies.get(PIN_COOKIE) or secrets.token_urlsafe(16)
+            request.environ[_PIN_ENVIRON] = pin_id
+
+            @after_this_request
+            def set_cookie(response):
+                response.set_cookie(
+                    PIN_COOKIE,
+                    pin_id,
+                    max_age=self.pin_seconds,
+                    httponly=True,
+                    samesite="Lax",
+                )
+                return response
+
+        try:
+            self.shared.set(
+                self._pin_key(self._pin_id()), True, timeout=self.pin_seconds
+            )
+        except RedisError:
+            logger.warning("Could not pin the client to the primary")
+
+    def pinned(self) -> bool:
+        """Whether the current client must read from the primary."""
+        if not self.engines or self.shared is None or not has_request_context():
+            return False
+        pin_id = self._pin_id()
+        if pin_id is None:
+            return False
+        try:
+            return bool(self.shared.get(self._pin_key(pin_id)))
+        except RedisError:
+            return False
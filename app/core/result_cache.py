@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+from app.core.parser import NORMALIZATION_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(sanitized: str, mode: str) -> str:
+    """
+    Returns the cache key of the verdict of a sanitized text.
+
+    The verdict only depends on the sanitized text and the mode (the language
+    is already applied by `sanitize`), so texts that only differ in case,
+    accents or punctuation share an entry.
+    """
+    digest = hashlib.blake2b(sanitized.encode(), digest_size=16).hexdigest()
+    return f"palindrome:verdict:{NORMALIZATION_VERSION}:{mode}:{digest}"
+
+
+COUNTERS = ("local_hits", "shared_hits", "misses", "evictions")
+
+# Counts of lookups kept by a worker before they are added to the shared tier
+FLUSH_EVERY = 100
+
+
+class ResultCache:
+    """
+    Two-tier cache of detection verdicts.
+
+    A bounded LRU in each worker process sits in front of a shared cache
+    (the cachelib backend of the app's Flask-Caching `cache`, i.e. Redis).
+    Values found in the shared tier are copied into the LRU. The shared tier
+    is optional: if it is down, the cache carries on with the LRU only.
+
+    The hit, miss and eviction counters are kept in the shared tier too, so
+    that they cover every worker. Local hits do not reach Redis, so each
+    worker counts up to `FLUSH_EVERY` lookups before adding them there.
+    """
+
+    def __init__(self, maxsize: int = 10_000, timeout: int | None = None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.shared = None
+        self._local: OrderedDict[str, bool] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTERS, 0)  # Of this worker
+        self._pending = dict.fromkeys(COUNTERS, 0)  # Not in the shared tier yet
+
+    def init_app(self, app, shared=None):
+        self.maxsize = app.config["RESULT_CACHE_SIZE"]
+        self.timeout = app.config["RESULT_CACHE_TIMEOUT"]
+        self.clear()
+        self.shared = shared
+
+    def get(self, key: str) -> bool | None:
+        """Returns the cached verdict, or None if neither tier has it."""
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+                self._count("local_hits")
+        if value is not None:
+            self._flush(FLUSH_EVERY)
+            return value
+
+        value = self._get_shared(key)
+        with self._lock:
+            self._count("misses" if value is None else "shared_hits")
+        if value is not None:
+            self._set_local(key, value)
+        # Redis is reached anyway
+        self._flush()
+        return value
+
+    def set(self, key: str, value: bool):
+        self._set_local(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, timeout=self.timeout)
+            except RedisError:
+                logger.warning("Could not write to the shared result cache")
+
+    def _get_shared(self, key: str) -> bool | None:
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(key)
+        except RedisError:
+            logger.warning("Could not read from the shared result cache")
+            return None
+
+    def _set_local(self, key: str, value: bool):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+                self._count("evictions")
+
+    def _count(self, counter: str):
+        # Called with the lock held
+        self._counts[counter] += 1
+        self._pending[counter] += 1
+
+    def _counter_key(self, counter: str) -> str:
+        return f"palindrome:verdict:stats:{counter}"
+
+    def _flush(self, threshold: int = 1):
+        """Adds the pending counts to the shared tier, once there are enough."""
+        if self.shared is None:
+            return
+        with self._lock:
+            if sum(self._pending.values()) < threshold:
+                return
+            pending = self._pending
+            self._pending = dict.fromkeys(COUNTERS, 0)
+        try:
+            for counter, delta in pending.items():
+                if delta:
+                    self.shared.inc(self._counter_key(counter), delta)
+                    pending[counter] = 0
+        except RedisError:
+            logger.warning("Could not write to the shared result cache")
+            with self._lock:
+                for counter, delta in pending.items():
+                    self._pending[counter] += delta
+
+    def _shared_counts(self) -> dict | None:
+        """The counters of all the workers, or None without a shared tier."""
+        if self.shared is None:
+            return None
+        self._flush()
+        try:
+            values = self.shared.get_many(*map(self._counter_key, COUNTERS))
+        except RedisError:
+            logger.warning("Could not read from the shared result cache")
+            return None
+        if all(value is None for value in values):
+            # Nothing counted yet, or a backend that keeps nothing (NullCache)
+            return None
+        return {counter: value or 0 for counter, value in zip(COUNTERS, values)}
+
+    def clear(self):
+        """Empties the local tier and resets the counters of this worker."""
+        self._flush()
+        with self._lock:
+            self._local.clear()
+            self._counts = dict.fromkeys(COUNTERS, 0)
+            self._pending = dict.fromkeys(COUNTERS, 0)
+
+    def stats(self) -> dict:
+        """
+        Counters of all the workers, for both tiers together and apart.
+
+        Without a shared tier, or while it is down, those of this worker. The
+        size of the LRU is always that of this worker.
+        """
+        counts = self._shared_counts() or dict(self._counts)
+        return {
+            "hits": counts["local_hits"] + counts["shared_hits"],
+            "misses": counts["misses"],
+            "evictions": counts["evictions"],
+            "local_hits": counts["local_hits"],
+            "shared_hits": counts["shared_hits"],
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+        }
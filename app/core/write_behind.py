@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_dir(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteBehindJournal:
+    """
+    Durable on-disk queue of detections not stored in the database yet.
+
+    Each row is a small JSON file named after its id, written atomically and
+    fsync'ed before the request is answered, so an accepted row survives a
+    crash of the worker. All the workers of a host share the directory:
+
+    - `pending/` holds the rows waiting to be flushed, which any worker can
+      find by id.
+    - `inflight/` holds the rows a flusher has claimed (by renaming them,
+      which only one flusher can do). They are deleted once committed, or
+      moved back to `pending/` if their flusher died before that.
+    """
+
+    def __init__(self, directory: str):
+        self.pending = os.path.join(directory, "pending")
+        self.inflight = os.path.join(directory, "inflight")
+        os.makedirs(self.pending, exist_ok=True)
+        os.makedirs(self.inflight, exist_ok=True)
+
+    def _path(self, directory: str, palindrome_id) -> str:
+        return os.path.join(directory, f"{palindrome_id}.json")
+
+    def append(self, row: dict):
+        """Queues a row (with `id` and `created_at`) for the database."""
+        data = json.dumps(
+            {
+                **row,
+                "id": str(row["id"]),
+                "created_at": row["created_at"].isoformat(),
+            }
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=self.pending, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path(self.pending, row["id"]))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _fsync_dir(self.pending)
+
+    def _load(self, path: str) -> dict:
+        with open(path, encoding="utf-8") as f:
+            row = json.load(f)
+        row["id"] = uuid.UUID(row["id"])
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+        return row
+
+    def get(self, palindrome_id) -> dict | None:
+        """Returns a row that is queued or being flushed, if any."""
+        for directory in (self.pending, self.inflight):
+            try:
+                return self._load(self._path(directory, palindrome_id))
+            except FileNotFoundError:
+                continue
+        return None
+
+    def discard(self, palindrome_id) -> dict | None:
+        """Removes a queued row before it is flushed, returning it if it was."""
+        path = self._path(self.pending, palindrome_id)
+        try:
+            row = self._load(path)
+            os.unlink(path)
+        except FileNotFoundError:
+            return None
+        return row
+
+    def claim(self, limit: int) -> list[dict]:
+        """Takes up to `limit` queued rows, oldest first, to flush them."""
+        names = sorted(
+            (
+                entry
+                for entry in os.scandir(self.pending)
+                if entry.name.endswith(".json")
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        rows = []
+        for entry in names[:limit]:
+            path = os.path.join(self.inflight, entry.name)
+            try:
+                os.rename(entry.path, path)
+            except FileNotFoundError:
+                continue  # Claimed by another worker, or discarded
+            os.utime(path)  # When it was claimed, to recover it if need be
+            rows.append(self._load(path))
+        return rows
+
+    def complete(self, rows: list[dict]):
+        """Forgets rows once they are committed to the database."""
+        for row in rows:
+            try:
+                os.unlink(self._path(self.inflight, row["id"]))
+            except FileNotFoundError:
+                pass
+
+    def recover(self, older_than: float) -> int:
+        """Queues again the rows claimed more than `older_than` seconds ago."""
+        recovered = 0
+        deadline = time.time() - older_than
+        for entry in os.scandir(self.inflight):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < deadline:
+                try:
+                    os.rename(entry.path, os.path.join(self.pending, entry.name))
+                    recovered += 1
+                except FileNotFoundError:
+                    pass
+        return recovered
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.pending) if name.endswith(".json"))
+
+
+class Flusher(threading.Thread):
+    """
+    Background thread that flushes the journal to the database.
+
+    It flushes every `interval` seconds, or as soon as this worker has
+    queued `batch_size` rows, until the journal is empty.
+    """
+
+    def __init__(self, flush, batch_size: int, interval: float):
+        super().__init__(name="write-behind-flusher", daemon=True)
+        self.flush = flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queued = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def notify(self):
+        """Counts a row queued by this worker."""
+        self.queued += 1
+        if self.queued >= self.batch_size:
+            self._wake.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.queued = 0
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception:
+                # The claimed rows are recovered and flushed again later
+                logger.exception("Could not flush the write-behind journal")
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+
+class WriteBehind:
+    """
+    Write-behind queue of detections: a journal and a flusher per worker.
+
+    Disabled unless `WRITE_BEHIND` is set. When enabled, `store` is called
+    with each batch of claimed rows, in an app context, and must commit them
+    idempotently: a batch may be stored again if its flusher died before
+    completing it.
+
+    The flusher is started by the first request a process serves, so that
+    `flask` commands (migrations, partitions...) do not start one, and a
+    process started by forking another one starts its own.
+    """
+
+    def __init__(self):
+        self.journal = None
+        self.flusher = None
+        self._app = None
+        self._store = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.journal is not None
+
+    def init_app(self, app, store):
+        directory = app.config["WRITE_BEHIND_JOURNAL_DIR"]
+        if not directory:
+            raise ValueError(
+                "WRITE_BEHIND_JOURNAL_DIR must be set to a persistent directory "
+                "to enable WRITE_BEHIND"
+            )
+        self.journal = WriteBehindJournal(directory)
+        self.batch_size = app.config["WRITE_BEHIND_BATCH_SIZE"]
+        self.interval = app.config["WRITE_BEHIND_INTERVAL"]
+        self.recover_after = app.config["WRITE_BEHIND_RECOVER_AFTER"]
+        self._app = app
+        self._store = store
+
+        # Tests flush by hand
+        if not app.testing:
+            app.before_request(self.start)
+
+    def start(self):
+        """Starts the flusher of this process, unless it is running already."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.flusher = Flusher(self.flush, self.batch_size, self.interval)
+            self.flusher.start()
+            self._pid = os.getpid()
+
+    def append(self, row: dict):
+        self.journal.append(row)
+        if self.flusher is not None:
+            self.flusher.notify()
+
+    def get(self, palindrome_id) -> dict | None:
+        return self.journal.get(palindrome_id) if self.enabled else None
+
+    def discard(self, palindrome_id) -> dict | None:
+        return self.journal.discard(palindrome_id) if self.enabled else None
+
+    def flush(self) -> int:
+        """Stores a batch of queued rows, returning how many there were."""
+        self.journal.recover(self.recover_after)
+        rows = self.journal.claim(self.batch_size)
+        if rows:
+            with self._app.app_context():
+                self._store(rows)
+            self.journal.complete(rows)
+        return len(rows)
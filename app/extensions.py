@@ -4,10 +4,19 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from flask_cors import CORS
+from app.core.pool_metrics import PoolMetrics
+from app.core.replicas import ReplicaRouter, RoutingSession
+from app.core.result_cache import ResultCache
+from app.core.write_behind import WriteBehind
 
-db = SQLAlchemy()
+# Reads can go to the replicas, see `replicas`
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 apifairy = APIFairy()
 cors = CORS()
 ma = Marshmallow()
 cache = Cache()
+result_cache = ResultCache()
+pool_metrics = PoolMetrics()
+replicas = ReplicaRouter()
+write_behind = WriteBehind()
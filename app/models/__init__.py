@@ -1,3 +1,4 @@
 from .palindrome import Palindrome
+from .palindrome_daily_count import PalindromeDailyCount
 
-__all__ = ["Palindrome"]
+__all__ = ["Palindrome", "PalindromeDailyCount"]
@@ -8,19 +8,85 @@ from sqlalchemy import (
 )
 from app.extensions import db
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
-from sqlalchemy.sql import func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import func, literal_column
+from sqlalchemy.sql.expression import FunctionElement
+
+# SQLite's CURRENT_TIMESTAMP in the format SQLAlchemy stores datetimes in
+SQLITE_NOW = "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+class now(FunctionElement):
+    """
+    The current time, as the server default of a timestamp column.
+
+    SQLite keeps datetimes as text and compares them as such, and its
+    CURRENT_TIMESTAMP has no fractional seconds: a stored '... 10:00:00'
+    sorts before the '... 10:00:00.000000' SQLAlchemy binds for the same
+    time. There, the default is written with six digits too.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(now)
+def _compile_now(element, compiler, **kw):
+    return compiler.process(func.now(), **kw)
+
+
+@compiles(now, "sqlite")
+def _compile_sqlite_now(element, compiler, **kw):
+    return SQLITE_NOW
 
 
 class Palindrome(db.Model):
+    """
+    A stored detection.
+
+    In Postgres, the table is range-partitioned by month of `created_at`, so
+    its primary key there is (id, created_at): the key of a partitioned table
+    must include the partition key. Other databases get a plain table.
+    """
+
     __tablename__ = "palindromes"
 
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    text = Column(String(255), nullable=False)
-    language = Column(String(2), nullable=False, index=True)
+    # Uploaded files are not stored: only the hash of their contents is
+    text = Column(String(255), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    language = Column(String(2), nullable=False)
     is_palindrome = Column(Boolean, nullable=False)
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    mode = Column(String(4), nullable=False, default="char", server_default="char")
+    created_at = Column(DateTime, server_default=now(), nullable=False)
+
+    # One index per filter and sort of the list endpoint, ending with the id
+    # that breaks ties between equal sort values. Uploads have no text and
+    # are sorted as an empty one.
+    __table_args__ = (
+        Index("ix_palindromes_created_at", created_at, id),
+        Index("ix_palindromes_language_created_at", language, created_at, id),
+        Index("ix_palindromes_mode_created_at", mode, created_at, id),
+        Index("ix_palindromes_text", func.coalesce(text, literal_column("''")), id),
+        Index(
+            "ix_palindromes_language_text",
+            language,
+            func.coalesce(text, literal_column("''")),
+            id,
+        ),
+        Index("ix_palindromes_language", language, id),
+        Index("ix_palindromes_is_palindrome", is_palindrome, id),
+        # Substring and fuzzy search of the texts, with pg_trgm
+        Index(
+            "ix_palindromes_text_trgm",
+            text,
+            postgresql_using="gin",
+            postgresql_ops={"text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
-    __table_args__ = (Index("idx_language", "language"),)
+    # Fetch created_at along with the INSERT, e.g. for the daily counts
+    __mapper_args__ = {"eager_defaults": True}
 
     def __repr__(self):
         return f"<Palindrome {self.text}>"
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Date, Integer, String
+from app.extensions import db
+
+
+class PalindromeDailyCount(db.Model):
+    """Rollup of the detections created each day in each language."""
+
+    __tablename__ = "palindrome_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    language = Column(String(2), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    palindromes = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PalindromeDailyCount {self.day} {self.language}: {self.total}>"
@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import math
+import time
+from types import SimpleNamespace
+from typing import NamedTuple
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from app.extensions import cache
+from app.models import Palindrome
+from .palindrome_dtos import PalindromeQueryDTO
+
+logger = logging.getLogger(__name__)
+
+# Generation of the lists that are not filtered by language.
+ALL_LANGUAGES = "*"
+
+
+def to_record(palindrome) -> SimpleNamespace:
+    """Returns the stored columns of a detection, detached from the session."""
+    return SimpleNamespace(
+        **{
+            column.key: getattr(palindrome, column.key)
+            for column in Palindrome.__table__.columns
+        }
+    )
+
+
+class Page(NamedTuple):
+    """
+    A page of detections, with the same interface as `db.paginate`.
+
+    Pages of a keyset pagination have no number, may have no total, and
+    point to their neighbours with cursors.
+    """
+
+    items: list
+    page: int | None
+    per_page: int
+    total: int | None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+    @property
+    def pages(self) -> int | None:
+        if self.total is None or self.page is None:
+            return None
+        return math.ceil(self.total / self.per_page) if self.total else 0
+
+    @property
+    def has_prev(self) -> bool:
+        if self.page is None:
+            return self.prev_cursor is not None
+        return self.page > 1
+
+    @property
+    def prev_num(self) -> int | None:
+        return self.page - 1 if self.page is not None and self.has_prev else None
+
+    @property
+    def has_next(self) -> bool:
+        if self.page is None:
+            return self.next_cursor is not None
+        return self.page < self.pages
+
+    @property
+    def next_num(self) -> int | None:
+        return self.page + 1 if self.page is not None and self.has_next else None
+
+
+class PalindromeCache:
+    """
+    Read-through cache of detections and list pages.
+
+    Detections never change once created, so they are cached by id until
+    they are deleted. Deleting one also leaves a tombstone for as long as a
+    replica may still return it (`REPLICA_PIN_SECONDS`): a detection read
+    before its deletion, or from a lagging replica, is not cached. List pages are keyed by the generation of the language
+    they are filtered by (or of all languages) and their normalized query.
+    Creating or deleting a detection bumps those generations, so stale pages
+    are never read again and simply expire, without scanning for keys.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        # The cachelib backend of the current app, which can `inc` counters
+        return self._backend if self._backend is not None else cache.cache
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def _call(self, method: str, *args, **kwargs):
+        try:
+            return getattr(self.backend, method)(*args, **kwargs)
+        except RedisError:
+            logger.warning("Could not reach the cache", exc_info=True)
+            return None
+
+    def _detail_key(self, palindrome_id) -> str:
+        return f"palindrome:detail:{palindrome_id}"
+
+    def _tombstone_key(self, palindrome_id) -> str:
+        return f"palindrome:deleted:{palindrome_id}"
+
+    def _generation_key(self, language: str | None) -> str:
+        return f"palindrome:generation:{language or ALL_LANGUAGES}"
+
+    def _generation(self, language: str | None) -> int | None:
+        """
+        Returns the list generation of a language, or None without a cache.
+
+        A missing generation (never bumped, or evicted) starts from the
+        current time in milliseconds rather than from 0, so that a value
+        already handed out as part of an entity tag is not reused.
+        """
+        key = self._generation_key(language)
+        generation = self._call("get", key)
+        if generation is None:
+            self._call("add", key, time.time_ns() // 1_000_000, timeout=0)
+            generation = self._call("get", key)
+        return generation
+
+    def _digest(self, query: PalindromeQueryDTO) -> str:
+        return hashlib.blake2b(
+            query.model_dump_json().encode(), digest_size=16
+        ).hexdigest()
+
+    def page_key(self, query: PalindromeQueryDTO) -> str:
+        """
+        Returns the key of a list page, at the current generation.
+
+        It must be computed before querying the page: if a detection is
+        created meanwhile, the page is then stored under a stale key.
+        """
+        generation = self._generation(query.language)
+        return f"palindrome:page:{generation or 0}:{self._digest(query)}"
+
+    def page_etag(self, query: PalindromeQueryDTO) -> str | None:
+        """
+        Returns the entity tag of a list page, at the current generation.
+
+        Like `page_key`, it must be computed before querying the page. None
+        if the cache is unreachable or disabled: the generations are then
+        unknown, and a tag could not change with the page.
+        """
+        generation = self._generation(query.language)
+        if generation is None:
+            return None
+        return f"{generation}-{self._digest(query)}"
+
+    def get(self, palindrome_id) -> SimpleNamespace | None:
+        record = self._call("get", self._detail_key(palindrome_id))
+        return SimpleNamespace(**record) if record else None
+
+    def set(self, record: SimpleNamespace):
+        """
+        Caches a detection, unless it was deleted since it was read.
+
+        The tombstone is checked after the write, and `evict` writes it
+        before deleting: either this finds it, or the eviction comes later.
+        """
+        key = self._detail_key(record.id)
+        self._call(
+            "set", key, vars(record), timeout=current_app.config["DETAIL_CACHE_TIMEOUT"]
+        )
+        if self._call("has", self._tombstone_key(record.id)):
+            self._call("delete", key)
+
+    def get_page(self, key: str) -> Page | None:
+        page = self._call("get", key)
+        if not page:
+            return None
+        return Page(**{**page, "items": [SimpleNamespace(**i) for i in page["items"]]})
+
+    def set_page(self, key: str, page: Page):
+        self._call(
+            "set",
+            key,
+            {**page._asdict(), "items": [vars(item) for item in page.items]},
+            timeout=current_app.config["LIST_CACHE_TIMEOUT"],
+        )
+
+    def invalidate(self, *languages: str):
+        """Bumps the list generations of the given languages and of all of them."""
+        for language in {*languages, None}:
+            self._call("inc", self._generation_key(language))
+
+    def evict(self, *palindrome_ids):
+        """Drops deleted detections, and keeps them from being cached again."""
+        self._call(
+            "set_many",
+            dict.fromkeys(map(self._tombstone_key, palindrome_ids), True),
+            # At least as long as a read that raced the deletion (0 never expires)
+            timeout=max(current_app.config["REPLICA_PIN_SECONDS"], 1),
+        )
+        self._call("delete_many", *map(self._detail_key, palindrome_ids))
+
+
+palindrome_cache = PalindromeCache()
@@ -5,17 +5,51 @@ from pydantic import BaseModel, Field, StringConstraints
 
 
 class PalindromeCreateDTO(BaseModel):
-    text: str
+    text: Annotated[str, StringConstraints(max_length=1 << 24)]
+    language: Annotated[str, StringConstraints(min_length=2, max_length=2)]
+    mode: Literal["char", "word", "line"] = "char"
+    analysis: bool = False
+    max_edits: int | None = Field(default=None, ge=0, le=100)
+    edit: Literal["substitution", "indel"] = "substitution"
+
+
+class PalindromeBatchItemDTO(BaseModel):
+    text: Annotated[str, StringConstraints(max_length=1 << 24)]
+    language: Annotated[str, StringConstraints(min_length=2, max_length=2)]
+
+
+class PalindromeBatchDTO(BaseModel):
+    items: list[PalindromeBatchItemDTO] = Field(min_length=1, max_length=5000)
+
+
+class PalindromeUploadDTO(BaseModel):
     language: Annotated[str, StringConstraints(min_length=2, max_length=2)]
 
 
+class PalindromeTextDTO(BaseModel):
+    text: str
+    language: Annotated[str, StringConstraints(min_length=2, max_length=2)] | None = (
+        None
+    )
+
+
 class PalindromeQueryDTO(BaseModel):
     language: Annotated[str, StringConstraints(min_length=2, max_length=2)] | None = (
         None
     )
+    mode: Literal["char", "word", "line"] | None = None
     date_from: date | None = None
     date_to: date | None = None
+    q: Annotated[str, StringConstraints(min_length=1, max_length=255)] | None = None
     page: int = Field(default=1, gt=0)
     page_size: int = Field(default=50, gt=0)
     sort: Literal["text", "language", "is_palindrome", "created_at"] = "created_at"
     order: Literal["asc", "desc"] = "desc"
+    pagination: Literal["offset", "keyset"] = "offset"
+    cursor: str | None = None
+    with_total: bool = False
+
+
+class PalindromeStatsQueryDTO(BaseModel):
+    date_from: date | None = None
+    date_to: date | None = None
@@ -0,0 +1,170 @@
+import logging
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import delete, func, select, text
+
+from app.extensions import db
+from app.models import Palindrome, PalindromeDailyCount
+from .palindrome_cache import palindrome_cache
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = "palindromes_%Y_%m"
+DEFAULT_PARTITION = "palindromes_default"
+
+
+def add_months(month: date, months: int) -> date:
+    """Returns the first day of the month `months` after (or before) `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class PalindromePartitions:
+    """
+    Maintenance of the monthly partitions of the palindromes table.
+
+    In Postgres, the table is range-partitioned by `created_at`, one
+    partition per month (see the partitioning migration). Partitions are
+    created a few months ahead, and retention drops whole partitions instead
+    of deleting rows. Detections of a month without a partition go to a
+    default partition, and are moved to their own when it is created. Other
+    databases (SQLite in tests) have a plain table: there is nothing to
+    create, and retention deletes rows.
+    """
+
+    def is_partitioned(self) -> bool:
+        if db.session.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(
+            db.session.scalar(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table "
+                    "WHERE partrelid = to_regclass('palindromes')"
+                )
+            )
+        )
+
+    def months(self) -> list[date]:
+        """Returns the months that have a partition, in order."""
+        names = db.session.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'palindromes'::regclass "
+                "AND child.relname <> :default"
+            ),
+            {"default": DEFAULT_PARTITION},
+        )
+        return sorted(datetime.strptime(name, PARTITION_NAME).date() for name in names)
+
+    def create(self, months_ahead: int | None = None, today: date | None = None):
+        """
+        Creates the partitions of this month and of the next `months_ahead`.
+
+        Returns the months whose partition was created, if any.
+        """
+        if months_ahead is None:
+            months_ahead = current_app.config["PARTITION_MONTHS_AHEAD"]
+        if not self.is_partitioned():
+            return []
+
+        this_month = (today or date.today()).replace(day=1)
+        existing = set(self.months())
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(this_month, offset)
+            if month in existing:
+                continue
+            self._create_partition(month)
+            created.append(month)
+        db.session.commit()
+        if created:
+            logger.info(f"Created the palindromes partitions of {created}")
+        return created
+
+    def _create_partition(self, month: date):
+        """
+        Creates the partition of `month`, moving its detections into it.
+
+        Postgres does not create a partition for values the default partition
+        holds, so they are set aside in a temporary table meanwhile.
+        """
+        in_month = f"created_at >= '{month}' AND created_at < '{add_months(month, 1)}'"
+        moved = db.session.scalar(
+            text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month} LIMIT 1")
+        )
+        if moved:
+            db.session.execute(
+                text(
+                    "CREATE TEMPORARY TABLE palindromes_moved ON COMMIT DROP AS "
+                    f"SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"
+                )
+            )
+            db.session.execute(
+                text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}")
+            )
+        db.session.execute(
+            text(
+                f'CREATE TABLE "{month:{PARTITION_NAME}}" PARTITION OF palindromes '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+        )
+        if moved:
+            db.session.execute(
+                text("INSERT INTO palindromes SELECT * FROM palindromes_moved")
+            )
+            db.session.execute(text("DROP TABLE palindromes_moved"))
+            logger.warning(
+                f"Moved the detections of {month:%Y-%m} out of {DEFAULT_PARTITION}"
+            )
+
+    def apply_retention(
+        self, months: int | None = None, today: date | None = None
+    ) -> int:
+        """
+        Removes the detections older than the last `months` whole months.
+
+        The current month is always kept. Returns the number of detections
+        removed, as counted by the daily counts, which are removed with them.
+        Detections cached by id are not evicted, and expire on their own.
+        """
+        if months is None:
+            months = current_app.config["RETENTION_MONTHS"]
+        if not months:
+            return 0
+        cutoff = add_months((today or date.today()).replace(day=1), -months)
+
+        old_counts = PalindromeDailyCount.day < cutoff
+        removed, languages = 0, []
+        for language, total in db.session.execute(
+            select(PalindromeDailyCount.language, func.sum(PalindromeDailyCount.total))
+            .where(old_counts)
+            .group_by(PalindromeDailyCount.language)
+        ):
+            removed += total
+            languages.append(language)
+
+        if self.is_partitioned():
+            for month in self.months():
+                if month < cutoff:
+                    db.session.execute(text(f'DROP TABLE "{month:{PARTITION_NAME}}"'))
+            db.session.execute(
+                text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < :cutoff"),
+                {"cutoff": cutoff},
+            )
+        else:
+            db.session.execute(
+                delete(Palindrome).where(
+                    Palindrome.created_at
+                    < datetime.combine(cutoff, datetime.min.time())
+                )
+            )
+        db.session.execute(delete(PalindromeDailyCount).where(old_counts))
+        db.session.commit()
+        palindrome_cache.invalidate(*languages)
+        logger.info(f"Removed {removed} detections created before {cutoff}")
+        return removed
+
+
+palindrome_partitions = PalindromePartitions()
@@ -1,69 +1,685 @@
+import base64
+import hashlib
+import io
+import json
+import mmap
+import os
 import uuid
-from datetime import datetime, time
-from sqlalchemy import select
-from app.core.parser import is_palindrome
-from app.extensions import db
-from app.models import Palindrome
-from .palindrome_dtos import PalindromeCreateDTO, PalindromeQueryDTO
+from collections import defaultdict
+from types import SimpleNamespace
+from datetime import datetime, time, timezone
+from typing import BinaryIO, Iterator, Sequence
+from flask import abort, current_app
+from sqlalchemy import (
+    Row,
+    Select,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.parser import (
+    get_executor,
+    is_palindrome_batch,
+    is_palindrome_parallel,
+    is_sanitized_palindrome,
+    is_palindrome_stream,
+    longest_palindrome,
+    near_palindrome,
+    palindrome_stats,
+    sanitize,
+)
+from app.core.result_cache import result_key
+from app.extensions import db, replicas, result_cache, write_behind
+from app.models import Palindrome, PalindromeDailyCount
+from .palindrome_cache import Page, palindrome_cache, to_record
+from .palindrome_dtos import (
+    PalindromeBatchDTO,
+    PalindromeCreateDTO,
+    PalindromeQueryDTO,
+    PalindromeStatsQueryDTO,
+    PalindromeTextDTO,
+    PalindromeUploadDTO,
+)
+
+
+def _encode_cursor(record, sort: str, order: str, forward: bool) -> str:
+    """Returns an opaque cursor pointing after (or before) a record."""
+    value = getattr(record, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif value is None:
+        value = ""  # Uploads, sorted as an empty text
+    payload = [sort, order, forward, value, str(record.id)]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+# JSON type of the sort value in a cursor, by sort
+_CURSOR_VALUE_TYPES = {
+    "text": str,
+    "language": str,
+    "is_palindrome": bool,
+    "created_at": str,
+}
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> tuple[bool, tuple]:
+    """
+    Returns the direction and (sort value, id) boundary of a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        cursor_sort, cursor_order, forward, value, palindrome_id = payload
+    except (TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor.") from error
+
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("The cursor was made for another sort or order.")
+
+    # Checked here rather than left to the database, which rejects (or
+    # casts) a value of the wrong type.
+    if (
+        not isinstance(forward, bool)
+        or not isinstance(value, _CURSOR_VALUE_TYPES[sort])
+        or not isinstance(palindrome_id, str)
+    ):
+        raise ValueError("Invalid cursor.")
+    try:
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        key = (value, uuid.UUID(palindrome_id))
+    except ValueError as error:
+        raise ValueError("Invalid cursor.") from error
+    return forward, key
+
+
+def _dialect_insert(model):
+    """Returns an INSERT of the current dialect, which can take ON CONFLICT."""
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+
+
+def _rate(total: int, palindromes: int) -> dict:
+    return {
+        "total": total,
+        "palindromes": palindromes,
+        "palindrome_rate": palindromes / total if total else 0.0,
+    }
+
+
+def _stored_text(text: str) -> dict:
+    """
+    The columns a checked text is stored in.
+
+    Texts too long for the `text` column are stored like uploads: only the
+    SHA-256 of their UTF-8 encoding is kept.
+    """
+    if len(text) <= Palindrome.text.type.length:
+        return {"text": text, "content_hash": None}
+    content_hash = hashlib.sha256(text.encode("utf-8", "surrogatepass"))
+    return {"text": None, "content_hash": content_hash.hexdigest()}
 
 
 class PalindromeService:
     def create(self, payload: PalindromeCreateDTO) -> Palindrome:
-        """Create a new palindrome entry."""
-        is_pal = is_palindrome(payload.text)
+        """
+        Create a new palindrome entry.
+
+        In write-behind mode, the entry gets its id and creation time here
+        and is only queued in the journal, to be stored later by a batch.
+        """
+        is_pal = self._detect(payload)
 
         palindrome = Palindrome(
-            text=payload.text, language=payload.language, is_palindrome=is_pal
+            **_stored_text(payload.text),
+            language=payload.language,
+            mode=payload.mode,
+            is_palindrome=is_pal,
+        )
+        # Not persisted: only returned along with the created entry. Computed
+        # first, so that a request failing here stores nothing.
+        if payload.analysis:
+            palindrome.analysis = self.analyse(payload.text, payload.language)
+        if payload.max_edits is not None:
+            near = near_palindrome(
+                payload.text, payload.max_edits, payload.edit, payload.language
+            )
+            palindrome.near_palindrome = near._asdict() if near else None
+
+        if write_behind.enabled:
+            palindrome.id = uuid.uuid4()
+            palindrome.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            write_behind.append(vars(to_record(palindrome)))
+        else:
+            db.session.add(palindrome)
+            db.session.flush()
+            self._count([palindrome])
+            db.session.commit()
+            palindrome_cache.invalidate(palindrome.language)
+            replicas.pin()
+        return palindrome
+
+    def _detect(self, payload: PalindromeCreateDTO) -> bool:
+        """
+        Detects a palindrome, on the process pool if the text is large.
+
+        Other texts go through the result cache, keyed by their sanitized
+        form, so a text seen before (even with other casing or punctuation)
+        is not checked again.
+        """
+        workers = current_app.config["PARALLEL_WORKERS"]
+        if (
+            workers
+            and payload.mode == "char"
+            and len(payload.text) >= current_app.config["PARALLEL_MIN_SIZE"]
+        ):
+            return is_palindrome_parallel(
+                payload.text,
+                get_executor(workers, current_app.config["FOLD_TABLE_CACHE_DIR"]),
+                payload.language,
+            )
+
+        sanitized = sanitize(payload.text, payload.language, payload.mode)
+        key = result_key(sanitized, payload.mode)
+        is_pal = result_cache.get(key)
+        if is_pal is None:
+            is_pal = is_sanitized_palindrome(sanitized, payload.mode)
+            result_cache.set(key, is_pal)
+        return is_pal
+
+    def create_batch(self, payload: PalindromeBatchDTO) -> list:
+        """
+        Create many palindrome entries at once.
+
+        Texts are checked in bulk, one batch per language, and all the entries
+        are inserted with a single multi-row INSERT ... RETURNING in a single
+        transaction. The inserted rows are returned in the order of the items.
+        """
+        texts_by_language = defaultdict(list)
+        for index, item in enumerate(payload.items):
+            texts_by_language[item.language].append(index)
+
+        verdicts = [False] * len(payload.items)
+        for language, indexes in texts_by_language.items():
+            texts = [payload.items[index].text for index in indexes]
+            for index, is_pal in zip(indexes, is_palindrome_batch(texts, language)):
+                verdicts[index] = is_pal
+
+        rows = [
+            {
+                **_stored_text(item.text),
+                "language": item.language,
+                "is_palindrome": is_pal,
+            }
+            for item, is_pal in zip(payload.items, verdicts)
+        ]
+        stmt = insert(Palindrome).returning(
+            *Palindrome.__table__.columns, sort_by_parameter_order=True
+        )
+        palindromes = db.session.execute(stmt, rows).all()
+        self._count(palindromes)
+        db.session.commit()
+        palindrome_cache.invalidate(*texts_by_language)
+        replicas.pin()
+        return palindromes
+
+    def store_pending(self, rows: list[dict]) -> list:
+        """
+        Store entries queued in write-behind mode, in a single transaction.
+
+        Entries already stored (by a batch replayed after a crash) are
+        skipped, and only the new ones are counted and returned.
+        """
+        stmt = (
+            _dialect_insert(Palindrome)
+            # No conflict target: in Postgres, the key also has created_at
+            .on_conflict_do_nothing().returning(*Palindrome.__table__.columns)
+        )
+        palindromes = db.session.execute(stmt, rows).all()
+        self._count(palindromes)
+        db.session.commit()
+        palindrome_cache.invalidate(*{row["language"] for row in rows})
+        return palindromes
+
+    def _count(self, palindromes, sign: int = 1):
+        """
+        Add (or with a negative sign, remove) entries to the daily counts.
+
+        The counts are upserted in the current transaction, so they are
+        committed (or rolled back) along with the entries themselves.
+        """
+        counts = defaultdict(lambda: [0, 0])
+        for palindrome in palindromes:
+            count = counts[palindrome.created_at.date(), palindrome.language]
+            count[0] += sign
+            count[1] += sign if palindrome.is_palindrome else 0
+        if not counts:
+            return
+
+        stmt = _dialect_insert(PalindromeDailyCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "language"],
+            set_={
+                "total": PalindromeDailyCount.total + stmt.excluded.total,
+                "palindromes": PalindromeDailyCount.palindromes
+                + stmt.excluded.palindromes,
+            },
+        )
+        db.session.execute(
+            stmt,
+            [
+                {"day": day, "language": language, "total": total, "palindromes": pals}
+                for (day, language), (total, pals) in counts.items()
+            ],
+        )
+
+    def get_stats(self, query_params: PalindromeStatsQueryDTO) -> dict:
+        """
+        Count the entries, overall, by language and by day.
+
+        Counts are read from the daily rollup kept by the write paths, so the
+        cost depends on the number of days and languages, not of entries.
+        They are read from a replica when possible.
+        """
+        filters = []
+        if query_params.date_from:
+            filters.append(PalindromeDailyCount.day >= query_params.date_from)
+        if query_params.date_to:
+            filters.append(PalindromeDailyCount.day <= query_params.date_to)
+
+        def count_by(column):
+            stmt = (
+                select(
+                    column,
+                    func.sum(PalindromeDailyCount.total),
+                    func.sum(PalindromeDailyCount.palindromes),
+                )
+                .where(*filters)
+                .group_by(column)
+                .order_by(column)
+            )
+            return [
+                {column.key: value, **_rate(total, palindromes)}
+                for value, total, palindromes in db.session.execute(stmt)
+                if total
+            ]
+
+        with replicas.reading():
+            languages = count_by(PalindromeDailyCount.language)
+            days = count_by(PalindromeDailyCount.day)
+        return {
+            **_rate(
+                sum(language["total"] for language in languages),
+                sum(language["palindromes"] for language in languages),
+            ),
+            "languages": languages,
+            "days": days,
+        }
+
+    def create_from_upload(self, payload: PalindromeUploadDTO, file: BinaryIO):
+        """
+        Create a palindrome entry from an uploaded file of any size.
+
+        The file is memory-mapped when possible and read by chunks, so memory
+        use does not depend on its size. Only the SHA-256 of its contents is
+        stored, not the text itself.
+        """
+        chunk_size = current_app.config["STREAM_CHUNK_SIZE"]
+
+        try:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            buffer = (
+                mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+            )
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Small uploads are kept in memory and have no file descriptor
+            file.seek(0)
+            buffer = file.read()
+
+        try:
+            content_hash = hashlib.sha256()
+            for start in range(0, len(buffer), chunk_size):
+                content_hash.update(buffer[start : start + chunk_size])
+            is_pal = is_palindrome_stream(buffer, chunk_size, payload.language)
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+        palindrome = Palindrome(
+            text=None,
+            content_hash=content_hash.hexdigest(),
+            language=payload.language,
+            is_palindrome=is_pal,
         )
         db.session.add(palindrome)
+        db.session.flush()
+        self._count([palindrome])
         db.session.commit()
+        palindrome_cache.invalidate(palindrome.language)
+        replicas.pin()
         return palindrome
 
-    def get_by_id(self, palindrome_id: uuid.UUID) -> Palindrome:
-        """Retrieve a palindrome by its ID."""
-        return db.get_or_404(Palindrome, palindrome_id)
+    def analyse(self, text: str, language: str | None = None) -> dict:
+        """Count the distinct palindromic substrings of a text."""
+        stats = palindrome_stats(text, language=language)
+        return {
+            "distinct_count": stats.distinct_count,
+            "most_common": [
+                {"text": palindrome, "count": count}
+                for palindrome, count in stats.most_common
+            ],
+            "length_histogram": stats.length_histogram,
+        }
+
+    def find_longest(self, payload: PalindromeTextDTO) -> dict:
+        """Find the longest palindromic part of a text, without storing it."""
+        span = longest_palindrome(payload.text, payload.language)
+        if span is None:
+            return {"text": "", "start": 0, "end": 0, "length": 0}
+
+        return {
+            "text": payload.text[span.start : span.end],
+            "start": span.start,
+            "end": span.end,
+            "length": span.length,
+        }
+
+    def get_by_id(self, palindrome_id: uuid.UUID):
+        """
+        Retrieve a palindrome by its ID, from the cache when possible.
+
+        Entries still in the write-behind journal are read from it. It is
+        read before the database: an entry leaves it once stored. Others
+        are read from a replica when possible.
+        """
+        record = palindrome_cache.get(palindrome_id)
+        if record is not None:
+            return record
+
+        row = write_behind.get(palindrome_id)
+        if row is not None:
+            return SimpleNamespace(**row)
+
+        with replicas.reading():
+            record = to_record(db.get_or_404(Palindrome, palindrome_id))
+        palindrome_cache.set(record)
+        return record
+
+    def get_all(self, query_params: PalindromeQueryDTO) -> Page:
+        """
+        Retrieve a page of palindrome entries, from the cache when possible.
+
+        Pages are read from a replica when possible. Clients pinned to the
+        primary skip the cache, which may hold a page read from a replica
+        that did not have their last write yet.
+        """
+        key = palindrome_cache.page_key(query_params)
+        page = None if replicas.pinned() else palindrome_cache.get_page(key)
+        if page is None:
+            with replicas.reading():
+                page = self._paginate(query_params)
+            palindrome_cache.set_page(key, page)
+        return page
+
+    def page_etag(self, query_params: PalindromeQueryDTO) -> str | None:
+        """
+        Entity tag of a page of palindrome entries, without querying it.
 
-    def get_all(self, query_params: PalindromeQueryDTO):
-        """Retrieve a query for all palindrome entries, with optional filters."""
-        stmt = select(Palindrome)
+        It changes whenever a detection of the page's language is created
+        or deleted. With read replicas, a page read right after a write may
+        miss it, so the tag also changes every `LIST_CACHE_TIMEOUT` seconds,
+        the longest a stale page is cached. None without a cache.
+        """
+        etag = palindrome_cache.page_etag(query_params)
+        if etag is None or not replicas.engines:
+            return etag
+        now = datetime.now(timezone.utc).timestamp()
+        period = int(now) // current_app.config["LIST_CACHE_TIMEOUT"]
+        return f"{etag}-{period}"
+
+    def _filters(self, query_params: PalindromeQueryDTO) -> list:
+        """Conditions on palindrome entries for the filters of a query."""
+        filters = []
 
         if query_params.language:
-            stmt = stmt.where(Palindrome.language == query_params.language)
+            filters.append(Palindrome.language == query_params.language)
+
+        if query_params.mode:
+            filters.append(Palindrome.mode == query_params.mode)
 
         if query_params.date_from:
-            stmt = stmt.where(
+            filters.append(
                 Palindrome.created_at
                 >= datetime.combine(query_params.date_from, time.min)
             )
 
         if query_params.date_to:
-            stmt = stmt.where(
+            filters.append(
                 Palindrome.created_at
                 <= datetime.combine(query_params.date_to, time.max)
             )
 
-        if query_params.sort:
-            sort_column = getattr(Palindrome, query_params.sort, None)
-            if sort_column:
-                if query_params.order == "asc":
-                    stmt = stmt.order_by(sort_column.asc())
-                else:
-                    stmt = stmt.order_by(sort_column.desc())
-        else:
-            stmt = stmt.order_by(Palindrome.created_at.desc())
+        if query_params.q:
+            filters.append(self._search(query_params.q))
+
+        return filters
+
+    def _search(self, q: str):
+        """
+        Condition on the texts containing `q` (ignoring case) or similar to it.
+
+        In Postgres, both the ILIKE and the pg_trgm similarity (`%`) are served
+        by the trigram GIN index of the text. Other databases only search for
+        the substring, with a scan.
+        """
+        contains = Palindrome.text.icontains(q, autoescape=True)
+        if db.session.get_bind().dialect.name != "postgresql":
+            return contains
+        return or_(contains, Palindrome.text.op("%", is_comparison=True)(q))
+
+    def _sort_column(self, sort: str):
+        # Uploads have no text: sort them as an empty one. The empty text is
+        # inlined, so the expression matches the one of the index.
+        if sort == "text":
+            return func.coalesce(Palindrome.text, literal_column("''"))
+        return getattr(Palindrome, sort)
 
-        return db.paginate(
+    def _query(
+        self, query_params: PalindromeQueryDTO, key: tuple | None = None, forward=True
+    ) -> Select:
+        """
+        Select the palindrome entries of a query, filtered and sorted.
+
+        Ties are broken by id, so pages are stable and each filter and sort
+        matches one of the indexes of the table. With a (sort value, id) `key`,
+        only the entries after it are selected, or before it (in reverse
+        order) if not `forward`.
+        """
+        sort_column = self._sort_column(query_params.sort)
+        ascending = (query_params.order == "asc") == forward
+
+        stmt = select(Palindrome).where(*self._filters(query_params))
+        if key is not None:
+            boundary = tuple_(sort_column, Palindrome.id)
+            stmt = stmt.where(boundary > key if ascending else boundary < key)
+        if ascending:
+            return stmt.order_by(sort_column.asc(), Palindrome.id.asc())
+        return stmt.order_by(sort_column.desc(), Palindrome.id.desc())
+
+    def _paginate(self, query_params: PalindromeQueryDTO) -> Page:
+        """Query a page of palindrome entries, with optional filters."""
+        if query_params.pagination == "keyset":
+            return self._paginate_keyset(query_params)
+
+        stmt = self._query(query_params)
+        pagination = db.paginate(
             stmt,
             page=query_params.page,
             per_page=query_params.page_size,
             error_out=False,
         )
+        return Page(
+            items=[to_record(palindrome) for palindrome in pagination.items],
+            page=pagination.page,
+            per_page=pagination.per_page,
+            total=pagination.total,
+        )
+
+    def _paginate_keyset(self, query_params: PalindromeQueryDTO) -> Page:
+        """
+        Query the page of palindrome entries after (or before) a cursor.
+
+        Entries are sorted by the sort column and then by id, and the page
+        starts right after the (sort value, id) of the cursor, so the cost of
+        a page does not grow with its position like an OFFSET does. The
+        total is only counted when asked for.
+
+        Raises:
+            ValueError: If the cursor is not valid for this sort.
+        """
+        sort, order = query_params.sort, query_params.order
+        forward, key = True, None
+        if query_params.cursor:
+            forward, key = _decode_cursor(query_params.cursor, sort, order)
+
+        stmt = self._query(query_params, key, forward)
+        stmt = stmt.limit(query_params.page_size + 1)
+
+        rows = db.session.scalars(stmt).all()
+        more = len(rows) > query_params.page_size
+        rows = rows[: query_params.page_size]
+        if not forward:
+            rows.reverse()
+
+        # Going back, there are entries after the page: the ones we came from.
+        has_next = more if forward else bool(rows)
+        has_prev = (key is not None and bool(rows)) if forward else more
+        items = [to_record(palindrome) for palindrome in rows]
+
+        total = None
+        if query_params.with_total:
+            total = db.session.scalar(
+                select(func.count())
+                .select_from(Palindrome)
+                .where(*self._filters(query_params))
+            )
+
+        return Page(
+            items=items,
+            page=None,
+            per_page=query_params.page_size,
+            total=total,
+            next_cursor=(
+                _encode_cursor(items[-1], sort, order, True) if has_next else None
+            ),
+            prev_cursor=(
+                _encode_cursor(items[0], sort, order, False) if has_prev else None
+            ),
+        )
+
+    def export(self, query_params: PalindromeQueryDTO) -> Iterator[Sequence[Row]]:
+        """
+        Yield every palindrome entry of a query, in chunks of rows.
+
+        Rows are read through a server-side cursor (`yield_per`), a chunk at
+        a time, and are not added to the session, so memory use does not
+        depend on the number of entries. Pagination parameters are ignored.
+        Rows are read from a replica when possible.
+        """
+        stmt = self._query(query_params).with_only_columns(
+            *Palindrome.__table__.columns
+        )
+        with replicas.reading():
+            result = db.session.execute(
+                stmt,
+                execution_options={
+                    "yield_per": current_app.config["EXPORT_CHUNK_SIZE"]
+                },
+            )
+            yield from result.partitions()
 
     def delete_by_id(self, palindrome_id: uuid.UUID):
-        """Delete a palindrome entry by its ID."""
-        palindrome = db.get_or_404(Palindrome, palindrome_id)
-        db.session.delete(palindrome)
+        """
+        Delete a palindrome entry by its ID, with a single DELETE ... RETURNING.
+
+        Entries still queued in write-behind mode are dropped from the
+        journal. Entries being stored by a batch cannot be deleted yet.
+        """
+        if write_behind.discard(palindrome_id) is not None:
+            return
+        if write_behind.get(palindrome_id) is not None:
+            abort(409, "The entry is being stored, try again later.")
+
+        palindromes = self._delete(Palindrome.id == palindrome_id)
+        if not palindromes:
+            abort(404)
         db.session.commit()
+        self._forget(palindromes)
+
+    def delete_all(self, query_params: PalindromeQueryDTO) -> int:
+        """
+        Delete every palindrome entry matching the filters of a query.
+
+        Entries are deleted by chunks of at most `DELETE_CHUNK_SIZE` rows,
+        one set-based DELETE and one transaction each, so locks are held
+        briefly. Entries still queued in write-behind mode are not deleted.
+        Returns the number of entries deleted.
+        """
+        chunk_size = current_app.config["DELETE_CHUNK_SIZE"]
+        chunk = (
+            select(Palindrome.id)
+            .where(*self._filters(query_params))
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        deleted = 0
+        while True:
+            palindromes = self._delete(Palindrome.id.in_(chunk))
+            db.session.commit()
+            self._forget(palindromes)
+            deleted += len(palindromes)
+            if len(palindromes) < chunk_size:
+                return deleted
+
+    def _delete(self, condition) -> Sequence[Row]:
+        """
+        Delete the entries matching a condition, in the current transaction.
+
+        Their daily counts are decremented in the same transaction, from the
+        columns returned by the DELETE, which are returned as well.
+        """
+        stmt = (
+            delete(Palindrome)
+            .where(condition)
+            .returning(
+                Palindrome.id,
+                Palindrome.language,
+                Palindrome.is_palindrome,
+                Palindrome.created_at,
+            )
+        )
+        palindromes = db.session.execute(
+            stmt, execution_options={"synchronize_session": False}
+        ).all()
+        self._count(palindromes, sign=-1)
+        return palindromes
+
+    def _forget(self, palindromes: Sequence[Row]):
+        """Drop deleted entries from the cache, once the deletion is committed."""
+        if palindromes:
+            palindrome_cache.evict(*(palindrome.id for palindrome in palindromes))
+            palindrome_cache.invalidate(
+                *{palindrome.language for palindrome in palindromes}
+            )
+            replicas.pin()
 
 
 palindrome_service = PalindromeService()
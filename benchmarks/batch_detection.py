@@ -0,0 +1,57 @@
+"""
+Compares scalar and batch palindrome detection over a synthetic corpus.
+
+Run from the project root:
+
+    poetry run python -m benchmarks.batch_detection
+"""
+
+import random
+import timeit
+
+from app.core import parser
+from app.core.parser import is_palindrome, is_palindrome_batch
+
+CORPUS_SIZE = 100_000
+REPEAT = 5
+WORDS = ["Anita", "lava", "la", "tina", "Ésé", "reconocer", "Sátorótas", "hello"]
+
+
+def make_corpus(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = ", ".join(rng.choices(WORDS, k=rng.randint(1, 12)))
+        if rng.random() < 0.5:
+            text += text[::-1]
+        corpus.append(text)
+    return corpus
+
+
+def best_of(func) -> float:
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    corpus = make_corpus(CORPUS_SIZE)
+    assert is_palindrome_batch(corpus) == [is_palindrome(t) for t in corpus]
+
+    results = {
+        "scalar loop": best_of(lambda: [is_palindrome(t) for t in corpus]),
+        "batch": best_of(lambda: is_palindrome_batch(corpus)),
+    }
+
+    numpy, parser.np = parser.np, None
+    try:
+        results["batch (no numpy)"] = best_of(lambda: is_palindrome_batch(corpus))
+    finally:
+        parser.np = numpy
+
+    print(f"{CORPUS_SIZE} texts, best of {REPEAT} runs")
+    baseline = results["scalar loop"]
+    for name, seconds in results.items():
+        print(f"  {name:<18} {seconds * 1000:8.1f} ms  x{baseline / seconds:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
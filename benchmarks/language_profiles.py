@@ -0,0 +1,78 @@
+"""
+Compares the cost of language-specific folding profiles with the generic one.
+
+Run from the project root:
+
+    poetry run python benchmarks/language_profiles.py
+    poetry run python -m benchmarks.language_profiles
+"""
+
+import os
+import random
+import sys
+import timeit
+
+if not __package__:
+    # Run as a script: the project root is not on the path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.parser import get_profile, is_palindrome, is_palindrome_batch, sanitize
+
+CORPUS_SIZE = 20_000
+REPEAT = 5
+WORDS = {
+    "es": ["Año", "niño", "señal", "Anita", "lava", "la", "tina"],
+    "de": ["Straße", "groß", "Reliefpfeiler", "Ehe", "neben"],
+    "tr": ["Işık", "İzmir", "kayak", "ılık", "Ilık"],
+    "nl": ["IJs", "mooi", "zijn", "lijst", "Nellie"],
+    "el": ["Σοφός", "νίψον", "ἀνομήματα", "μὴ", "μόναν", "ὄψιν"],
+}
+
+
+def make_corpus(words: list[str], size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = " ".join(rng.choices(words, k=rng.randint(1, 12)))
+        if rng.random() < 0.5:
+            text += text[::-1]
+        corpus.append(text)
+    return corpus
+
+
+def best_of(func) -> float:
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    # Sanitizing always reads the whole text, so it compares the folding cost
+    # itself. Detection also depends on how soon a mismatch is found, which
+    # differs between profiles (e.g. 'ς' and 'σ' only match in Greek): a
+    # palindrome is read in full, so the palindromes found are shown too.
+    columns = ["sanitize", "+profile", "detect", "+profile", "batch", "pal", "+profile"]
+    print(f"{CORPUS_SIZE} texts per language, best of {REPEAT} runs, in ms")
+    print("      " + "".join(f"{column:>10}" for column in columns))
+    for language, words in WORDS.items():
+        corpus = make_corpus(words, CORPUS_SIZE)
+        get_profile(language)  # Compile outside of the timings
+
+        timings = [
+            best_of(lambda: [sanitize(t) for t in corpus]),
+            best_of(lambda: [sanitize(t, language) for t in corpus]),
+            best_of(lambda: [is_palindrome(t) for t in corpus]),
+            best_of(lambda: [is_palindrome(t, language) for t in corpus]),
+            best_of(lambda: is_palindrome_batch(corpus, language)),
+        ]
+        found = [
+            sum(map(is_palindrome, corpus)),
+            sum(is_palindrome(t, language) for t in corpus),
+        ]
+        print(
+            f"  {language:<4}"
+            + "".join(f"{t * 1000:10.1f}" for t in timings)
+            + "".join(f"{n:10}" for n in found)
+        )
+
+
+if __name__ == "__main__":
+    main()
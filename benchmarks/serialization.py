@@ -0,0 +1,90 @@
+"""
+Compares the cost of serializing a page of detections with marshmallow and
+with the fast path of the read endpoints (tuples of attributes and orjson).
+
+Run from the project root:
+
+    poetry run python -m benchmarks.serialization
+"""
+
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.api import serializers
+from app.api.schemas import PalindromeListSchema, PalindromeSchema
+
+PAGE_SIZE = 50
+NUMBER = 200
+REPEAT = 5
+
+
+def make_page(size: int) -> dict:
+    start = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    items = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            text=f"A man, a plan, a canal: Panama {i}",
+            content_hash=None,
+            language="en",
+            mode="char",
+            is_palindrome=i % 2 == 0,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i in range(size)
+    ]
+    return {
+        "items": items,
+        "prev_url": None,
+        "next_url": "/v1/palindromes?page=2",
+        "total": 1000,
+        "pages": 20,
+        "page": 1,
+        "per_page": size,
+    }
+
+
+def per_call(func) -> float:
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def main():
+    page = make_page(PAGE_SIZE)
+    list_schema, schema = PalindromeListSchema(), PalindromeSchema()
+
+    # What apifairy's @response does, through Flask's JSON provider
+    def marshmallow_list():
+        return json.dumps(list_schema.dump(page), separators=(",", ":"), sort_keys=True)
+
+    def marshmallow_detail():
+        return json.dumps(
+            schema.dump(page["items"][0]), separators=(",", ":"), sort_keys=True
+        )
+
+    assert json.loads(marshmallow_list()) == json.loads(
+        serializers.dumps(serializers.palindrome_list(page))
+    )
+
+    results = {
+        f"list of {PAGE_SIZE}, marshmallow": per_call(marshmallow_list),
+        f"list of {PAGE_SIZE}, fast path": per_call(
+            lambda: serializers.dumps(serializers.palindrome_list(page))
+        ),
+        "detail, marshmallow": per_call(marshmallow_detail),
+        "detail, fast path": per_call(
+            lambda: serializers.dumps(serializers.palindrome(page["items"][0]))
+        ),
+    }
+
+    encoder = "orjson" if serializers.orjson else "json (orjson is not installed)"
+    print(f"Best of {REPEAT} runs of {NUMBER} calls, fast path encoded with {encoder}")
+    baselines = list(results.values())[::2]
+    for index, (name, seconds) in enumerate(results.items()):
+        speedup = baselines[index // 2] / seconds
+        print(f"  {name:<26} {seconds * 1e6:8.1f} µs  x{speedup:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
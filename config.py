@@ -1,4 +1,35 @@
 import os
+import tempfile
+
+from sqlalchemy.pool import NullPool
+
+
+def engine_options(database_uri: str | None) -> dict:
+    """
+    Options of the database engine (and pool) of each worker.
+
+    With DB_POOL_PROFILE=pgbouncer, the app connects to PgBouncer in
+    transaction mode, which does the pooling: connections are opened on
+    checkout and closed on checkin instead of being kept by each worker.
+    SQLite keeps the defaults of Flask-SQLAlchemy.
+    """
+    if not database_uri or database_uri.startswith("sqlite"):
+        return {}
+    if os.environ.get("DB_POOL_PROFILE") == "pgbouncer":
+        return {"poolclass": NullPool}
+    return {
+        # Connections kept open, and opened on top of them under load
+        "pool_size": int(os.environ.get("DB_POOL_SIZE") or 5),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW") or 10),
+        # Seconds to wait for a connection once all are in use
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT") or 30),
+        # Seconds after which a connection is replaced, before the server
+        # or a proxy drops it
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE") or 1800),
+        # Test connections on checkout, replacing the ones that were dropped
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower()
+        in ("1", "true"),
+    }
 
 
 class Config:
@@ -8,6 +39,20 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.environ.get("SECRET_KEY") or "my-secret-key"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Read replicas of the database, as comma-separated URLs
+    REPLICA_URLS = [
+        url for url in (os.environ.get("DATABASE_REPLICA_URLS") or "").split(",") if url
+    ]
+    REPLICA_BINDS = [f"replica_{index}" for index in range(len(REPLICA_URLS))]
+    SQLALCHEMY_BINDS = {
+        key: {"url": url, **engine_options(url)}
+        for key, url in zip(REPLICA_BINDS, REPLICA_URLS)
+    }
+    # Seconds between health checks of a replica, and during which a client
+    # reads from the primary after writing, to see its writes
+    REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL") or 5)
+    REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS") or 10)
 
     # Cache settings
     CACHE_TYPE = os.environ.get("CACHE_TYPE") or "RedisCache"
@@ -18,13 +63,65 @@ class Config:
         os.environ.get("CACHE_DEFAULT_TIMEOUT") or 300
     )  # 5 minutes default
 
+    # Parser settings
+    # Directory where the precomputed Unicode folding table is cached, so
+    # workers load it at startup instead of rebuilding it.
+    FOLD_TABLE_CACHE_DIR = os.environ.get("FOLD_TABLE_CACHE_DIR") or os.path.join(
+        tempfile.gettempdir(), "palindrome-detector"
+    )
+    # Bytes read at a time from each end of an uploaded file
+    STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE") or 1 << 20)
+    # Texts of at least this many characters are checked on a process pool
+    # of PARALLEL_WORKERS processes per app worker (0 disables it)
+    PARALLEL_MIN_SIZE = int(os.environ.get("PARALLEL_MIN_SIZE") or 1 << 22)
+    PARALLEL_WORKERS = int(os.environ.get("PARALLEL_WORKERS") or 2)
+
+    # Rows fetched at a time from the database when exporting
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE") or 1000)
+    # Rows deleted per statement (and transaction) by a bulk delete
+    DELETE_CHUNK_SIZE = int(os.environ.get("DELETE_CHUNK_SIZE") or 1000)
+
+    # Partition settings
+    # Months of partitions created ahead of time by `flask create-partitions`
+    PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD") or 3)
+    # Whole months of detections kept by `flask apply-retention`, besides the
+    # current one (0 keeps them all)
+    RETENTION_MONTHS = int(os.environ.get("RETENTION_MONTHS") or 0)
+
+    # Write-behind settings
+    # Answer POST /v1/palindromes once the detection is in an on-disk journal
+    # (shared by the workers of a host), and store it in the database later.
+    # The journal must survive restarts: it is required in production.
+    WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "").lower() in ("1", "true")
+    WRITE_BEHIND_JOURNAL_DIR = os.environ.get("WRITE_BEHIND_JOURNAL_DIR")
+    # Detections stored at a time, and seconds between flushes at most
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE") or 500)
+    WRITE_BEHIND_INTERVAL = float(os.environ.get("WRITE_BEHIND_INTERVAL") or 1.0)
+    # Seconds after which a batch claimed by a dead worker is flushed again
+    WRITE_BEHIND_RECOVER_AFTER = int(os.environ.get("WRITE_BEHIND_RECOVER_AFTER") or 60)
+
+    # Result cache settings
+    # Verdicts kept in each worker's LRU, in front of the shared cache
+    RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE") or 10_000)
+    # Verdicts never change for a normalization version: keep them a day
+    RESULT_CACHE_TIMEOUT = int(os.environ.get("RESULT_CACHE_TIMEOUT") or 86_400)
+    # Detections never change either; list pages are dropped on every write
+    DETAIL_CACHE_TIMEOUT = int(os.environ.get("DETAIL_CACHE_TIMEOUT") or 86_400)
+    LIST_CACHE_TIMEOUT = int(
+        os.environ.get("LIST_CACHE_TIMEOUT") or CACHE_DEFAULT_TIMEOUT
+    )
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
     CACHE_TYPE = os.environ.get("CACHE_TYPE") or "SimpleCache"
+    WRITE_BEHIND_JOURNAL_DIR = Config.WRITE_BEHIND_JOURNAL_DIR or os.path.join(
+        tempfile.gettempdir(), "palindrome-detector", "journal"
+    )
     SQLALCHEMY_DATABASE_URI = (
         os.environ.get("DEV_DATABASE_URL") or Config.SQLALCHEMY_DATABASE_URI
     )
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 
 class ProductionConfig(Config):
@@ -42,7 +139,11 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    REPLICA_BINDS = []
+    SQLALCHEMY_BINDS = {}
     CACHE_TYPE = "NullCache"
+    FOLD_TABLE_CACHE_DIR = None  # Fold lazily instead of touching the disk
 
 
 config = {
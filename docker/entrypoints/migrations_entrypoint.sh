@@ -31,4 +31,10 @@ if [ ${exit_code} -ne 0 ]; then
   exit ${exit_code}
 fi
 
+# Create the partitions of the upcoming months, if missing
+if ! flask create-partitions; then
+  echo "Error: flask create-partitions failed."
+  exit 1
+fi
+
 echo "Migrations complete. Migration script finished." 
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""Default created_at with microseconds in SQLite
+
+Revision ID: a91c5e7d3b28
+Revises: f3b8d05a6c17
+Create Date: 2026-10-18 22:05:41.207815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91c5e7d3b28'
+down_revision = 'f3b8d05a6c17'
+branch_labels = None
+depends_on = None
+
+# The format SQLAlchemy stores datetimes in, which SQLite compares as text
+SQLITE_NOW = "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+def upgrade():
+    # Postgres stores timestamps, not text: nothing to do.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.DateTime(),
+            existing_nullable=False,
+            server_default=sa.text(SQLITE_NOW),
+        )
+    # Times stored without fractional seconds
+    op.execute(
+        "UPDATE palindromes "
+        "SET created_at = strftime('%Y-%m-%d %H:%M:%f000', created_at) "
+        "WHERE length(created_at) = 19"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.DateTime(),
+            existing_nullable=False,
+            server_default=sa.text('now()'),
+        )
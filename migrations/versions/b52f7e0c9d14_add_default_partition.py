@@ -0,0 +1,55 @@
+"""Add a default partition to the palindromes table
+
+Revision ID: b52f7e0c9d14
+Revises: a91c5e7d3b28
+Create Date: 2026-10-18 23:12:08.640273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52f7e0c9d14'
+down_revision = 'a91c5e7d3b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only Postgres partitions the table; other databases keep a plain one.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Stores the detections of months without a partition yet, instead of
+    # rejecting them; `flask create-partitions` moves them out of it.
+    op.execute('CREATE TABLE palindromes_default PARTITION OF palindromes DEFAULT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Gives the detections in the default partition monthly partitions
+    op.execute('ALTER TABLE palindromes DETACH PARTITION palindromes_default')
+    op.execute(
+        """
+        DO $$
+        DECLARE month timestamp;
+        BEGIN
+            FOR month IN SELECT DISTINCT date_trunc('month', created_at)
+                FROM palindromes_default
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF palindromes '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'palindromes_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute('INSERT INTO palindromes SELECT * FROM palindromes_default')
+    op.drop_table('palindromes_default')
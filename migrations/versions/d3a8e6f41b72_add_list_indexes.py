@@ -0,0 +1,42 @@
+"""Add composite indexes for the list filters and sorts
+
+Revision ID: d3a8e6f41b72
+Revises: 8b41e07a2c95
+Create Date: 2026-10-18 14:20:37.402815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8e6f41b72'
+down_revision = '8b41e07a2c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.drop_index('ix_palindromes_language')
+        batch_op.drop_index('idx_language')
+        batch_op.create_index('ix_palindromes_created_at', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_language_created_at', ['language', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_mode_created_at', ['mode', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_text', [sa.text("coalesce(text, '')"), 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_language_text', ['language', sa.text("coalesce(text, '')"), 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_language', ['language', 'id'], unique=False)
+        batch_op.create_index('ix_palindromes_is_palindrome', ['is_palindrome', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.drop_index('ix_palindromes_is_palindrome')
+        batch_op.drop_index('ix_palindromes_language')
+        batch_op.drop_index('ix_palindromes_language_text')
+        batch_op.drop_index('ix_palindromes_text')
+        batch_op.drop_index('ix_palindromes_mode_created_at')
+        batch_op.drop_index('ix_palindromes_language_created_at')
+        batch_op.drop_index('ix_palindromes_created_at')
+        batch_op.create_index('ix_palindromes_language', ['language'], unique=False)
+        batch_op.create_index('idx_language', ['language'], unique=False)
@@ -0,0 +1,106 @@
+"""Partition the palindromes table by month of creation
+
+Revision ID: e7a4c2d91f05
+Revises: 6c19f0b8a4d3
+Create Date: 2026-10-18 18:42:51.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a4c2d91f05'
+down_revision = '6c19f0b8a4d3'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_palindromes_created_at': 'created_at, id',
+    'ix_palindromes_language_created_at': 'language, created_at, id',
+    'ix_palindromes_mode_created_at': 'mode, created_at, id',
+    'ix_palindromes_text': "coalesce(text, ''), id",
+    'ix_palindromes_language_text': "language, coalesce(text, ''), id",
+    'ix_palindromes_language': 'language, id',
+    'ix_palindromes_is_palindrome': 'is_palindrome, id',
+}
+
+COLUMNS = (
+    'id UUID NOT NULL, '
+    'text VARCHAR(255), '
+    'content_hash VARCHAR(64), '
+    'language VARCHAR(2) NOT NULL, '
+    'is_palindrome BOOLEAN NOT NULL, '
+    "mode VARCHAR(4) DEFAULT 'char' NOT NULL, "
+    'created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL'
+)
+COLUMN_NAMES = 'id, text, content_hash, language, is_palindrome, mode, created_at'
+
+
+def _replace_table(primary_key, partition_by=''):
+    """Moves the rows to a new `palindromes` table, with the same indexes."""
+    op.execute('ALTER TABLE palindromes RENAME TO palindromes_old')
+    op.execute('ALTER INDEX palindromes_pkey RENAME TO palindromes_old_pkey')
+    for name in INDEXES:
+        op.execute(f'DROP INDEX {name}')
+
+    op.execute(
+        f'CREATE TABLE palindromes ({COLUMNS}, '
+        f'CONSTRAINT palindromes_pkey PRIMARY KEY ({primary_key})){partition_by}'
+    )
+    for name, columns in INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON palindromes ({columns})')
+
+
+def upgrade():
+    # Only Postgres partitions the table; other databases keep a plain one.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # The key of a partitioned table must include its partition key
+    _replace_table('id, created_at', ' PARTITION BY RANGE (created_at)')
+
+    # One partition per month, from the oldest detection to three months
+    # ahead; `flask create-partitions` keeps creating the upcoming ones.
+    op.execute(
+        """
+        DO $$
+        DECLARE month timestamp;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                date_trunc('month', coalesce(
+                    (SELECT min(created_at) FROM palindromes_old), localtimestamp
+                )),
+                date_trunc('month', localtimestamp) + interval '3 months',
+                interval '1 month'
+            ) LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF palindromes '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'palindromes_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(
+        f'INSERT INTO palindromes ({COLUMN_NAMES}) '
+        f'SELECT {COLUMN_NAMES} FROM palindromes_old'
+    )
+    op.drop_table('palindromes_old')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _replace_table('id')
+    op.execute(
+        f'INSERT INTO palindromes ({COLUMN_NAMES}) '
+        f'SELECT {COLUMN_NAMES} FROM palindromes_old'
+    )
+    # Drops the partitions along with it
+    op.drop_table('palindromes_old')
@@ -0,0 +1,44 @@
+"""Add a trigram index for the text search
+
+Revision ID: f3b8d05a6c17
+Revises: e7a4c2d91f05
+Create Date: 2026-10-18 20:11:06.518243
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d05a6c17'
+down_revision = 'e7a4c2d91f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is Postgres only; other databases search with a scan.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_palindromes_text_trgm',
+            ['text'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'text': 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.batch_alter_table('palindromes', schema=None) as batch_op:
+        batch_op.drop_index(
+            'ix_palindromes_text_trgm',
+            postgresql_using='gin',
+            postgresql_ops={'text': 'gin_trgm_ops'},
+        )
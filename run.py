@@ -1,5 +1,7 @@
+import click
 from app import create_app
 from flask_migrate import Migrate, upgrade
+from app.services.palindrome.palindrome_partitions import palindrome_partitions
 
 app = create_app()
 migrate = Migrate(app)
@@ -13,3 +15,20 @@ def deploy():
     """Run deployment tasks."""
     # migrate database to latest revision
     upgrade()
+    palindrome_partitions.create()
+
+
+@app.cli.command()
+@click.option("--months", type=int, help="Months ahead (PARTITION_MONTHS_AHEAD).")
+def create_partitions(months):
+    """Create the monthly partitions of the coming months."""
+    created = palindrome_partitions.create(months)
+    click.echo(f"Created {len(created)} partitions.")
+
+
+@app.cli.command()
+@click.option("--months", type=int, help="Whole months to keep (RETENTION_MONTHS).")
+def apply_retention(months):
+    """Drop the detections older than the retention period."""
+    removed = palindrome_partitions.apply_retention(months)
+    click.echo(f"Removed {removed} detections.")
@@ -1,9 +1,15 @@
+import csv
+import hashlib
+import io
 import json
 import uuid
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse, parse_qs
 import pytest
+from cachelib import SimpleCache
+from app.api.schemas import MAX_TEXT_LENGTH
 from app.models import Palindrome
+from app.services.palindrome.palindrome_cache import palindrome_cache
 
 PALINDROMES_ENDPOINT = "/v1/palindromes"
 
@@ -42,6 +48,311 @@ def test_create_palindrome(
         assert "created_at" in result
 
 
+def test_create_palindrome_by_words(test_client, db):
+    """
+    Check that word mode compares whole words and can be filtered on
+    """
+    payload = {
+        "text": "Fall leaves after leaves fall",
+        "language": "en",
+        "mode": "word",
+    }
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    result = json.loads(response.data)
+    assert result["is_palindrome"] is True
+    assert result["mode"] == "word"
+
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({"text": "level", "language": "en"}),
+        content_type="application/json",
+    )
+    assert json.loads(response.data)["mode"] == "char"
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}?mode=word")
+    data = json.loads(response.data)
+    assert data["total"] == 1
+    assert data["palindromes"][0]["id"] == result["id"]
+
+
+def test_create_near_palindrome(test_client, db):
+    """
+    Check that the edits needed to get a palindrome are returned when asked
+    """
+    payload = {"text": "A man, a plan, a canol: Panama", "language": "en"}
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({**payload, "max_edits": 2}),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    result = json.loads(response.data)
+    assert result["is_palindrome"] is False
+    assert result["near_palindrome"] == {"edits": 1, "positions": [11]}
+
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({"text": "abcdef", "language": "en", "max_edits": 1}),
+        content_type="application/json",
+    )
+    assert json.loads(response.data)["near_palindrome"] is None
+
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({**payload, "max_edits": -1}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps(
+            {"text": "ab", "language": "en", "max_edits": 10**9, "edit": "indel"}
+        ),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+
+def test_create_palindrome_with_analysis(test_client, db):
+    """
+    Check that the substring analysis is returned only when requested
+    """
+    payload = {"text": "Abba", "language": "en", "analysis": True}
+    response = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    result = json.loads(response.data)
+    assert result["is_palindrome"] is True
+    assert result["analysis"]["distinct_count"] == 4
+    assert result["analysis"]["most_common"][0] == {"text": "a", "count": 2}
+    assert result["analysis"]["length_histogram"] == {"1": 2, "2": 1, "4": 1}
+
+    # Fetching it later does not include the analysis
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/{result['id']}")
+    assert "analysis" not in json.loads(response.data)
+
+
+def test_create_batch(test_client, db):
+    """
+    Check that a batch is stored as a whole, or not at all if an item is invalid
+    """
+    items = [
+        {"text": "racecar", "language": "en"},
+        {"text": "hello world", "language": "en"},
+        {"text": "Anita lava la tina", "language": "es"},
+    ]
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/batch",
+        data=json.dumps({"palindromes": items}),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    result = json.loads(response.data)["palindromes"]
+    assert [p["text"] for p in result] == [item["text"] for item in items]
+    assert [p["is_palindrome"] for p in result] == [True, False, True]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/{result[2]['id']}")
+    assert response.status_code == 200
+
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/batch",
+        data=json.dumps({"palindromes": items + [{"text": "", "language": "en"}]}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    response = test_client.get(PALINDROMES_ENDPOINT)
+    assert json.loads(response.data)["total"] == len(items)
+
+    # Items are held to the length limit of single detections
+    too_long = {"text": "a" * (MAX_TEXT_LENGTH + 1), "language": "en"}
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/batch",
+        data=json.dumps({"palindromes": items + [too_long]}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert "3" in response.get_json()["messages"]["json"]["palindromes"]
+    response = test_client.get(PALINDROMES_ENDPOINT)
+    assert json.loads(response.data)["total"] == len(items)
+
+
+def test_get_stats(test_client, db):
+    """
+    Check that the counts include every way of storing and deleting detections
+    """
+    post = dict(content_type="application/json")
+    test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({"text": "racecar", "language": "en"}),
+        **post,
+    )
+    created = test_client.post(
+        PALINDROMES_ENDPOINT,
+        data=json.dumps({"text": "hello world", "language": "en"}),
+        **post,
+    )
+    test_client.post(
+        f"{PALINDROMES_ENDPOINT}/batch",
+        data=json.dumps({"palindromes": [{"text": "oso", "language": "es"}]}),
+        **post,
+    )
+    test_client.post(
+        f"{PALINDROMES_ENDPOINT}/upload",
+        data={"language": "fr", "file": (io.BytesIO(b"ressasser"), "a.txt")},
+        content_type="multipart/form-data",
+    )
+    test_client.delete(f"{PALINDROMES_ENDPOINT}/{json.loads(created.data)['id']}")
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/stats")
+    assert response.status_code == 200
+    stats = json.loads(response.data)
+    assert (stats["total"], stats["palindromes"]) == (3, 3)
+    assert [language["language"] for language in stats["languages"]] == [
+        "en",
+        "es",
+        "fr",
+    ]
+    assert len(stats["days"]) == 1
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/stats?date_from=bad")
+    assert response.status_code == 400
+
+
+def test_export(test_client, populated_db, test_app, monkeypatch):
+    """
+    Check that exports stream every matching detection as NDJSON or CSV
+    """
+    monkeypatch.setitem(test_app.config, "EXPORT_CHUNK_SIZE", 2)
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?sort=text&order=asc")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.data.decode().splitlines()
+    assert [json.loads(line)["text"] for line in lines] == [
+        "madam",
+        "reconocer",
+        "test",
+    ]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?format=csv&language=es")
+    assert response.mimetype == "text/csv"
+    assert "palindromes.csv" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [(row["text"], row["language"]) for row in rows] == [("reconocer", "es")]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?format=csv&language=fr")
+    assert response.data.decode().splitlines() == [
+        "id,text,content_hash,language,mode,is_palindrome,created_at"
+    ]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?format=xml")
+    assert response.status_code == 400
+
+
+def test_export_many_chunks(test_client, db, test_app, monkeypatch):
+    """
+    Check that exports of several chunks match the detections as the API
+    shows them
+    """
+    monkeypatch.setitem(test_app.config, "EXPORT_CHUNK_SIZE", 2)
+    texts = ["abba", "kayak", "level", "noon", "rotor"]
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/batch",
+        json={"palindromes": [{"text": text, "language": "en"} for text in texts]},
+    )
+    assert response.status_code == 201
+    created = {item["id"]: item for item in response.get_json()["palindromes"]}
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?sort=text&order=asc")
+    items = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [item["text"] for item in items] == texts
+    assert items == [created[item["id"]] for item in items]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}/export?format=csv&sort=text")
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert len(rows) == len(texts)
+    for row in rows:
+        assert row["created_at"] == created[row["id"]]["created_at"]
+        assert row["is_palindrome"] == "True"
+
+
+def test_upload_palindrome(test_client, db):
+    """
+    Check that uploaded files are checked and only their hash is stored
+    """
+    contents = "Ésé\n".encode() * 10000 + "Ésé".encode()
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/upload",
+        data={"language": "es", "file": (io.BytesIO(contents), "transcript.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 201
+    result = json.loads(response.data)
+    assert result["is_palindrome"] is True
+    assert result["text"] is None
+    assert result["content_hash"] == hashlib.sha256(contents).hexdigest()
+    assert result["language"] == "es"
+
+    # Not UTF-8
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/upload",
+        data={"language": "es", "file": (io.BytesIO(b"\xff\xfe"), "bad.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+    # A run of continuation bytes longer than any code point
+    contents = b"a" + b"\x80" * (1 << 20) + b"a"
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/upload",
+        data={"language": "es", "file": (io.BytesIO(contents), "bad.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+    # Missing file
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/upload",
+        data={"language": "es"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+
+def test_find_longest(test_client):
+    """
+    Check that the longest palindromic part is located in the original text
+    """
+    text = "Ella dijo: ¡Sátorótas!"
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/longest",
+        data=json.dumps({"text": text}),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    result = json.loads(response.data)
+    assert result["text"] == "Sátorótas"
+    assert text[result["start"] : result["end"]] == "Sátorótas"
+    assert result["length"] == 9
+
+    response = test_client.post(
+        f"{PALINDROMES_ENDPOINT}/longest",
+        data=json.dumps({"text": ""}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+
 @pytest.fixture
 def created_palindrome(test_client, db):
     """Fixture to create a palindrome and return its data."""
@@ -93,6 +404,41 @@ def test_delete_palindrome(test_client, created_palindrome):
     assert response.status_code == 404
 
 
+def test_search_palindromes(test_client, populated_db):
+    """
+    Check that the texts are searched, and the search kept in the page URLs
+    """
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}?q=ADA&per_page=1")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["total"] == 1
+    assert data["palindromes"][0]["text"] == "madam"
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}?q=e&per_page=1")
+    data = json.loads(response.data)
+    assert data["total"] == 2
+    assert "q=e" in data["next_url"]
+
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}?q=")
+    assert response.status_code == 400
+
+
+def test_delete_all_palindromes(test_client, populated_db):
+    """
+    Check that the detections matching the filters are deleted
+    """
+    response = test_client.delete(f"{PALINDROMES_ENDPOINT}?language=en")
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"deleted": 2}
+
+    data = json.loads(test_client.get(PALINDROMES_ENDPOINT).data)
+    assert [p["text"] for p in data["palindromes"]] == ["reconocer"]
+
+    # Deleting everything takes a filter
+    response = test_client.delete(PALINDROMES_ENDPOINT)
+    assert response.status_code == 400
+
+
 @pytest.fixture
 def populated_db(test_app, db):
     """Fixture to populate the database with a set of palindromes."""
@@ -177,3 +523,89 @@ def test_get_all_palindromes(test_client, populated_db):
     parsed_next = urlparse(data["next_url"])
     query_params = parse_qs(parsed_next.query)
     assert query_params["page"][0] == "3"
+
+
+def test_get_all_palindromes_by_cursor(test_client, populated_db):
+    """
+    Check that keyset pages are walked back and forth with their cursors
+    """
+    response = test_client.get(
+        f"{PALINDROMES_ENDPOINT}?pagination=keyset&per_page=2&sort=text&order=asc"
+    )
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [p["text"] for p in data["palindromes"]] == ["madam", "reconocer"]
+    assert data["total"] is None
+    assert data["page"] is None
+    assert data["prev_url"] is None
+
+    query_params = parse_qs(urlparse(data["next_url"]).query)
+    assert "page" not in query_params
+    assert query_params["sort"] == ["text"]
+    response = test_client.get(data["next_url"])
+    data = json.loads(response.data)
+    assert [p["text"] for p in data["palindromes"]] == ["test"]
+    assert data["next_url"] is None
+
+    response = test_client.get(data["prev_url"])
+    data = json.loads(response.data)
+    assert [p["text"] for p in data["palindromes"]] == ["madam", "reconocer"]
+    assert data["prev_url"] is None
+
+    # Counting is optional, and cursors only work with the sort they were made for
+    cursor = parse_qs(urlparse(data["next_url"]).query)["cursor"][0]
+    response = test_client.get(
+        f"{PALINDROMES_ENDPOINT}?pagination=keyset&with_total=true&cursor={cursor}"
+        "&sort=text&order=asc"
+    )
+    assert json.loads(response.data)["total"] == 3
+    response = test_client.get(
+        f"{PALINDROMES_ENDPOINT}?pagination=keyset&cursor={cursor}"
+    )
+    assert response.status_code == 400
+    response = test_client.get(f"{PALINDROMES_ENDPOINT}?pagination=keyset&cursor=x")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_get_all_palindromes_by_cursor_of_creation(test_client, db, order):
+    """
+    Check that keyset pages are walked by creation time, the default sort,
+    with the creation times set by the database
+    """
+    for i in range(7):
+        test_client.post(PALINDROMES_ENDPOINT, json={"text": f"{i}", "language": "en"})
+
+    url = f"{PALINDROMES_ENDPOINT}?pagination=keyset&per_page=3&order={order}"
+    pages = [json.loads(test_client.get(url).data)]
+    while pages[-1]["next_url"] and len(pages) < 5:
+        pages.append(json.loads(test_client.get(pages[-1]["next_url"]).data))
+    forward = [p["id"] for page in pages for p in page["palindromes"]]
+    assert [len(page["palindromes"]) for page in pages] == [3, 3, 1]
+    assert len(set(forward)) == 7
+
+    backward = [p["id"] for p in pages[-1]["palindromes"]]
+    page = pages[-1]
+    for _ in range(len(pages) - 1):
+        page = json.loads(test_client.get(page["prev_url"]).data)
+        backward = [p["id"] for p in page["palindromes"]] + backward
+    assert page["prev_url"] is None
+    assert backward == forward
+
+
+def test_get_palindromes_not_modified(test_client, db, monkeypatch):
+    """
+    Check that polling a list gets 304 until a detection is created
+    """
+    monkeypatch.setattr(palindrome_cache, "backend", SimpleCache())
+    url = f"{PALINDROMES_ENDPOINT}?language=en"
+    etag = test_client.get(url).headers["ETag"]
+
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    test_client.post(PALINDROMES_ENDPOINT, json={"text": "kayak", "language": "en"})
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["total"] == 1
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,170 @@
+"""
+Query plans of the list endpoint, as chosen by SQLite for the test database,
+and by Postgres when DATABASE_URL points to a migrated Postgres database
+(the Postgres tests are skipped otherwise).
+
+Every filter and sort must be served by an index of the table (no full
+table scan), and the ones that match an index exactly must not need a sort.
+"""
+
+import itertools
+import os
+import re
+import uuid
+from datetime import date, datetime
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from app.services.palindrome.palindrome_dtos import PalindromeQueryDTO
+from app.services.palindrome.palindrome_service import PalindromeService
+
+SORTS = ["text", "language", "is_palindrome", "created_at"]
+FILTERS = [
+    dict(zip(["language", "mode", "date_from", "date_to"], values))
+    for values in itertools.product(
+        [None, "en"], [None, "word"], [None, date(2024, 1, 1)], [None, date(2024, 2, 1)]
+    )
+]
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+postgres = pytest.mark.skipif(
+    not DATABASE_URL.startswith("postgresql"),
+    reason="DATABASE_URL is not a Postgres database",
+)
+CURSOR_KEYS = {
+    "text": "racecar",
+    "language": "en",
+    "is_palindrome": True,
+    "created_at": datetime(2024, 1, 15),
+}
+
+
+@pytest.fixture
+def query_plans(db):
+    """Returns the query plans of the SELECTs run by a call."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    def plans(call) -> list[list[str]]:
+        statements.clear()
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            call()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        with db.engine.connect() as conn:
+            return [
+                [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {s}", p)]
+                for s, p in statements
+            ]
+
+    return plans
+
+
+@pytest.fixture(scope="module")
+def postgres_plans():
+    """
+    Returns the Postgres query plans of statements, with sequential scans
+    disabled: Postgres still picks one if no index can serve the query.
+    """
+    engine = create_engine(DATABASE_URL)
+    if not inspect(engine).has_table("palindromes"):
+        engine.dispose()
+        pytest.skip("The Postgres database is not migrated")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    def plans(stmt) -> list[str]:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            statements.clear()
+            event.listen(conn, "before_cursor_execute", record)
+            try:
+                conn.execute(stmt).all()
+            finally:
+                event.remove(conn, "before_cursor_execute", record)
+            ((statement, parameters),) = statements
+            return [
+                row[0]
+                for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            ]
+
+    yield plans
+    engine.dispose()
+
+
+def matches_an_index(filters: dict, sort: str) -> bool:
+    """Whether an index covers both the filters and the sort of a query."""
+    if sort == "created_at":
+        return True
+    if filters["date_from"] or filters["date_to"]:
+        return False
+    if sort == "is_palindrome":
+        return not (filters["language"] or filters["mode"])
+    # By language, then text or language: the mode is checked on the way
+    return filters["language"] is not None or filters["mode"] is None
+
+
+def assert_uses_indexes(plans: list[list[str]], sorted_by_index: bool):
+    assert plans
+    for plan in plans:
+        steps = " | ".join(plan)
+        assert all(
+            "USING" in step and "INDEX" in step
+            for step in plan
+            if "palindromes" in step
+        ), steps
+        if sorted_by_index:
+            assert "TEMP B-TREE" not in steps, steps
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_offset_pages_use_indexes(query_plans, sort, order):
+    """Test that numbered pages and their count are read from indexes."""
+    service = PalindromeService()
+    for filters in FILTERS:
+        query = PalindromeQueryDTO(**filters, sort=sort, order=order, page=2)
+        plans = query_plans(lambda: service._paginate(query))
+        # The page, then its count
+        assert len(plans) == 2
+        assert_uses_indexes(plans[:1], matches_an_index(filters, sort))
+        assert_uses_indexes(plans[1:], sorted_by_index=False)
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("forward", [True, False])
+def test_keyset_pages_use_indexes(db, query_plans, sort, order, forward):
+    """Test that pages after (or before) a cursor are read from indexes."""
+    service = PalindromeService()
+    key = (CURSOR_KEYS[sort], uuid.uuid4())
+    for filters in FILTERS:
+        query = PalindromeQueryDTO(**filters, sort=sort, order=order)
+        plans = query_plans(
+            lambda: db.session.scalars(service._query(query, key, forward)).all()
+        )
+        assert_uses_indexes(plans, matches_an_index(filters, sort))
+
+
+@postgres
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("after_key", [False, True])
+def test_postgres_pages_use_indexes(db, postgres_plans, sort, order, after_key):
+    """Test that pages are read from the indexes of every partition."""
+    service = PalindromeService()
+    key = (CURSOR_KEYS[sort], uuid.uuid4()) if after_key else None
+    for filters in FILTERS:
+        query = PalindromeQueryDTO(**filters, sort=sort, order=order)
+        plan = postgres_plans(service._query(query, key).limit(50))
+        steps = " | ".join(plan)
+        assert not any("Seq Scan" in step for step in plan), steps
+        if matches_an_index(filters, sort):
+            # Merge Append keeps the order of the partitions' index scans
+            assert not any(
+                re.match(r"\s*(->\s+)?(Incremental )?Sort\b", step) for step in plan
+            ), steps
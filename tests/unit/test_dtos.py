@@ -2,6 +2,7 @@ import pytest
 from pydantic import ValidationError
 
 from app.services.palindrome.palindrome_dtos import (
+    PalindromeBatchDTO,
     PalindromeCreateDTO,
     PalindromeQueryDTO,
 )
@@ -13,6 +14,8 @@ def test_palindrome_create_dto_success():
     dto = PalindromeCreateDTO(**data)
     assert dto.text == data["text"]
     assert dto.language == data["language"]
+    assert dto.mode == "char"
+    assert dto.analysis is False
 
 
 @pytest.mark.parametrize(
@@ -32,6 +35,7 @@ def test_palindrome_query_dto_defaults():
     """Tests that PalindromeQueryDTO uses default values correctly."""
     dto = PalindromeQueryDTO()
     assert dto.language is None
+    assert dto.mode is None
     assert dto.date_from is None
     assert dto.date_to is None
     assert dto.page == 1
@@ -61,3 +65,24 @@ def test_palindrome_query_dto_invalid_language():
     """Tests that PalindromeQueryDTO raises validation error for invalid language."""
     with pytest.raises(ValidationError):
         PalindromeQueryDTO(language="spa")
+
+
+def test_palindrome_create_dto_invalid_mode():
+    """Tests that PalindromeCreateDTO raises validation error for invalid mode."""
+    with pytest.raises(ValidationError):
+        PalindromeCreateDTO(text="some text", language="en", mode="sentence")
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        [],  # empty batch
+        [{"text": "racecar", "language": "en"}] * 5001,  # too many items
+        [{"text": "racecar", "language": "eng"}],  # invalid item
+        [{"text": "a" * ((1 << 24) + 1), "language": "en"}],  # text too long
+    ],
+)
+def test_palindrome_batch_dto_invalid(items):
+    """Tests that PalindromeBatchDTO raises validation error for invalid batches."""
+    with pytest.raises(ValidationError):
+        PalindromeBatchDTO(items=items)
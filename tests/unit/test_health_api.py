@@ -7,3 +7,23 @@ def test_health_check(test_client):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data == {"status": "ok"}
+
+
+def test_cache_stats(test_client):
+    """Test that the result cache counters are exposed."""
+    response = test_client.get("/v1/health/cache")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert {"hits", "misses", "evictions"} <= data.keys()
+
+
+def test_pool_stats(test_client, db):
+    """Test that the connection pool metrics are exposed."""
+    response = test_client.get("/v1/health/pool")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert {"in_use", "overflow", "checkouts", "max_wait_seconds"} <= data.keys()
+    # In-memory SQLite shares a single connection, with no pool gauges
+    assert data["in_use"] is None
+    # One entry per read replica, and there are none
+    assert data["replicas"] == {}
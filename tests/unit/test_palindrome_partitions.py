@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.models import Palindrome
+from app.services.palindrome.palindrome_dtos import (
+    PalindromeBatchDTO,
+    PalindromeStatsQueryDTO,
+)
+from app.services.palindrome.palindrome_partitions import (
+    PalindromePartitions,
+    add_months,
+)
+from app.services.palindrome.palindrome_service import PalindromeService
+
+
+@pytest.fixture
+def partitions():
+    return PalindromePartitions()
+
+
+@pytest.mark.parametrize(
+    "month, months, expected",
+    [
+        (date(2024, 5, 1), 0, date(2024, 5, 1)),
+        (date(2024, 5, 1), 3, date(2024, 8, 1)),
+        (date(2024, 11, 1), 2, date(2025, 1, 1)),
+        (date(2024, 1, 1), -1, date(2023, 12, 1)),
+        (date(2024, 5, 1), -17, date(2022, 12, 1)),
+    ],
+)
+def test_add_months(month, months, expected):
+    """Test moving across months and years."""
+    assert add_months(month, months) == expected
+
+
+def test_create_without_partitions(partitions: PalindromePartitions, db):
+    """Test that SQLite has a plain table, with no partitions to create."""
+    assert not partitions.is_partitioned()
+    assert partitions.create(months_ahead=3) == []
+
+
+def test_apply_retention(partitions: PalindromePartitions, db):
+    """Test that old detections and their daily counts are removed."""
+    service = PalindromeService()
+    service.create_batch(
+        PalindromeBatchDTO(
+            items=[
+                {"text": "level", "language": "en"},
+                {"text": "reconocer", "language": "es"},
+                {"text": "hola", "language": "es"},
+            ]
+        )
+    )
+    old, kept, recent = db.session.query(Palindrome).order_by(Palindrome.text).all()
+    old.created_at = datetime(2024, 2, 29, 23, 59)
+    kept.created_at = datetime(2024, 3, 1)
+    db.session.commit()
+    # The daily counts of the backdated detections
+    service._count([old, kept])
+    db.session.commit()
+
+    assert partitions.apply_retention(months=0, today=date(2024, 6, 15)) == 0
+    assert partitions.apply_retention(months=3, today=date(2024, 6, 15)) == 1
+
+    remaining = db.session.query(Palindrome).order_by(Palindrome.text).all()
+    assert remaining == [kept, recent]
+    stats = service.get_stats(PalindromeStatsQueryDTO(date_to=date(2024, 3, 31)))
+    assert stats["days"] == [
+        {"day": date(2024, 3, 1), "total": 1, "palindromes": 1, "palindrome_rate": 1.0}
+    ]
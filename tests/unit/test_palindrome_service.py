@@ -1,8 +1,25 @@
+import base64
+import hashlib
+import io
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
 import pytest
+from cachelib import SimpleCache
+from sqlalchemy import delete
+from werkzeug.exceptions import Conflict, NotFound
+from app.models import Palindrome
+from app.extensions import replicas, result_cache, write_behind
 from app.services.palindrome.palindrome_dtos import (
+    PalindromeBatchDTO,
     PalindromeCreateDTO,
     PalindromeQueryDTO,
+    PalindromeStatsQueryDTO,
+    PalindromeTextDTO,
+    PalindromeUploadDTO,
 )
+from app.services.palindrome.palindrome_cache import palindrome_cache
 from app.services.palindrome.palindrome_service import PalindromeService
 
 
@@ -28,6 +45,183 @@ def test_create_palindrome(palindrome_service: PalindromeService, db):
     assert result_non.is_palindrome is False
 
 
+def test_create_palindrome_uses_language(palindrome_service: PalindromeService, db):
+    """Test that the language of the text selects its folding rules."""
+    result_es = palindrome_service.create(
+        PalindromeCreateDTO(text="Ñan", language="es")
+    )
+    assert result_es.is_palindrome is False
+
+    result_en = palindrome_service.create(
+        PalindromeCreateDTO(text="Ñan", language="en")
+    )
+    assert result_en.is_palindrome is True
+
+
+def test_create_palindrome_with_analysis(palindrome_service: PalindromeService, db):
+    """Test creating a palindrome along with its substring analysis."""
+    create_dto = PalindromeCreateDTO(text="abba", language="en", analysis=True)
+    result = palindrome_service.create(create_dto)
+    # a, b, bb, abba
+    assert result.analysis["distinct_count"] == 4
+    assert result.analysis["most_common"][0] == {"text": "a", "count": 2}
+    assert result.analysis["length_histogram"] == {1: 2, 2: 1, 4: 1}
+
+    result_plain = palindrome_service.create(
+        PalindromeCreateDTO(text="abba", language="en")
+    )
+    assert not hasattr(result_plain, "analysis")
+
+
+def test_create_palindrome_uses_result_cache(palindrome_service: PalindromeService, db):
+    """Test that a text seen before, even written differently, is not checked again."""
+    result_cache.clear()
+    first = palindrome_service.create(
+        PalindromeCreateDTO(text="Never odd or even", language="en")
+    )
+    second = palindrome_service.create(
+        PalindromeCreateDTO(text="never, odd or EVEN!", language="en")
+    )
+    assert first.is_palindrome is second.is_palindrome is True
+    stats = result_cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
+
+    # Words are compared in word mode, so the verdict is not shared.
+    third = palindrome_service.create(
+        PalindromeCreateDTO(text="Never odd or even", language="en", mode="word")
+    )
+    assert third.is_palindrome is False
+    assert result_cache.stats()["misses"] == 2
+
+
+def test_create_large_palindrome(
+    palindrome_service: PalindromeService, db, test_app, monkeypatch
+):
+    """Test that texts over the size cutoff are checked on the process pool."""
+    monkeypatch.setitem(test_app.config, "PARALLEL_MIN_SIZE", 10)
+    monkeypatch.setitem(test_app.config, "PARALLEL_WORKERS", 2)
+
+    result = palindrome_service.create(
+        PalindromeCreateDTO(text="A man, a plan, a canal: Panama", language="en")
+    )
+    assert result.is_palindrome is True
+    result = palindrome_service.create(
+        PalindromeCreateDTO(text="A man, a plan, a canal: Panamá!?", language="es")
+    )
+    assert result.is_palindrome is True
+    result = palindrome_service.create(
+        PalindromeCreateDTO(text="A man, a plan, a canal: Suez", language="en")
+    )
+    assert result.is_palindrome is False
+
+
+def test_create_long_text(palindrome_service: PalindromeService, db):
+    """Test that texts too long for their column only store their hash."""
+    text = "Sátorótas " * 30
+    result = palindrome_service.create(PalindromeCreateDTO(text=text, language="es"))
+    assert result.is_palindrome is True
+    assert result.text is None
+    assert result.content_hash == hashlib.sha256(text.encode()).hexdigest()
+
+    (stored,) = palindrome_service.create_batch(
+        PalindromeBatchDTO(items=[{"text": text, "language": "es"}])
+    )
+    assert stored.text is None
+    assert stored.content_hash == result.content_hash
+
+
+def test_create_batch(palindrome_service: PalindromeService, db):
+    """Test creating many palindromes in one go."""
+    items = [
+        {"text": "Ñan", "language": "es"},
+        {"text": "racecar", "language": "en"},
+        {"text": "Ñan", "language": "en"},
+        {"text": "hello", "language": "en"},
+    ]
+    result = palindrome_service.create_batch(PalindromeBatchDTO(items=items))
+
+    assert [(p.text, p.language) for p in result] == [
+        (item["text"], item["language"]) for item in items
+    ]
+    assert [p.is_palindrome for p in result] == [False, True, True, False]
+    assert len({p.id for p in result}) == len(items)
+    assert all(p.created_at is not None and p.mode == "char" for p in result)
+    assert palindrome_service.get_by_id(result[1].id).text == "racecar"
+
+
+def test_create_from_upload(palindrome_service: PalindromeService, db, tmp_path):
+    """Test creating palindromes from uploaded files, keeping only their hash."""
+    contents = "Anita lava la tina".encode()
+
+    result = palindrome_service.create_from_upload(
+        PalindromeUploadDTO(language="es"), io.BytesIO(contents)
+    )
+    assert result.text is None
+    assert result.content_hash == hashlib.sha256(contents).hexdigest()
+    assert result.is_palindrome is True
+
+    path = tmp_path / "upload.txt"
+    path.write_bytes(b"not a palindrome")
+    with open(path, "rb") as f:
+        result_file = palindrome_service.create_from_upload(
+            PalindromeUploadDTO(language="en"), f
+        )
+    assert result_file.is_palindrome is False
+
+
+def test_create_from_upload_with_language(
+    palindrome_service: PalindromeService, db, test_app, monkeypatch
+):
+    """Test that uploads are folded like texts posted in the same language."""
+    # Chunk boundaries fall inside 'ij' and the decomposed 'ñ'
+    monkeypatch.setitem(test_app.config, "STREAM_CHUNK_SIZE", 1)
+    for text in ("ijsji", "an\u0303n\u0303a"):
+        for language in ("nl", "es", "en"):
+            posted = palindrome_service.create(
+                PalindromeCreateDTO(text=text, language=language)
+            )
+            uploaded = palindrome_service.create_from_upload(
+                PalindromeUploadDTO(language=language), io.BytesIO(text.encode())
+            )
+            assert uploaded.is_palindrome is posted.is_palindrome
+
+
+def test_create_near_palindrome(palindrome_service: PalindromeService, db):
+    """Test creating a palindrome with a budget of edits."""
+    result = palindrome_service.create(
+        PalindromeCreateDTO(text="Racecbr", language="en", max_edits=1)
+    )
+    assert result.is_palindrome is False
+    assert result.near_palindrome == {"edits": 1, "positions": [1]}
+
+    result_indel = palindrome_service.create(
+        PalindromeCreateDTO(text="racecaxr", language="en", max_edits=2, edit="indel")
+    )
+    assert result_indel.near_palindrome == {"edits": 1, "positions": [6]}
+
+    result_over = palindrome_service.create(
+        PalindromeCreateDTO(text="abcdef", language="en", max_edits=2)
+    )
+    assert result_over.near_palindrome is None
+
+
+def test_create_stores_nothing_on_failure(
+    palindrome_service: PalindromeService, db, monkeypatch
+):
+    """Test that the extras are computed before the entry is stored."""
+
+    def fail(*args):
+        raise MemoryError
+
+    module = sys.modules[PalindromeService.__module__]
+    monkeypatch.setattr(module, "near_palindrome", fail)
+    with pytest.raises(MemoryError):
+        palindrome_service.create(
+            PalindromeCreateDTO(text="abc", language="en", max_edits=1)
+        )
+    assert db.session.query(Palindrome).count() == 0
+
+
 def test_get_by_id(palindrome_service: PalindromeService, db):
     """Test retrieving a palindrome by its ID."""
     create_dto = PalindromeCreateDTO(text="level", language="en")
@@ -68,3 +262,386 @@ def test_get_all(palindrome_service: PalindromeService, db):
     pagination_fr = palindrome_service.get_all(query_dto_fr)
     assert pagination_fr.total == 1
     assert pagination_fr.items[0].language == "fr"
+
+
+def test_get_all_by_mode(palindrome_service: PalindromeService, db):
+    """Test filtering palindromes by detection mode."""
+    palindrome_service.create(PalindromeCreateDTO(text="madam", language="en"))
+    word = palindrome_service.create(
+        PalindromeCreateDTO(
+            text="you can cage a swallow can you", language="en", mode="word"
+        )
+    )
+    assert word.mode == "word"
+    assert word.is_palindrome is False
+
+    pagination = palindrome_service.get_all(PalindromeQueryDTO(mode="word"))
+    assert pagination.total == 1
+    assert pagination.items[0].id == word.id
+
+
+def test_get_all_by_search(palindrome_service: PalindromeService, db):
+    """Test searching the texts, ignoring case and escaping wildcards."""
+    palindrome_service.create_batch(
+        PalindromeBatchDTO(
+            items=[
+                {"text": "Race car", "language": "en"},
+                {"text": "racecar", "language": "en"},
+                {"text": "100% level", "language": "en"},
+                {"text": "a_b_a", "language": "en"},
+            ]
+        )
+    )
+
+    def search(q):
+        page = palindrome_service.get_all(
+            PalindromeQueryDTO(q=q, sort="text", order="asc")
+        )
+        return [item.text for item in page.items]
+
+    assert search("CAR") == ["Race car", "racecar"]
+    assert search("%") == ["100% level"]
+    assert search("_b_") == ["a_b_a"]
+    assert search("kayak") == []
+
+
+def test_get_all_by_cursor(palindrome_service: PalindromeService, db):
+    """Test walking keyset pages in both directions, with ties on the sort."""
+    created_at = datetime(2024, 1, 1)
+    for i in range(7):
+        db.session.add(
+            Palindrome(
+                text=f"t{i % 3}",
+                language="en",
+                is_palindrome=True,
+                created_at=created_at + timedelta(seconds=i // 2),
+            )
+        )
+    db.session.commit()
+
+    for sort in ["created_at", "text"]:
+        for order in ["asc", "desc"]:
+            query = dict(pagination="keyset", page_size=3, sort=sort, order=order)
+            page = palindrome_service.get_all(PalindromeQueryDTO(**query))
+            pages = [page]
+            while page.has_next:
+                cursor = page.next_cursor
+                page = palindrome_service.get_all(
+                    PalindromeQueryDTO(**query, cursor=cursor)
+                )
+                pages.append(page)
+            forward = [item.id for page in pages for item in page.items]
+            assert [len(page.items) for page in pages] == [3, 3, 1]
+            assert len(set(forward)) == 7
+
+            values = [getattr(item, sort) for page in pages for item in page.items]
+            assert values == sorted(values, reverse=order == "desc")
+
+            backward = [item.id for item in page.items]
+            while page.has_prev:
+                page = palindrome_service.get_all(
+                    PalindromeQueryDTO(**query, cursor=page.prev_cursor)
+                )
+                backward = [item.id for item in page.items] + backward
+            assert backward == forward
+
+
+def test_get_all_by_cursor_of_another_sort(palindrome_service: PalindromeService, db):
+    """Test that a cursor cannot be used with another sort."""
+    palindrome_service.create(PalindromeCreateDTO(text="madam", language="en"))
+    palindrome_service.create(PalindromeCreateDTO(text="level", language="en"))
+    page = palindrome_service.get_all(
+        PalindromeQueryDTO(pagination="keyset", page_size=1, with_total=True)
+    )
+    assert page.total == 2
+    with pytest.raises(ValueError):
+        palindrome_service.get_all(
+            PalindromeQueryDTO(
+                pagination="keyset", sort="text", cursor=page.next_cursor
+            )
+        )
+
+
+@pytest.mark.parametrize(
+    "sort, value, palindrome_id",
+    [
+        ("is_palindrome", "x", str(uuid.uuid4())),
+        ("text", 1, str(uuid.uuid4())),
+        ("created_at", 1, str(uuid.uuid4())),
+        ("language", "en", 1),
+    ],
+)
+def test_get_all_by_cursor_of_another_type(
+    palindrome_service: PalindromeService, db, sort, value, palindrome_id
+):
+    """Test that a cursor value of the wrong type is rejected."""
+    payload = [sort, "desc", True, value, palindrome_id]
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(ValueError):
+        palindrome_service.get_all(
+            PalindromeQueryDTO(pagination="keyset", sort=sort, cursor=cursor)
+        )
+
+
+@pytest.fixture
+def read_cache(monkeypatch):
+    """Caches detections and list pages in memory instead of Redis."""
+    monkeypatch.setattr(palindrome_cache, "backend", SimpleCache())
+    yield palindrome_cache
+
+
+def test_get_by_id_is_cached(palindrome_service: PalindromeService, db, read_cache):
+    """Test that detections are read from the cache and evicted on delete."""
+    created = palindrome_service.create(
+        PalindromeCreateDTO(text="kayak", language="en")
+    )
+    palindrome_service.get_by_id(created.id)
+
+    # Deleted behind the service's back: still served from the cache.
+    db.session.execute(delete(Palindrome))
+    assert palindrome_service.get_by_id(created.id).text == "kayak"
+
+    other = palindrome_service.create(PalindromeCreateDTO(text="refer", language="en"))
+    other_id = other.id
+    palindrome_service.get_by_id(other_id)
+    palindrome_service.delete_by_id(other_id)
+    with pytest.raises(NotFound):
+        palindrome_service.get_by_id(other_id)
+
+
+def test_get_by_id_deleted_while_read(
+    palindrome_service: PalindromeService, db, read_cache, monkeypatch
+):
+    """Test that a detection deleted before it is cached is not cached."""
+    created = palindrome_service.create(
+        PalindromeCreateDTO(text="kayak", language="en")
+    )
+    created_id = created.id
+    module = sys.modules[PalindromeService.__module__]
+    to_record = module.to_record
+
+    def read_then_delete(palindrome):
+        record = to_record(palindrome)
+        palindrome_service.delete_by_id(created_id)
+        return record
+
+    monkeypatch.setattr(module, "to_record", read_then_delete)
+    assert palindrome_service.get_by_id(created_id).text == "kayak"
+    monkeypatch.setattr(module, "to_record", to_record)
+    with pytest.raises(NotFound):
+        palindrome_service.get_by_id(created_id)
+
+
+def test_get_all_is_cached(palindrome_service: PalindromeService, db, read_cache):
+    """Test that list pages are cached until their language gets a new entry."""
+    palindrome_service.create(PalindromeCreateDTO(text="madam", language="en"))
+    palindrome_service.create(PalindromeCreateDTO(text="ressasser", language="fr"))
+    assert palindrome_service.get_all(PalindromeQueryDTO()).total == 2
+    assert palindrome_service.get_all(PalindromeQueryDTO(language="fr")).total == 1
+
+    # Added behind the service's back: cached pages are not refreshed.
+    db.session.add(Palindrome(text="kayak", language="fr", is_palindrome=True))
+    db.session.commit()
+    assert palindrome_service.get_all(PalindromeQueryDTO()).total == 2
+
+    # A new English entry refreshes the English and unfiltered pages only.
+    palindrome_service.create(PalindromeCreateDTO(text="level", language="en"))
+    assert palindrome_service.get_all(PalindromeQueryDTO()).total == 4
+    assert palindrome_service.get_all(PalindromeQueryDTO(language="fr")).total == 1
+
+    palindrome_service.create(PalindromeCreateDTO(text="été", language="fr"))
+    page = palindrome_service.get_all(PalindromeQueryDTO(language="fr"))
+    assert page.total == 3
+    assert {p.text for p in page.items} == {"ressasser", "kayak", "été"}
+
+
+def test_page_etag(palindrome_service: PalindromeService, db, read_cache):
+    """Test that page tags change with the query and the page's generation."""
+    en, fr = PalindromeQueryDTO(language="en"), PalindromeQueryDTO(language="fr")
+    etag = palindrome_service.page_etag(en)
+    assert etag == palindrome_service.page_etag(en)
+    assert etag != palindrome_service.page_etag(
+        PalindromeQueryDTO(language="en", page=2)
+    )
+    fr_etag = palindrome_service.page_etag(fr)
+
+    palindrome_service.create(PalindromeCreateDTO(text="level", language="en"))
+    assert palindrome_service.page_etag(en) != etag
+    assert palindrome_service.page_etag(fr) == fr_etag
+
+    # An evicted generation starts over from the time, not from 0
+    read_cache.backend.clear()
+    assert palindrome_service.page_etag(en) not in (etag, None)
+    assert not palindrome_service.page_etag(en).startswith("0-")
+
+
+def test_page_etag_with_replicas(
+    palindrome_service: PalindromeService, db, read_cache, monkeypatch
+):
+    """Test that page tags also expire with replicas, which may lag."""
+    query = PalindromeQueryDTO()
+    etag = palindrome_service.page_etag(query)
+    monkeypatch.setattr(replicas, "engines", [object()])
+    assert palindrome_service.page_etag(query).startswith(f"{etag}-")
+
+
+def test_page_etag_without_cache(palindrome_service: PalindromeService, db):
+    """Test that pages have no tag when the cache is disabled."""
+    assert palindrome_service.page_etag(PalindromeQueryDTO()) is None
+
+
+def test_export(palindrome_service: PalindromeService, db, test_app, monkeypatch):
+    """Test that exports yield every matching entry, a chunk at a time."""
+    monkeypatch.setitem(test_app.config, "EXPORT_CHUNK_SIZE", 2)
+    palindrome_service.create_batch(
+        PalindromeBatchDTO(
+            items=[{"text": f"level {i}", "language": "en"} for i in range(5)]
+            + [{"text": "oso", "language": "es"}]
+        )
+    )
+
+    chunks = list(
+        palindrome_service.export(
+            PalindromeQueryDTO(language="en", sort="text", order="asc", page_size=1)
+        )
+    )
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [row.text for chunk in chunks for row in chunk] == [
+        f"level {i}" for i in range(5)
+    ]
+
+
+def test_get_stats(palindrome_service: PalindromeService, db):
+    """Test that the daily counts follow creations and deletions."""
+    palindrome_service.create(PalindromeCreateDTO(text="level", language="en"))
+    hello = palindrome_service.create(PalindromeCreateDTO(text="hello", language="en"))
+    palindrome_service.create_batch(
+        PalindromeBatchDTO(
+            items=[
+                {"text": "reconocer", "language": "es"},
+                {"text": "hola", "language": "es"},
+                {"text": "kayak", "language": "en"},
+            ]
+        )
+    )
+    today = hello.created_at.date()
+    palindrome_service.delete_by_id(hello.id)
+
+    stats = palindrome_service.get_stats(PalindromeStatsQueryDTO())
+    assert (stats["total"], stats["palindromes"]) == (4, 3)
+    assert stats["palindrome_rate"] == 0.75
+    assert stats["languages"] == [
+        {"language": "en", "total": 2, "palindromes": 2, "palindrome_rate": 1.0},
+        {"language": "es", "total": 2, "palindromes": 1, "palindrome_rate": 0.5},
+    ]
+    assert stats["days"] == [
+        {"day": today, "total": 4, "palindromes": 3, "palindrome_rate": 0.75}
+    ]
+
+    stats = palindrome_service.get_stats(
+        PalindromeStatsQueryDTO(date_to=today - timedelta(days=1))
+    )
+    assert stats == {
+        "total": 0,
+        "palindromes": 0,
+        "palindrome_rate": 0.0,
+        "languages": [],
+        "days": [],
+    }
+
+
+def test_delete_all(palindrome_service: PalindromeService, db, test_app, monkeypatch):
+    """Test that matching detections are deleted by chunks, and uncounted."""
+    monkeypatch.setitem(test_app.config, "DELETE_CHUNK_SIZE", 2)
+    palindrome_service.create_batch(
+        PalindromeBatchDTO(
+            items=[{"text": f"level {i}", "language": "en"} for i in range(4)]
+            + [{"text": "reconocer", "language": "es"}]
+        )
+    )
+
+    deleted = palindrome_service.delete_all(PalindromeQueryDTO(language="en"))
+    assert deleted == 4
+    assert [p.text for p in db.session.query(Palindrome)] == ["reconocer"]
+    assert palindrome_service.delete_all(PalindromeQueryDTO(language="en")) == 0
+
+    stats = palindrome_service.get_stats(PalindromeStatsQueryDTO())
+    assert [(s["language"], s["total"]) for s in stats["languages"]] == [("es", 1)]
+
+
+@pytest.fixture
+def journal(test_app, palindrome_service, monkeypatch, tmp_path):
+    """Enables the write-behind mode, with a journal in a temporary directory."""
+    monkeypatch.setitem(test_app.config, "WRITE_BEHIND_JOURNAL_DIR", str(tmp_path))
+    write_behind.init_app(test_app, palindrome_service.store_pending)
+    yield write_behind.journal
+    write_behind.journal = None
+
+
+def test_create_write_behind(palindrome_service: PalindromeService, db, journal):
+    """Test that detections are queued, readable, and stored by a flush."""
+    created = palindrome_service.create(
+        PalindromeCreateDTO(text="racecar", language="en")
+    )
+    assert created.id is not None and created.created_at is not None
+    assert db.session.query(Palindrome).count() == 0
+    assert len(journal) == 1
+
+    queued = palindrome_service.get_by_id(created.id)
+    assert (queued.text, queued.is_palindrome) == ("racecar", True)
+    assert queued.created_at == created.created_at
+
+    assert write_behind.flush() == 1
+    assert len(journal) == 0 and journal.get(created.id) is None
+    stored = palindrome_service.get_by_id(created.id)
+    assert (stored.id, stored.text, stored.mode) == (created.id, "racecar", "char")
+    assert palindrome_service.get_stats(PalindromeStatsQueryDTO())["total"] == 1
+
+
+def test_store_pending_is_idempotent(
+    palindrome_service: PalindromeService, db, journal
+):
+    """Test that a batch replayed after a crash is neither stored nor counted twice."""
+    created = palindrome_service.create(
+        PalindromeCreateDTO(text="level", language="en")
+    )
+    rows = journal.claim(10)
+
+    # The worker dies after committing the batch, before completing it
+    assert len(palindrome_service.store_pending(rows)) == 1
+    assert journal.recover(older_than=0) == 1
+    assert write_behind.flush() == 1
+
+    assert db.session.query(Palindrome).count() == 1
+    assert journal.get(created.id) is None
+    assert palindrome_service.get_stats(PalindromeStatsQueryDTO())["total"] == 1
+
+
+def test_delete_write_behind(palindrome_service: PalindromeService, db, journal):
+    """Test deleting queued detections, but not the ones being stored."""
+    queued = palindrome_service.create(PalindromeCreateDTO(text="kayak", language="en"))
+    palindrome_service.delete_by_id(queued.id)
+    assert journal.get(queued.id) is None
+    assert write_behind.flush() == 0
+
+    claimed = palindrome_service.create(PalindromeCreateDTO(text="noon", language="en"))
+    journal.claim(10)
+    with pytest.raises(Conflict):
+        palindrome_service.delete_by_id(claimed.id)
+
+
+def test_find_longest(palindrome_service: PalindromeService):
+    """Test finding the longest palindromic part of a text."""
+    result = palindrome_service.find_longest(
+        PalindromeTextDTO(text="I said: Racecar, twice")
+    )
+    assert result == {"text": "Racecar", "start": 8, "end": 15, "length": 7}
+
+    result_none = palindrome_service.find_longest(PalindromeTextDTO(text="?!"))
+    assert result_none["length"] == 0
+
+    # In Spanish, 'ñ' is not an 'n'
+    result_es = palindrome_service.find_longest(
+        PalindromeTextDTO(text="Ñanan", language="es")
+    )
+    assert result_es == {"text": "ana", "start": 1, "end": 4, "length": 3}
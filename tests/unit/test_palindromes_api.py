@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 import pytest
+from werkzeug.exceptions import NotFound
 from app.models import Palindrome
 
 
@@ -38,6 +39,65 @@ def test_create_palindrome(mock_service, test_client, mock_palindrome):
     assert response_data["text"] == "racecar"
 
 
+@patch("app.api.palindromes.palindrome_service")
+def test_create_batch(mock_service, test_client, mock_palindrome):
+    """Test creating many palindromes at once."""
+    mock_service.create_batch.return_value = [mock_palindrome]
+
+    response = test_client.post(
+        "/v1/palindromes/batch",
+        data=json.dumps({"palindromes": [{"text": "racecar", "language": "en"}]}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 201
+    mock_service.create_batch.assert_called_once()
+    response_data = response.get_json()
+    assert response_data["palindromes"][0]["id"] == str(mock_palindrome.id)
+
+
+@patch("app.api.palindromes.palindrome_service")
+def test_get_stats(mock_service, test_client):
+    """Test retrieving the counts of detections."""
+    mock_service.get_stats.return_value = {
+        "total": 2,
+        "palindromes": 1,
+        "palindrome_rate": 0.5,
+        "languages": [
+            {"language": "en", "total": 2, "palindromes": 1, "palindrome_rate": 0.5}
+        ],
+        "days": [],
+    }
+
+    response = test_client.get("/v1/palindromes/stats?date_from=2024-01-01")
+
+    assert response.status_code == 200
+    mock_service.get_stats.assert_called_once()
+    assert mock_service.get_stats.call_args.args[0].date_from.year == 2024
+    assert response.get_json()["languages"][0]["language"] == "en"
+
+
+@patch("app.api.palindromes.palindrome_service")
+def test_find_longest(mock_service, test_client):
+    """Test finding the longest palindromic part of a text."""
+    mock_service.find_longest.return_value = {
+        "text": "racecar",
+        "start": 4,
+        "end": 11,
+        "length": 7,
+    }
+
+    response = test_client.post(
+        "/v1/palindromes/longest",
+        data=json.dumps({"text": "the racecar"}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    mock_service.find_longest.assert_called_once()
+    assert response.get_json()["text"] == "racecar"
+
+
 @patch("app.api.palindromes.palindrome_service")
 def test_get_palindrome_by_id(mock_service, test_client, mock_palindrome):
     """Test retrieving a palindrome by its ID."""
@@ -69,6 +129,69 @@ def test_get_palindromes(mock_service, test_client):
     mock_service.get_all.assert_called_once()
 
 
+@patch("app.api.palindromes.palindrome_service")
+def test_get_palindrome_by_id_is_conditional(
+    mock_service, test_client, mock_palindrome
+):
+    """Test that a detection has a strong ETag, and 304 skips serializing it."""
+    mock_service.get_by_id.return_value = mock_palindrome
+    url = f"/v1/palindromes/{mock_palindrome.id}"
+
+    response = test_client.get(url)
+    assert response.headers["ETag"] == f'"{mock_palindrome.id}"'
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    mock_service.get_by_id.assert_called_once()
+    assert response.last_modified == mock_palindrome.created_at.replace(microsecond=0)
+
+    mock_service.reset_mock()
+    response = test_client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == f'"{mock_palindrome.id}"'
+    mock_service.get_by_id.assert_called_once()
+
+    response = test_client.get(url, headers={"If-None-Match": f'"{uuid.uuid4()}"'})
+    assert response.status_code == 200
+
+    # Once deleted, the copy of the client is not current anymore
+    mock_service.get_by_id.side_effect = NotFound()
+    response = test_client.get(
+        url, headers={"If-None-Match": f'"{mock_palindrome.id}"'}
+    )
+    assert response.status_code == 404
+
+
+@patch("app.api.palindromes.palindrome_service")
+def test_get_palindromes_is_conditional(mock_service, test_client):
+    """Test that list pages have a weak ETag, and 304 skips the query."""
+    mock_service.page_etag.return_value = "7-abc"
+    mock_service.get_all.return_value = MagicMock(
+        items=[], has_prev=False, has_next=False, total=0, pages=0, page=1, per_page=50
+    )
+
+    response = test_client.get("/v1/palindromes?language=en")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"7-abc"'
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert mock_service.page_etag.call_args.args[0].language == "en"
+
+    mock_service.reset_mock()
+    response = test_client.get(
+        "/v1/palindromes?language=en", headers={"If-None-Match": 'W/"7-abc"'}
+    )
+    assert response.status_code == 304
+    mock_service.get_all.assert_not_called()
+
+    # Without a cache, there is no tag to compare
+    mock_service.page_etag.return_value = None
+    response = test_client.get(
+        "/v1/palindromes?language=en", headers={"If-None-Match": 'W/"7-abc"'}
+    )
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    mock_service.get_all.assert_called_once()
+
+
 @patch("app.api.palindromes.palindrome_service")
 def test_delete_palindrome(mock_service, test_client):
     """Test deleting a palindrome."""
@@ -79,3 +202,19 @@ def test_delete_palindrome(mock_service, test_client):
 
     assert response.status_code == 204
     mock_service.delete_by_id.assert_called_once_with(palindrome_id)
+
+
+@patch("app.api.palindromes.palindrome_service")
+def test_delete_all_palindromes(mock_service, test_client):
+    """Test deleting the palindromes matching some filters."""
+    mock_service.delete_all.return_value = 3
+
+    response = test_client.delete("/v1/palindromes?language=en")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"deleted": 3}
+    assert mock_service.delete_all.call_args.args[0].language == "en"
+
+    response = test_client.delete("/v1/palindromes")
+    assert response.status_code == 400
+    mock_service.delete_all.assert_called_once()
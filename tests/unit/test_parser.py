@@ -1,5 +1,21 @@
 import pytest
-from app.core.parser import is_palindrome
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.core import parser
+from app.core.parser import (
+    is_palindrome,
+    is_palindrome_batch,
+    is_palindrome_file,
+    is_palindrome_parallel,
+    is_sanitized_palindrome,
+    is_palindrome_stream,
+    get_executor,
+    get_profile,
+    load_fold_table,
+    longest_palindrome,
+    near_palindrome,
+    palindrome_stats,
+    sanitize,
+)
 
 # Test cases for palindromes
 # Each tuple contains: (input_string, expected_result, description)
@@ -22,6 +38,7 @@ palindrome_test_cases = [
         "Spanish palindrome with diacritics",
     ),
     ("été", True, "Unicode with diacritic, palindrome"),
+    ("e\u0301te\u0301", True, "Decomposed diacritics"),
 ]
 
 # Test cases for non-palindromes
@@ -29,6 +46,10 @@ non_palindrome_test_cases = [
     ("hello", False, "Simple non-palindrome"),
     ("not a palindrome", False, "Multi-word non-palindrome"),
     ("réservé", False, "Unicode with diacritic, not a palindrome"),
+    ("가나가", False, "Hangul syllables are compared jamo by jamo"),
+    ("xracecar", False, "Mismatch only at the outer edge"),
+    ("racexcar", False, "Mismatch only in the middle"),
+    ("ΣΑΣ", False, "Final sigma differs from medial sigma"),
 ]
 
 # Edge cases
@@ -40,6 +61,8 @@ edge_test_cases = [
     (".,", False, "String with only punctuation"),
     ("12321", True, "Numeric palindrome"),
     ("12345", False, "Numeric non-palindrome"),
+    ("\u0301\u0308", False, "String with only combining marks"),
+    ("!a?", True, "Single character surrounded by punctuation"),
 ]
 
 
@@ -59,3 +82,377 @@ def test_is_palindrome_with_non_palindromes(text, expected, description):
 def test_is_palindrome_with_edge_cases(text, expected, description):
     """Test that is_palindrome handles edge cases correctly."""
     assert is_palindrome(text) is expected, f"Failed on: {description}"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("A man, a plan, a canal: Panama", "amanaplanacanalpanama"),
+        ("Sátorótas", "satorotas"),
+        ("e\u0301te\u0301!", "ete"),
+        ("ΣΑΣ", "σας"),
+        (" ,.", ""),
+    ],
+)
+def test_sanitize(text, expected):
+    """Test that sanitize folds case, diacritics and punctuation in one pass."""
+    assert sanitize(text) == expected
+
+
+def test_load_fold_table_caches_on_disk(tmp_path, monkeypatch):
+    """Test that the folding table is built once and then loaded from disk."""
+    monkeypatch.setattr(parser, "_fold_table", parser.FoldTable())
+    monkeypatch.setattr(parser, "_profiles", {})
+
+    built = load_fold_table(str(tmp_path))
+    cached_files = list(tmp_path.iterdir())
+    assert len(cached_files) == 1
+    assert parser.unicodedata.unidata_version in cached_files[0].name
+
+    loaded = load_fold_table(str(tmp_path))
+    assert loaded == built
+    assert parser._fold_table is loaded
+    assert sanitize("Árbol, ÉTÉ") == "arbolete"
+
+
+all_test_cases = palindrome_test_cases + non_palindrome_test_cases + edge_test_cases
+
+
+def test_is_palindrome_batch_matches_scalar():
+    """Test that batch detection gives the same verdicts as is_palindrome."""
+    texts = [text for text, _, _ in all_test_cases]
+    assert is_palindrome_batch(texts) == [expected for _, expected, _ in all_test_cases]
+
+
+def test_is_palindrome_batch_without_numpy(monkeypatch):
+    """Test that batch detection falls back to is_palindrome without NumPy."""
+    monkeypatch.setattr(parser, "np", None)
+    texts = [text for text, _, _ in all_test_cases]
+    assert is_palindrome_batch(texts) == [expected for _, expected, _ in all_test_cases]
+
+
+def test_is_palindrome_batch_empty():
+    """Test that an empty batch returns no verdicts."""
+    assert is_palindrome_batch([]) == []
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Hello, racecar!", "racecar"),
+        ("A man, a plan, a canal: Panama!!", "A man, a plan, a canal: Panama"),
+        ("xx abba", "abba"),
+        ("abc", "a"),
+        ("Dijo: Sátorótas.", "Sátorótas"),
+        ("ze\u0301te\u0301z!", "ze\u0301te\u0301z"),
+        ("e\u0301te\u0301 hi", "e\u0301te\u0301"),
+    ],
+)
+def test_longest_palindrome(text, expected):
+    """Test that longest_palindrome maps the span back to the original text."""
+    span = longest_palindrome(text)
+    assert text[span.start : span.end] == expected
+    assert span.length == len(sanitize(expected))
+
+
+@pytest.mark.parametrize(
+    "text, language, expected",
+    [
+        ("Ñanan", None, "Ñanan"),
+        ("Ñanan", "es", "ana"),
+        ("An\u0303ana", "es", "An\u0303a"),
+        ("Iıx", "tr", "Iı"),
+        ("Iıx", None, "I"),
+        ("ijsij!", "nl", "ijsij"),
+        ("ijsji!", "nl", "ij"),
+    ],
+)
+def test_longest_palindrome_with_language(text, language, expected):
+    """Test that longest_palindrome folds characters like the language does."""
+    span = longest_palindrome(text, language)
+    assert text[span.start : span.end] == expected
+    assert is_palindrome(expected, language)
+
+
+def test_longest_palindrome_without_letters():
+    """Test that longest_palindrome returns None when nothing can be compared."""
+    assert longest_palindrome(" ,.") is None
+
+
+def test_longest_palindrome_matches_brute_force():
+    """Test the linear-time search against an exhaustive one."""
+    for text in ["abacdfgdcaba", "cbbd", "forgeeksskeegfor", "aaaa", "abcbaxyzzyx"]:
+        span = longest_palindrome(text)
+        longest = max(
+            (
+                text[i:j]
+                for i in range(len(text))
+                for j in range(i + 1, len(text) + 1)
+                if text[i:j] == text[i:j][::-1]
+            ),
+            key=len,
+        )
+        assert span.length == len(longest)
+
+
+def test_palindrome_stats():
+    """Test counting distinct and repeated palindromic substrings."""
+    stats = palindrome_stats("Abacaba!", top=3)
+    # a, b, c, aba, aca, bacab, abacaba
+    assert stats.distinct_count == 7
+    assert stats.most_common == [("a", 4), ("aba", 2), ("b", 2)]
+    assert stats.length_histogram == {1: 3, 3: 2, 5: 1, 7: 1}
+
+
+def test_palindrome_stats_with_language():
+    """Test that the analysis folds characters like the language does."""
+    assert palindrome_stats("ijsij", language="nl").length_histogram == {1: 2, 3: 1}
+    assert palindrome_stats("ijsij").length_histogram == {1: 3}
+
+
+def test_palindrome_stats_without_letters():
+    """Test that a text without letters or digits has no palindromes."""
+    stats = palindrome_stats("?! ")
+    assert stats == (0, [], {})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 5, 7, 1 << 20])
+@pytest.mark.parametrize("text, expected, description", all_test_cases)
+def test_is_palindrome_stream(text, expected, description, chunk_size):
+    """Test that streaming detection matches is_palindrome for any chunk size."""
+    assert (
+        is_palindrome_stream(text.encode(), chunk_size) is expected
+    ), f"Failed on: {description}"
+
+
+def test_is_palindrome_stream_mark_on_chunk_boundary():
+    """Test that a combining mark split from its base by a chunk is dropped."""
+    # With 4-byte chunks the accent of the last 'é' is a chunk of its own.
+    text = "e\u0301te\u0301"
+    assert is_palindrome_stream(text.encode(), 4) is True
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize("segments", [1, 3, 64])
+def test_is_palindrome_parallel(process_pool, segments):
+    """Test that parallel detection matches is_palindrome for any split."""
+    texts = [text for text, _, _ in all_test_cases]
+    expected = [expected for _, expected, _ in all_test_cases]
+    assert [
+        is_palindrome_parallel(text, process_pool, segments=segments) for text in texts
+    ] == expected
+
+
+def test_is_palindrome_parallel_uses_language(process_pool):
+    """Test that language profiles apply across segment boundaries."""
+    assert is_palindrome_parallel("Ñanan", process_pool, "es", segments=5) is False
+    assert is_palindrome_parallel("Ñanan", process_pool, segments=5) is True
+    # A decomposed 'ñ' split over two segments is still an 'ñ'.
+    assert is_palindrome_parallel("ñan\u0303", process_pool, "es", segments=4) is True
+
+
+def test_is_palindrome_parallel_large_text(process_pool):
+    """Test a large text whose only mismatch is in the middle."""
+    half = "Sátorótas, " * 10_000
+    assert is_palindrome_parallel(half + half[::-1], process_pool) is True
+    assert is_palindrome_parallel(half + "xy" + half[::-1], process_pool) is False
+
+
+def test_is_palindrome_parallel_from_threads(monkeypatch, tmp_path):
+    """Test that concurrent requests share a single pool, started once."""
+    monkeypatch.setattr(parser, "_executor", None)
+    half = "Sátorótas, " * 1000
+    texts = [half + half[::-1], half + "xy" + half[::-1]] * 4
+
+    def check(text):
+        executor = get_executor(2, str(tmp_path))
+        return is_palindrome_parallel(text, executor, segments=4), executor
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as threads:
+        results, executors = zip(*threads.map(check, texts))
+    try:
+        assert list(results) == [True, False] * 4
+        assert len(set(executors)) == 1
+    finally:
+        executors[0].shutdown()
+
+
+def test_is_palindrome_parallel_stops_at_first_mismatch():
+    """Test that pairs past the first mismatch are never folded."""
+
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    half = "Sátorótas, " * 1000
+    with CountingExecutor(max_workers=2) as executor:
+        assert (
+            is_palindrome_parallel("x" + half + half[::-1], executor, window=2) is False
+        )
+        assert executor.submitted <= 3
+
+
+def test_is_palindrome_stream_invalid_utf8():
+    """Test that bytes that are not UTF-8 are rejected."""
+    with pytest.raises(UnicodeDecodeError):
+        is_palindrome_stream(b"a\xffa")
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"a" + b"\x80" * (1 << 20) + b"a",  # A right chunk of continuation bytes
+        b"\x80" * ((1 << 20) + 5),  # A left chunk of continuation bytes
+        b"a\x80\x80\x80\x80a",
+    ],
+)
+def test_is_palindrome_stream_continuation_bytes(data):
+    """Test that runs of continuation bytes are rejected, not read forever."""
+    with pytest.raises(UnicodeDecodeError):
+        is_palindrome_stream(data)
+    with pytest.raises(UnicodeDecodeError):
+        is_palindrome_stream(data, 4)
+
+
+def test_is_palindrome_file(tmp_path):
+    """Test that files are memory-mapped and checked."""
+    palindrome = tmp_path / "palindrome.txt"
+    palindrome.write_text("Sátorótas\n" * 1001 + "Sátorótas", encoding="utf-8")
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    assert is_palindrome_file(palindrome, chunk_size=64) is True
+    assert is_palindrome_file(str(palindrome)) is True
+    assert is_palindrome_file(empty) is False
+
+
+# Language-specific cases
+# Each tuple contains: (input_string, language, expected_result, description)
+language_test_cases = [
+    ("Ñan", "es", False, "Spanish ñ is not an n"),
+    ("Ñan", None, True, "Generic folding drops the tilde of ñ"),
+    ("añña", "es", True, "Spanish palindrome with ñ"),
+    ("an\u0303n\u0303a", "es", True, "Spanish decomposed ñ"),
+    ("Maß sam", "de", True, "German ß is folded to ss"),
+    ("Maß sam", None, False, "Generic folding keeps ß"),
+    ("Iı", "tr", True, "Turkish capital I is dotless"),
+    ("Ii", "tr", False, "Turkish dotless and dotted i differ"),
+    ("İi", "tr", True, "Turkish capital İ is dotted"),
+    ("ijsij", "nl", True, "Dutch ij is a single letter"),
+    ("IJsij", "nl", True, "Dutch capital IJ"),
+    ("ijsji", "nl", False, "Dutch ij cannot be reversed"),
+    ("ijsji", None, True, "Generic folding splits ij"),
+    ("ΣΑΣ", "el", True, "Greek final sigma is a sigma"),
+    ("Anna", "xx", True, "Unknown languages use generic folding"),
+]
+
+
+@pytest.mark.parametrize("text, language, expected, description", language_test_cases)
+def test_is_palindrome_with_language(text, language, expected, description):
+    """Test that language profiles change how characters are folded."""
+    assert is_palindrome(text, language) is expected, f"Failed on: {description}"
+    assert is_palindrome_batch([text], language) == [expected]
+    sanitized = sanitize(text, language)
+    assert (bool(sanitized) and sanitized == sanitized[::-1]) is expected
+    # Also when a chunk boundary falls inside a replaced sequence, e.g. 'ij'
+    for chunk_size in (1, 2, 3, 1 << 20):
+        assert is_palindrome_stream(text.encode(), chunk_size, language) is expected
+
+
+def test_get_profile_is_compiled_once():
+    """Test that profiles are compiled once and shared across calls."""
+    assert get_profile("de") is get_profile("de")
+    assert get_profile("xx") is get_profile(None)
+    assert get_profile(None).table is parser._fold_table
+
+
+# Word and line mode cases
+# Each tuple contains: (input_string, mode, expected_result, description)
+mode_test_cases = [
+    ("fall leaves after leaves fall", "word", True, "Word palindrome"),
+    (
+        "Fall leaves, after leaves; FALL!",
+        "word",
+        True,
+        "Word palindrome with punctuation",
+    ),
+    (
+        "fall  leaves\tafter leaves\nfall",
+        "word",
+        True,
+        "Any whitespace separates words",
+    ),
+    ("fall leaves after leaves", "word", False, "Word non-palindrome"),
+    ("step on no pets", "word", False, "Character palindrome is not a word palindrome"),
+    ("Sátorótas", "word", True, "Single word"),
+    (" \t ", "word", False, "Whitespace only"),
+    ("roses are red\nviolets\nRoses, are red!", "line", True, "Line palindrome"),
+    ("one\r\ntwo\n\n\nthree", "line", False, "Line non-palindrome"),
+    ("one\n\n two \none", "line", True, "Blank lines are ignored"),
+    ("", "line", False, "Empty string"),
+]
+
+
+@pytest.mark.parametrize("text, mode, expected, description", mode_test_cases)
+def test_is_palindrome_with_mode(text, mode, expected, description):
+    """Test that word and line modes compare whole tokens."""
+    assert is_palindrome(text, mode=mode) is expected, f"Failed on: {description}"
+
+
+@pytest.mark.parametrize(
+    "text, max_edits, edit, expected",
+    [
+        ("racecar", 0, "substitution", (0, [])),
+        ("Racecbr!", 1, "substitution", (1, [1])),
+        ("Racecbr!", 0, "substitution", None),
+        ("abcdef", 2, "substitution", None),
+        ("abcdef", 3, "substitution", (3, [0, 1, 2])),
+        ("race, caar", 1, "indel", (1, [8])),
+        ("racecaxr", 1, "indel", (1, [6])),
+        ("racecaxr", 0, "indel", None),
+        ("abcdef", 4, "indel", None),
+        ("abcdef", 5, "indel", (5, [1, 2, 3, 4, 5])),
+        ("?!", 3, "substitution", None),
+    ],
+)
+def test_near_palindrome(text, max_edits, edit, expected):
+    """Test that near_palindrome finds the fewest edits and where they are."""
+    assert near_palindrome(text, max_edits, edit) == expected
+
+
+def test_near_palindrome_deletions_leave_a_palindrome():
+    """Test that deleting the reported characters always leaves a palindrome."""
+    for text, edits in [("abacdfgdcaba", 1), ("Añ pola-ción", 5), ("xyzzyaxb", 2)]:
+        result = near_palindrome(text, len(text), "indel")
+        assert result.edits == edits
+        kept = "".join(c for i, c in enumerate(text) if i not in result.positions)
+        assert is_palindrome(kept)
+
+
+def test_near_palindrome_clamps_the_budget():
+    """Test that a budget larger than the text does not grow the matrix."""
+    assert near_palindrome("ab", 10**9, "indel") == (1, [1])
+
+
+@pytest.mark.parametrize("mode", ["char", "word", "line"])
+def test_is_sanitized_palindrome(mode):
+    """Test that the verdict of a sanitized text matches is_palindrome."""
+    texts = [text for text, _, _ in all_test_cases] + [
+        "fall leaves after leaves fall",
+        "one\ntwo\n\none",
+        "Ñan",
+    ]
+    for language in [None, "es"]:
+        for text in texts:
+            sanitized = sanitize(text, language, mode)
+            assert is_sanitized_palindrome(sanitized, mode) is is_palindrome(
+                text, language, mode
+            ), text
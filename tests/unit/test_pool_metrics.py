@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.pool_metrics import PoolMetrics, timed_pool
+from config import engine_options
+
+
+@pytest.fixture
+def metrics():
+    return PoolMetrics()
+
+
+def test_timed_pool(metrics, tmp_path):
+    """Test that checkouts, timeouts and the pool gauges are recorded."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=timed_pool(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.01,
+    )
+    assert timed_pool(QueuePool, metrics) is type(engine.pool)
+
+    first, second = engine.connect(), engine.connect()
+    stats = metrics.stats(engine.pool)
+    assert (stats["size"], stats["in_use"], stats["overflow"]) == (1, 2, 1)
+    assert stats["checkouts"] == 2
+
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    stats = metrics.stats(engine.pool)
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_seconds"] >= 0.01
+
+    first.close()
+    second.close()
+    stats = metrics.stats(engine.pool)
+    assert (stats["in_use"], stats["idle"], stats["overflow"]) == (0, 1, 0)
+
+
+def test_pools_are_counted_apart(metrics, tmp_path):
+    """Test that the primary and a replica sharing the metrics get their own."""
+    primary, replica = (
+        create_engine(
+            f"sqlite:///{tmp_path / name}", poolclass=timed_pool(QueuePool, metrics)
+        )
+        for name in ("primary.db", "replica.db")
+    )
+    primary.connect().close()
+    primary.connect().close()
+    replica.connect().close()
+    assert metrics.stats(primary.pool)["checkouts"] == 2
+    assert metrics.stats(replica.pool)["checkouts"] == 1
+
+
+def test_engine_options(monkeypatch):
+    """Test the pool settings and the PgBouncer profile."""
+    uri = "postgresql://user:password@db:5432/vb_database"
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    options = engine_options(uri)
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 10
+    assert options["pool_pre_ping"] is False
+
+    monkeypatch.setenv("DB_POOL_PROFILE", "pgbouncer")
+    assert engine_options(uri) == {"poolclass": NullPool}
+    assert engine_options("sqlite:///:memory:") == {}
@@ -0,0 +1,117 @@
+import itertools
+import uuid
+from datetime import datetime
+
+import pytest
+from cachelib import SimpleCache
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+from app.core.replicas import PIN_COOKIE
+from app.extensions import replicas
+from app.models import Palindrome
+from app.services.palindrome.palindrome_dtos import (
+    PalindromeCreateDTO,
+    PalindromeQueryDTO,
+)
+from app.services.palindrome.palindrome_service import PalindromeService
+
+
+def make_replica(db):
+    """A second in-memory database, with the tables but none of the rows."""
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    db.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def replica(db, monkeypatch):
+    engine = make_replica(db)
+    monkeypatch.setattr(replicas, "engines", [engine])
+    monkeypatch.setattr(replicas, "shared", SimpleCache())
+    monkeypatch.setattr(replicas, "_checked", {})
+    monkeypatch.setattr(replicas, "_turn", itertools.count())
+    yield engine
+    db.session.remove()  # Releases the replica connection before closing it
+    engine.dispose()
+
+
+def add_row(engine, text):
+    palindrome_id = uuid.uuid4()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Palindrome),
+            {
+                "id": palindrome_id,
+                "text": text,
+                "language": "en",
+                "is_palindrome": True,
+                "created_at": datetime(2024, 5, 1),
+            },
+        )
+    return palindrome_id
+
+
+def test_reads_go_to_the_replica(db, replica):
+    """Test that reads are served by the replica, and writes by the primary."""
+    service = PalindromeService()
+    palindrome_id = add_row(replica, "mirror")
+    created = service.create(PalindromeCreateDTO(text="level", language="en"))
+
+    assert service.get_by_id(palindrome_id).text == "mirror"
+    page = service.get_all(PalindromeQueryDTO())
+    assert [item.text for item in page.items] == ["mirror"]
+    assert db.session.get(Palindrome, created.id).text == "level"
+
+
+def test_round_robin_skips_unhealthy_replicas(db, replica, monkeypatch, tmp_path):
+    """Test that replicas take turns, and the ones that are down are skipped."""
+    other = make_replica(db)
+    down = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(replicas, "engines", [replica, other, down])
+
+    chosen = [replicas.choose() for _ in range(6)]
+    assert chosen == [replica, other, replica, replica, other, replica]
+    assert replicas.is_healthy(down) is False
+
+    monkeypatch.setattr(replicas, "engines", [down])
+    assert replicas.choose() is None
+
+
+def test_writes_pin_the_client_to_the_primary(db, replica, test_app):
+    """Test that a client reads its own writes from the primary for a while."""
+    service = PalindromeService()
+    with test_app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        created = service.create(PalindromeCreateDTO(text="level", language="en"))
+        assert replicas.pinned()
+        assert service.get_by_id(created.id).text == "level"
+        page = service.get_all(PalindromeQueryDTO())
+        assert [item.text for item in page.items] == ["level"]
+
+    with test_app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.2"}):
+        assert not replicas.pinned()
+        assert replicas.choose() is replica
+
+
+def test_pins_follow_the_cookie_of_the_client(db, replica, test_app):
+    """Test that pins are keyed by a cookie, not by a spoofable address."""
+    client = test_app.test_client()
+    response = client.post(
+        "/v1/palindromes",
+        json={"text": "level", "language": "en"},
+        headers={"X-Forwarded-For": "10.0.0.9"},
+    )
+    cookie = client.get_cookie(PIN_COOKIE)
+    assert response.status_code == 201 and cookie is not None
+
+    # Another client claiming the same address is not pinned
+    with test_app.test_request_context(headers={"X-Forwarded-For": "10.0.0.9"}):
+        assert not replicas.pinned()
+    with test_app.test_request_context(
+        headers={"Cookie": f"{PIN_COOKIE}={cookie.value}"}
+    ):
+        assert replicas.pinned()
@@ -0,0 +1,95 @@
+import pytest
+from cachelib import SimpleCache
+from redis.exceptions import ConnectionError
+
+from app.core.result_cache import ResultCache, result_key
+from app.core.parser import sanitize
+
+
+class UnreachableCache:
+    def get(self, key):
+        raise ConnectionError("Redis is down")
+
+    def set(self, key, value, timeout=None):
+        raise ConnectionError("Redis is down")
+
+    def inc(self, key, delta=1):
+        raise ConnectionError("Redis is down")
+
+    def get_many(self, *keys):
+        raise ConnectionError("Redis is down")
+
+
+@pytest.fixture
+def result_cache():
+    cache = ResultCache(maxsize=2)
+    cache.shared = SimpleCache()
+    return cache
+
+
+def test_result_key_uses_sanitized_text():
+    """Test that texts with the same sanitized form share a key."""
+    key = result_key(sanitize("Race car!"), "char")
+    assert key == result_key(sanitize("racecar"), "char")
+    assert key != result_key(sanitize("racecar"), "word")
+    assert key != result_key(sanitize("racecars"), "char")
+
+
+def test_result_cache_tiers(result_cache):
+    """Test that misses, local hits and shared hits are counted."""
+    assert result_cache.get("a") is None
+    result_cache.set("a", True)
+    assert result_cache.get("a") is True
+
+    result_cache.clear()  # Only the local tier
+    assert result_cache.get("a") is True
+    assert result_cache.get("a") is True
+    assert result_cache.stats() == {
+        "hits": 3,
+        "misses": 1,
+        "evictions": 0,
+        "local_hits": 2,
+        "shared_hits": 1,
+        "size": 1,
+        "maxsize": 2,
+    }
+
+
+def test_result_cache_counts_every_worker(result_cache):
+    """Test that the counters are kept in the shared tier, for all workers."""
+    other_worker = ResultCache(maxsize=2)
+    other_worker.shared = result_cache.shared
+    result_cache.set("a", True)
+    assert other_worker.get("a") is True
+    assert other_worker.get("b") is None
+    assert result_cache.get("a") is True
+
+    stats = result_cache.stats()
+    assert (stats["misses"], stats["shared_hits"], stats["local_hits"]) == (1, 1, 1)
+    assert other_worker.stats() == stats
+
+
+def test_result_cache_evicts_least_recently_used(result_cache):
+    """Test that the local tier is bounded and evicts the oldest entry."""
+    result_cache.shared = None
+    result_cache.set("a", True)
+    result_cache.set("b", False)
+    assert result_cache.get("a") is True
+    result_cache.set("c", True)
+
+    assert result_cache.get("b") is None
+    assert result_cache.get("a") is True
+    assert result_cache.get("c") is True
+    stats = result_cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_result_cache_without_redis(result_cache):
+    """Test that the local tier keeps working when Redis is down."""
+    result_cache.shared = UnreachableCache()
+    assert result_cache.get("a") is None
+    result_cache.set("a", False)
+    assert result_cache.get("a") is False
+    # The counters of this worker are reported instead
+    assert result_cache.stats()["misses"] == 1
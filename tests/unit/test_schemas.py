@@ -1,7 +1,15 @@
+from datetime import date
+
 import pytest
 from marshmallow import ValidationError
 
-from app.api.schemas import PalindromeCreateSchema, PalindromeQuerySchema
+from app.api.schemas import (
+    MAX_TEXT_LENGTH,
+    PalindromeBatchCreateSchema,
+    PalindromeCreateSchema,
+    PalindromeDeleteQuerySchema,
+    PalindromeQuerySchema,
+)
 
 
 def test_palindrome_create_schema_success():
@@ -20,6 +28,12 @@ def test_palindrome_create_schema_success():
         {"text": "", "language": "en"},  # text too short
         {"language": "en"},  # missing text
         {"text": "test"},  # missing language
+        {"text": "test", "language": "en", "mode": "sentence"},  # invalid mode
+        {"text": "test", "language": "en", "max_edits": -1},  # negative budget
+        {"text": "test", "language": "en", "max_edits": 101},  # budget too large
+        # indel edits in a text too long for the matrix
+        {"text": "a" * 10_001, "language": "en", "max_edits": 1, "edit": "indel"},
+        {"text": "test", "language": "en", "edit": "swap"},  # invalid edit
     ],
 )
 def test_palindrome_create_schema_invalid(invalid_data):
@@ -29,6 +43,30 @@ def test_palindrome_create_schema_invalid(invalid_data):
         schema.load(invalid_data)
 
 
+def test_palindrome_batch_create_schema_success():
+    """Tests that PalindromeBatchCreateSchema loads valid batches."""
+    items = [{"text": "racecar", "language": "en"}, {"text": "hola", "language": "es"}]
+    loaded_data = PalindromeBatchCreateSchema().load({"palindromes": items})
+    assert loaded_data == {"items": items}
+
+
+@pytest.mark.parametrize(
+    "invalid_data",
+    [
+        {},  # missing items
+        {"palindromes": []},  # empty batch
+        {"palindromes": [{"text": "test", "language": "en"}] * 5001},  # too big
+        {"palindromes": [{"text": "test", "language": "eng"}]},  # invalid item
+        {"palindromes": [{"text": "a" * (MAX_TEXT_LENGTH + 1), "language": "en"}]},
+        {"palindromes": [{"text": "test", "language": "en", "mode": "word"}]},
+    ],
+)
+def test_palindrome_batch_create_schema_invalid(invalid_data):
+    """Tests that PalindromeBatchCreateSchema rejects invalid batches."""
+    with pytest.raises(ValidationError):
+        PalindromeBatchCreateSchema().load(invalid_data)
+
+
 def test_palindrome_query_schema_defaults():
     """Tests that PalindromeQuerySchema uses default values correctly."""
     schema = PalindromeQuerySchema()
@@ -64,10 +102,12 @@ def test_palindrome_query_schema_with_values():
     "invalid_data",
     [
         {"language": "spa"},  # language wrong length
+        {"mode": "sentence"},  # invalid mode
         {"sort": "invalid_field"},  # invalid sort field
         {"order": "invalid_order"},  # invalid order value
         {"page": 0},  # page out of range
         {"per_page": 0},  # per_page out of range
+        {"pagination": "cursor"},  # invalid pagination
     ],
 )
 def test_palindrome_query_schema_invalid(invalid_data):
@@ -75,3 +115,13 @@ def test_palindrome_query_schema_invalid(invalid_data):
     schema = PalindromeQuerySchema()
     with pytest.raises(ValidationError):
         schema.load(invalid_data)
+
+
+def test_palindrome_delete_query_schema():
+    """Tests that PalindromeDeleteQuerySchema needs a filter and takes no paging."""
+    schema = PalindromeDeleteQuerySchema()
+    assert schema.load({"date_to": "2024-01-31"}) == {"date_to": date(2024, 1, 31)}
+    with pytest.raises(ValidationError):
+        schema.load({})
+    with pytest.raises(ValidationError):
+        schema.load({"language": "en", "page": 2})
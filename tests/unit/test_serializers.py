@@ -0,0 +1,77 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import serializers
+from app.api.schemas import PalindromeListSchema, PalindromeSchema
+
+RECORDS = [
+    SimpleNamespace(
+        id=uuid.uuid4(),
+        text="A man, a plan, a canal: Panamá",
+        content_hash=None,
+        language="es",
+        mode="char",
+        is_palindrome=True,
+        created_at=datetime(2024, 5, 1, 12, 30, 15, 123456),
+    ),
+    SimpleNamespace(
+        id=uuid.uuid4(),
+        text=None,
+        content_hash="ab" * 32,
+        language="en",
+        mode="line",
+        is_palindrome=False,
+        created_at=datetime(2024, 5, 1, tzinfo=timezone.utc),
+    ),
+]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Runs a test with orjson, and with the standard library fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(serializers, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("record", RECORDS)
+def test_palindrome_matches_schema(test_app, encoder, record):
+    """Test that a detection is encoded like PalindromeSchema dumps it."""
+    with test_app.app_context():
+        expected = PalindromeSchema().jsonify(record).get_json()
+    assert json.loads(serializers.dumps(serializers.palindrome(record))) == expected
+
+
+def test_palindrome_list_matches_schema(test_app, encoder):
+    """Test that a page is encoded like PalindromeListSchema dumps it."""
+    page = {
+        "items": RECORDS,
+        "prev_url": None,
+        "next_url": "/v1/palindromes?cursor=abc",
+        "total": None,
+        "pages": None,
+        "page": None,
+        "per_page": 2,
+    }
+    with test_app.app_context():
+        expected = PalindromeListSchema().jsonify(page).get_json()
+    assert json.loads(serializers.dumps(serializers.palindrome_list(page))) == expected
+
+
+def test_fast_response_keeps_the_docs(test_client):
+    """Test that the read endpoints document their schemas as before."""
+    spec = test_client.get("/apispec.json").get_json()
+    detail = spec["paths"]["/v1/palindromes/{palindrome_id}"]["get"]["responses"]
+    listing = spec["paths"]["/v1/palindromes"]["get"]["responses"]
+    assert detail["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/Palindrome"
+    }
+    assert listing["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/PalindromeList"
+    }
+    # Along with the responses documented by the other decorators
+    assert "304" in detail and "304" in listing
@@ -0,0 +1,135 @@
+import os
+import uuid
+from datetime import datetime
+
+import click
+import pytest
+from flask import Flask
+
+from app.core.write_behind import WriteBehind, WriteBehindJournal
+
+
+def make_row(text="racecar"):
+    return {
+        "id": uuid.uuid4(),
+        "text": text,
+        "content_hash": None,
+        "language": "en",
+        "mode": "char",
+        "is_palindrome": True,
+        "created_at": datetime(2024, 5, 1, 12, 30, 15, 123456),
+    }
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return WriteBehindJournal(str(tmp_path))
+
+
+def test_append_and_get(journal):
+    """Test that queued rows are read back with their types."""
+    row = make_row()
+    journal.append(row)
+
+    assert len(journal) == 1
+    assert journal.get(row["id"]) == row
+    assert journal.get(uuid.uuid4()) is None
+
+
+def test_journal_survives_restart(journal, tmp_path):
+    """Test that rows are on disk, not in the journal object."""
+    row = make_row()
+    journal.append(row)
+
+    assert WriteBehindJournal(str(tmp_path)).get(row["id"]) == row
+
+
+def test_claim_and_complete(journal):
+    """Test that claimed rows are still readable until completed."""
+    rows = [make_row(f"level {i}") for i in range(3)]
+    for row in rows:
+        journal.append(row)
+
+    claimed = journal.claim(2)
+    assert len(claimed) == 2 and len(journal) == 1
+    assert all(journal.get(row["id"]) == row for row in claimed)
+    assert journal.claim(5) == [row for row in rows if row not in claimed]
+
+    journal.complete(claimed)
+    assert all(journal.get(row["id"]) is None for row in claimed)
+
+
+def test_recover(journal):
+    """Test that rows claimed by a dead flusher are queued again."""
+    row = make_row()
+    journal.append(row)
+    journal.claim(1)
+
+    assert journal.recover(older_than=60) == 0
+    assert len(journal) == 0
+    assert journal.recover(older_than=0) == 1
+    assert journal.claim(1) == [row]
+
+
+def test_discard(journal):
+    """Test that only queued rows can be discarded."""
+    queued, claimed = make_row("kayak"), make_row("noon")
+    journal.append(claimed)
+    journal.claim(1)
+    journal.append(queued)
+
+    assert journal.discard(queued["id"]) == queued
+    assert journal.get(queued["id"]) is None
+    assert journal.discard(claimed["id"]) is None
+    assert journal.get(claimed["id"]) == claimed
+
+
+def test_append_leaves_no_temporary_file(journal):
+    """Test that rows are written atomically, through a renamed file."""
+    row = make_row()
+    journal.append(row)
+
+    assert os.listdir(journal.pending) == [f"{row['id']}.json"]
+
+
+@pytest.fixture
+def serving_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        WRITE_BEHIND_JOURNAL_DIR=str(tmp_path),
+        WRITE_BEHIND_BATCH_SIZE=10,
+        WRITE_BEHIND_INTERVAL=60,
+        WRITE_BEHIND_RECOVER_AFTER=60,
+    )
+    return app
+
+
+def test_write_behind_requires_a_journal_dir(serving_app):
+    """Test that write-behind cannot be enabled without a journal directory."""
+    serving_app.config["WRITE_BEHIND_JOURNAL_DIR"] = None
+    with pytest.raises(ValueError):
+        WriteBehind().init_app(serving_app, lambda rows: None)
+
+
+def test_flusher_starts_once_when_serving(serving_app):
+    """Test that only a process serving requests starts a flusher, once."""
+    write_behind = WriteBehind()
+    write_behind.init_app(serving_app, lambda rows: None)
+
+    @serving_app.cli.command()
+    def noop():
+        click.echo("done")
+
+    assert serving_app.test_cli_runner().invoke(noop).output == "done\n"
+    assert write_behind.flusher is None
+
+    client = serving_app.test_client()
+    client.get("/")
+    flusher = write_behind.flusher
+    try:
+        assert flusher.is_alive()
+        client.get("/")
+        assert write_behind.flusher is flusher
+    finally:
+        flusher.stop()
+        flusher.join()